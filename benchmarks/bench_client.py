@@ -0,0 +1,280 @@
+"""
+Benchmarks of hot paths of the client against the in-memory fake Moira backend.
+
+    python -m benchmarks.bench_client --sizes 1000,10000,100000 --latency 0.001 --output results.json
+    python -m benchmarks.bench_client --compare results.json
+    python -m benchmarks.bench_client --cassette production.jsonl.gz --api-url https://moira.example.com/api/
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from moira_client import Moira
+from moira_client.cassette import ReplayTransport
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.instrumentation import LatencyHistogram
+from moira_client.models.trigger import Trigger
+
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_DURATION = 2.0
+DEFAULT_MIN_ITERATIONS = 3
+RESULTS_FORMAT = 1
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of the process in kB, None if unknown
+
+    :return: int
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class Operation:
+    """
+    Benchmarked operation, setup() prepares state for run()
+    """
+    name = None
+    # runs on responses replayed from a cassette
+    replayable = True
+
+    def __init__(self, moira, backend):
+        self.moira = moira
+        self.backend = backend
+
+    def setup(self):
+        pass
+
+    def run(self):
+        raise NotImplementedError
+
+
+class FetchAllTriggers(Operation):
+    name = 'trigger.fetch_all'
+
+    def run(self):
+        self.moira.trigger.fetch_all()
+
+
+class TriggerInit(Operation):
+    name = 'Trigger.__init__'
+
+    def setup(self):
+        self.triggers = self.moira._client.get('trigger')['list']
+
+    def run(self):
+        client = self.moira._client
+        for trigger in self.triggers:
+            Trigger(client, **trigger)
+
+
+class FetchAllPatterns(Operation):
+    name = 'pattern.fetch_all'
+
+    def run(self):
+        self.moira.pattern.fetch_all()
+
+
+class TagStats(Operation):
+    name = 'tag.stats'
+
+    def run(self):
+        self.moira.tag.stats()
+
+
+class SaveTrigger(Operation):
+    name = 'trigger.save'
+    replayable = False
+
+    def setup(self):
+        trigger_id = next(iter(self.backend.triggers))
+        self.trigger = self.moira.trigger.fetch_by_id(trigger_id)
+
+    def run(self):
+        self.trigger.save()
+
+
+OPERATIONS = [FetchAllTriggers, TriggerInit, FetchAllPatterns, TagStats, SaveTrigger]
+
+
+def measure(operation, duration=DEFAULT_DURATION, min_iterations=DEFAULT_MIN_ITERATIONS, max_iterations=None):
+    """
+    Run operation repeatedly for about duration seconds
+
+    :param operation: Operation
+    :param duration: float seconds to run
+    :param min_iterations: int min number of runs
+    :param max_iterations: int max number of runs, None for unlimited
+    :return: dict result
+    """
+    operation.setup()
+    # warm up, then measure memory allocated by one run
+    operation.run()
+    gc.collect()
+    tracemalloc.start()
+    operation.run()
+    retained, peak_allocated = tracemalloc.get_traced_memory()
+    retained_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+
+    histogram = LatencyHistogram()
+    iterations = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while iterations < min_iterations or elapsed < duration:
+        if max_iterations is not None and iterations >= max_iterations:
+            break
+        run_start = time.perf_counter()
+        operation.run()
+        histogram.record(time.perf_counter() - run_start)
+        iterations += 1
+        elapsed = time.perf_counter() - start
+
+    return {
+        'operation': operation.name,
+        'iterations': iterations,
+        'throughput': iterations / elapsed if elapsed else None,
+        'mean_ms': histogram.mean * 1000,
+        'p50_ms': histogram.percentile(50) * 1000,
+        'p99_ms': histogram.percentile(99) * 1000,
+        'peak_allocated_bytes': peak_allocated,
+        'retained_bytes': retained,
+        'retained_blocks': retained_blocks,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def run(sizes=DEFAULT_SIZES, operations=None, latency=0.0, duration=DEFAULT_DURATION,
+        min_iterations=DEFAULT_MIN_ITERATIONS, metrics=10, seed=0, verbose=False, cassette=None, api_url=FAKE_API_URL):
+    """
+    Run benchmarks for each installation size
+
+    :param sizes: list of int numbers of triggers
+    :param operations: list of str operation names, None for all
+    :param latency: float seconds added to every request
+    :param duration: float seconds to run each operation
+    :param min_iterations: int min number of runs of each operation
+    :param metrics: int number of metrics per trigger state
+    :param seed: int seed of generated installation
+    :param verbose: bool print results to stderr as they are measured
+    :param cassette: str path of a cassette with recorded responses to run on instead of generated installations
+    :param api_url: str API URL the cassette was recorded with
+    :return: dict results
+    """
+    installations = []
+    if cassette is not None:
+        moira = Moira(api_url, login='benchmark', transport=ReplayTransport(cassette))
+        installations.append((moira, None, len(moira._client.get('trigger')['list'])))
+    for size in sizes if cassette is None else []:
+        backend = FakeMoira(seed=seed).populate(
+            triggers=size, metrics=metrics, tags=max(10, size // 10), subscriptions=max(10, size // 10),
+            notifications=0,
+        )
+        transport = FakeTransport(backend, latency=latency, cache_responses=True)
+        installations.append((Moira(FAKE_API_URL, login='benchmark', transport=transport), backend, size))
+
+    results = []
+    for moira, backend, size in installations:
+        for operation_class in OPERATIONS:
+            if operations and operation_class.name not in operations:
+                continue
+            if backend is None and not operation_class.replayable:
+                continue
+            result = measure(operation_class(moira, backend), duration, min_iterations)
+            result['size'] = size
+            results.append(result)
+            if verbose:
+                print(format_result(result), file=sys.stderr)
+    return {
+        'format': RESULTS_FORMAT,
+        'timestamp': int(time.time()),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'latency': latency,
+        'results': results,
+    }
+
+
+def format_result(result):
+    return '{operation:<20} {size:>7} triggers {throughput:>10.2f} ops/s  p50 {p50_ms:>9.2f} ms  ' \
+           'p99 {p99_ms:>9.2f} ms  {peak_allocated_bytes:>12} B peak allocated'.format(**result)
+
+
+def compare(baseline, current):
+    """
+    Compare results with baseline results
+
+    :param baseline: dict results of run()
+    :param current: dict results of run()
+    :return: list of dicts with ratios of current to baseline values
+    """
+    previous = {(result['operation'], result['size']): result for result in baseline['results']}
+    comparison = []
+    for result in current['results']:
+        base = previous.get((result['operation'], result['size']))
+        if base is None:
+            continue
+        ratios = {}
+        for key in ('throughput', 'p50_ms', 'p99_ms', 'peak_allocated_bytes'):
+            if base.get(key) and result.get(key) is not None:
+                ratios[key] = result[key] / base[key]
+        comparison.append(dict(operation=result['operation'], size=result['size'], **ratios))
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark moira-client against an in-memory Moira')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma separated numbers of triggers, e.g. 1000,10000,100000')
+    parser.add_argument('--operations', default='', help='comma separated operations: ' +
+                        ', '.join(operation.name for operation in OPERATIONS))
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='seconds to run each operation')
+    parser.add_argument('--min-iterations', type=int, default=DEFAULT_MIN_ITERATIONS)
+    parser.add_argument('--metrics', type=int, default=10, help='metrics per trigger state')
+    parser.add_argument('--output', help='write JSON results to file')
+    parser.add_argument('--compare', help='JSON results to compare with')
+    parser.add_argument('--cassette', help='run read operations on responses recorded with Client.recording()')
+    parser.add_argument('--api-url', default=FAKE_API_URL, help='API URL the cassette was recorded with')
+    args = parser.parse_args(argv)
+
+    results = run(
+        sizes=[int(size) for size in args.sizes.split(',') if size],
+        operations=[name for name in args.operations.split(',') if name],
+        latency=args.latency,
+        duration=args.duration,
+        min_iterations=args.min_iterations,
+        metrics=args.metrics,
+        verbose=True,
+        cassette=args.cassette,
+        api_url=args.api_url,
+    )
+    if args.compare:
+        with open(args.compare) as f:
+            results['comparison'] = compare(json.load(f), results)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
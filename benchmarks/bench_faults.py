@@ -0,0 +1,232 @@
+"""
+Resilience benchmarks: runs a workload of manager calls against the in-memory fake Moira backend
+with injected faults, for each retry policy.
+
+    python -m benchmarks.bench_faults --calls 500 --threads 4 --output results.json
+    python -m benchmarks.bench_faults --scenarios scenarios.json --policies policies.json
+"""
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+from collections import Counter
+
+from moira_client import Moira
+from moira_client.client import RetryPolicy
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.faults import FAULT_EMPTY_BODY
+from moira_client.faults import FAULT_LATENCY
+from moira_client.faults import FAULT_RESET
+from moira_client.faults import FAULT_STATUS
+from moira_client.faults import FAULT_TRUNCATE
+from moira_client.faults import FaultInjectingTransport
+from moira_client.faults import Scenario
+from moira_client.faults import load_scenarios
+from moira_client.instrumentation import LatencyHistogram
+from moira_client.instrumentation import RequestHooks
+
+DEFAULT_CALLS = 300
+DEFAULT_TIMEOUT = 0.1
+RESULTS_FORMAT = 1
+
+DEFAULT_SCENARIOS = [
+    Scenario('healthy'),
+    Scenario('slow', [{'type': FAULT_LATENCY, 'delay': 0.2, 'probability': 0.1}],
+             'every 10th request exceeds the read timeout'),
+    Scenario('resets', [{'type': FAULT_RESET, 'probability': 0.05}], 'connections are reset'),
+    Scenario('5xx-burst', [{'type': FAULT_STATUS, 'status': 503, 'start': 50, 'count': 50, 'period': 200}],
+             'bursts of 50 requests failing with 503'),
+    Scenario('throttled', [{'type': FAULT_STATUS, 'status': 429, 'retry_after': 0.01, 'probability': 0.2}],
+             'API answers 429 with Retry-After'),
+    Scenario('truncated', [{'type': FAULT_TRUNCATE, 'methods': ['GET'], 'probability': 0.05}],
+             'JSON bodies of responses are cut'),
+    Scenario('empty-delete', [{'type': FAULT_EMPTY_BODY, 'methods': ['DELETE']}], 'DELETE returns 0-byte bodies'),
+]
+
+DEFAULT_POLICIES = {
+    'no-retries': {},
+    'backoff': {'max_tries': 3, 'delay': 0.01, 'backoff': 2},
+    'aggressive': {'max_tries': 5, 'delay': 0, 'jitter': False, 'budget_ratio': 1.0, 'budget_min_retries': 1000},
+}
+
+
+class AttemptCounter(RequestHooks):
+    """
+    Counts request attempts and retries of a client
+    """
+    def __init__(self):
+        self.attempts = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def before(self, info):
+        with self._lock:
+            self.attempts += 1
+            if info.attempt > 1:
+                self.retries += 1
+
+
+def workload(moira, trigger_ids):
+    """
+    Returns calls of the workload, a mix of reads and writes
+
+    :param moira: Moira
+    :param trigger_ids: list of str trigger ids
+    :return: list of (str name, callable)
+    """
+    calls = []
+    for i, trigger_id in enumerate(trigger_ids):
+        calls.append(('trigger.get_state', lambda trigger_id=trigger_id: moira.trigger.get_state(trigger_id)))
+        calls.append(('trigger.fetch_by_id', lambda trigger_id=trigger_id: moira.trigger.fetch_by_id(trigger_id)))
+        calls.append(('trigger.reset_throttling',
+                      lambda trigger_id=trigger_id: moira.trigger.reset_throttling(trigger_id)))
+        if i % 10 == 0:
+            calls.append(('tag.fetch_all', moira.tag.fetch_all))
+    return calls
+
+
+def run_scenario(backend, scenario, policy, calls=DEFAULT_CALLS, threads=1, timeout=DEFAULT_TIMEOUT, seed=0):
+    """
+    Run workload with faults of scenario
+
+    :param backend: FakeMoira
+    :param scenario: faults.Scenario
+    :param policy: dict parameters of RetryPolicy
+    :param calls: int number of manager calls
+    :param threads: int number of threads making calls
+    :param timeout: float seconds of request timeout
+    :param seed: int seed of faults
+    :return: dict result
+    """
+    scenario.reset()
+    transport = FaultInjectingTransport(FakeTransport(backend), scenario, seed=seed)
+    counter = AttemptCounter()
+    moira = Moira(FAKE_API_URL, login='benchmark', retry_policy=RetryPolicy(**policy), timeout=timeout,
+                  hooks=[counter], transport=transport)
+    workload_calls = workload(moira, list(backend.triggers))
+    histogram = LatencyHistogram()
+    errors = Counter()
+    lock = threading.Lock()
+    next_call = iter(range(calls))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(next_call, None)
+            if i is None:
+                return
+            name, call = workload_calls[i % len(workload_calls)]
+            start = time.perf_counter()
+            try:
+                call()
+            except Exception as e:
+                with lock:
+                    errors[type(e).__name__] += 1
+            with lock:
+                histogram.record(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    failed = sum(errors.values())
+    return {
+        'scenario': scenario.name,
+        'policy': policy,
+        'calls': calls,
+        'elapsed': elapsed,
+        'throughput': calls / elapsed if elapsed else None,
+        'goodput': (calls - failed) / elapsed if elapsed else None,
+        'error_rate': failed / calls if calls else 0.0,
+        'errors': dict(errors),
+        'attempts': counter.attempts,
+        'retries': counter.retries,
+        # requests sent per manager call, including requests of the call itself
+        'amplification': counter.attempts / calls if calls else None,
+        'injected': dict(transport.injected),
+        'p50_ms': histogram.percentile(50) * 1000 if histogram.count else None,
+        'p99_ms': histogram.percentile(99) * 1000 if histogram.count else None,
+    }
+
+
+def run(scenarios=None, policies=None, calls=DEFAULT_CALLS, threads=1, timeout=DEFAULT_TIMEOUT, triggers=100,
+        seed=0, verbose=False):
+    """
+    Run every scenario with every retry policy
+
+    :param scenarios: list of faults.Scenario, DEFAULT_SCENARIOS by default
+    :param policies: dict of RetryPolicy parameters by policy name, DEFAULT_POLICIES by default
+    :param calls: int number of manager calls per run
+    :param threads: int number of threads making calls
+    :param timeout: float seconds of request timeout
+    :param triggers: int number of triggers of the fake installation
+    :param seed: int seed of installation and faults
+    :param verbose: bool print results to stderr as they are measured
+    :return: dict results
+    """
+    backend = FakeMoira(seed=seed).populate(triggers=triggers, metrics=5, notifications=0)
+    results = []
+    for scenario in scenarios or DEFAULT_SCENARIOS:
+        for policy_name, policy in sorted((policies or DEFAULT_POLICIES).items()):
+            result = run_scenario(backend, scenario, policy, calls, threads, timeout, seed)
+            result['policy_name'] = policy_name
+            results.append(result)
+            if verbose:
+                print(format_result(result), file=sys.stderr)
+    return {
+        'format': RESULTS_FORMAT,
+        'timestamp': int(time.time()),
+        'python': platform.python_version(),
+        'threads': threads,
+        'timeout': timeout,
+        'results': results,
+    }
+
+
+def format_result(result):
+    return '{scenario:<14} {policy_name:<12} {throughput:>9.1f} calls/s  errors {error_rate:>6.1%}  ' \
+           'amplification {amplification:>5.2f}  retries {retries:>5}'.format(**result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark moira-client under injected API faults')
+    parser.add_argument('--scenarios', help='JSON file with a list of scenarios, built-in scenarios by default')
+    parser.add_argument('--policies', help='JSON file with RetryPolicy parameters by policy name')
+    parser.add_argument('--calls', type=int, default=DEFAULT_CALLS, help='manager calls per run')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='request timeout in seconds')
+    parser.add_argument('--triggers', type=int, default=100, help='triggers of the fake installation')
+    parser.add_argument('--output', help='write JSON results to file')
+    args = parser.parse_args(argv)
+
+    policies = None
+    if args.policies:
+        with open(args.policies) as f:
+            policies = json.load(f)
+    results = run(
+        scenarios=load_scenarios(args.scenarios) if args.scenarios else None,
+        policies=policies,
+        calls=args.calls,
+        threads=args.threads,
+        timeout=args.timeout,
+        triggers=args.triggers,
+        verbose=True,
+    )
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
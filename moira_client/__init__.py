@@ -1,2 +1,22 @@
-from moira_client.client import RetryPolicy
-from moira_client.moira import Moira
+import importlib
+
+# names of the package are imported on first use, so that importing it is cheap
+_LAZY_ATTRIBUTES = {
+    'Moira': 'moira_client.moira',
+    'RetryPolicy': 'moira_client.client',
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
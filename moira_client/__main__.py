@@ -0,0 +1,4 @@
+from moira_client.cli import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import random
+import threading
+
+from .compat import monotonic
+
+STRATEGY_LEAST_OUTSTANDING = 'least_outstanding'
+STRATEGY_EWMA = 'ewma'
+
+DEFAULT_PROBE_PATH = 'health/notifier'
+
+
+class Endpoint:
+    def __init__(self, url):
+        """
+
+        :param url: str API URL
+        """
+        self.url = url
+        self.outstanding = 0
+        self.latency = None
+        self.failures = 0
+        self.ejected_at = None
+
+    @property
+    def ejected(self):
+        return self.ejected_at is not None
+
+    def __repr__(self):
+        return '(Endpoint {} outstanding={} latency={} ejected={})'.format(
+            self.url, self.outstanding, self.latency, self.ejected,
+        )
+
+
+class Balancer:
+    """
+    Balances requests between API URLs.
+    An endpoint failing `max_failures` times in a row is ejected: it gets no requests
+    until a background health probe succeeds or `ejection_time` passes.
+    """
+    def __init__(
+            self,
+            urls,
+            strategy=STRATEGY_LEAST_OUTSTANDING,
+            max_failures=3,
+            ejection_time=30,
+            probe=None,
+            probe_interval=5,
+            decay=0.3,
+            clock=monotonic,
+    ):
+        """
+
+        :param urls: iterable of str API URLs
+        :param strategy: str STRATEGY_LEAST_OUTSTANDING or STRATEGY_EWMA
+        :param max_failures: int number of failures in a row ejecting an endpoint
+        :param ejection_time: float seconds after which an ejected endpoint gets requests again
+        :param probe: callable(url) returning True if the API at url is healthy, None to disable probes
+        :param probe_interval: float seconds between probes of ejected endpoints
+        :param decay: float weight of the last latency in EWMA latency
+        :param clock: callable returning monotonic time in seconds
+        """
+        if strategy not in (STRATEGY_LEAST_OUTSTANDING, STRATEGY_EWMA):
+            raise ValueError('Unknown strategy "{}"'.format(strategy))
+        self.endpoints = [Endpoint(url) for url in urls]
+        if not self.endpoints:
+            raise ValueError('At least one URL is required')
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.decay = decay
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._prober = None
+        self._stopped = threading.Event()
+
+    def choose(self, exclude=None):
+        """
+        Choose endpoint for a request
+
+        :param exclude: Endpoint to avoid if possible
+        :return: Endpoint
+        """
+        with self._lock:
+            now = self._clock()
+            candidates = [e for e in self.endpoints if e is not exclude and self._available(e, now)]
+            if not candidates:
+                candidates = [e for e in self.endpoints if self._available(e, now)] or self.endpoints
+            if self.strategy == STRATEGY_EWMA:
+                # endpoints without latency are tried first, outstanding requests penalize latency
+                key = lambda e: (e.latency is not None, (e.latency or 0) * (e.outstanding + 1))
+            else:
+                key = lambda e: e.outstanding
+            best = min(key(e) for e in candidates)
+            return random.choice([e for e in candidates if key(e) == best])
+
+    def start(self, endpoint):
+        """
+        Account a request sent to endpoint
+
+        :param endpoint: Endpoint
+        :return: None
+        """
+        with self._lock:
+            endpoint.outstanding += 1
+
+    def finish(self, endpoint, latency, failed):
+        """
+        Account a request completed by endpoint
+
+        :param endpoint: Endpoint
+        :param latency: float seconds
+        :param failed: bool request failed because of the endpoint
+        :return: None
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.failures += 1
+                if endpoint.failures >= self.max_failures:
+                    # failures of an endpoint retried after ejection_time eject it again
+                    endpoint.ejected_at = self._clock()
+                    self._start_prober()
+                return
+            endpoint.failures = 0
+            endpoint.ejected_at = None
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.decay * (latency - endpoint.latency)
+
+    def ejected(self):
+        """
+        Returns ejected endpoints
+
+        :return: list of Endpoint
+        """
+        with self._lock:
+            return [e for e in self.endpoints if e.ejected]
+
+    def probe_ejected(self):
+        """
+        Probe ejected endpoints and re-admit healthy ones
+
+        :return: list of re-admitted Endpoint
+        """
+        readmitted = []
+        for endpoint in self.ejected():
+            try:
+                healthy = self.probe(endpoint.url)
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    endpoint.failures = 0
+                    endpoint.ejected_at = None
+                readmitted.append(endpoint)
+        return readmitted
+
+    def stop(self):
+        """
+        Stop background probes
+
+        :return: None
+        """
+        self._stopped.set()
+
+    def _available(self, endpoint, now):
+        return not endpoint.ejected or now - endpoint.ejected_at >= self.ejection_time
+
+    def _start_prober(self):
+        if self.probe is None or self._stopped.is_set():
+            return
+        if self._prober is not None and self._prober.is_alive():
+            return
+        self._prober = threading.Thread(target=self._probe_loop, name='moira-balancer-probe')
+        self._prober.daemon = True
+        self._prober.start()
+
+    def _probe_loop(self):
+        while not self._stopped.wait(self.probe_interval):
+            self.probe_ejected()
+            with self._lock:
+                if not any(e.ejected for e in self.endpoints):
+                    # restarted by the next ejection
+                    self._prober = None
+                    return
@@ -0,0 +1,188 @@
+import base64
+import gzip
+import json
+import threading
+import time
+from collections import deque
+from urllib.parse import urlencode
+
+from .compat import monotonic
+from .transport import Response
+from .transport import Transport
+
+CASSETTE_FORMAT = 1
+
+TIMING_FAST = 'fast'
+TIMING_ORIGINAL = 'original'
+
+SCRUBBED = '<scrubbed>'
+# request headers carrying credentials, custom auth headers of Client are added by recording()
+SCRUBBED_HEADERS = ('Authorization', 'Proxy-Authorization', 'Cookie', 'Set-Cookie', 'X-Webauth-User')
+# response headers describing the encoding of the body on the wire, bodies are stored decoded
+_WIRE_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+class CassetteError(Exception):
+    def __init__(self, method, url):
+        super(CassetteError, self).__init__('No recorded response to {} {}'.format(method, url))
+        self.method = method
+        self.url = url
+
+
+def request_key(method, url, params=None):
+    """
+    Returns key matching replayed requests with recorded ones
+
+    :param method: str HTTP method
+    :param url: str URL
+    :param params: dict query parameters
+    :return: str
+    """
+    if params:
+        url += ('&' if '?' in url else '?') + urlencode(sorted((str(k), str(v)) for k, v in params.items()))
+    return method.upper() + ' ' + url
+
+
+def scrub_contacts(value):
+    """
+    Replace values of contacts in a decoded response, e.g. emails and phone numbers
+
+    :param value: decoded JSON
+    :return: decoded JSON with contact values replaced by SCRUBBED
+    """
+    if isinstance(value, list):
+        return [scrub_contacts(item) for item in value]
+    if isinstance(value, dict):
+        if 'type' in value and 'value' in value and isinstance(value['value'], str):
+            value = dict(value, value=SCRUBBED)
+            if value.get('fallback_value'):
+                value['fallback_value'] = SCRUBBED
+            return value
+        return {key: scrub_contacts(item) for key, item in value.items()}
+    return value
+
+
+def _scrub_headers(headers, names):
+    names = {name.lower() for name in names}
+    return {key: SCRUBBED if key.lower() in names else value for key, value in headers.items()}
+
+
+class RecordingTransport(Transport):
+    """
+    Sends requests with a transport and records them with their responses to a cassette,
+    a gzip-compressed JSON lines file
+    """
+    def __init__(self, transport, path, scrub=True, scrub_headers=SCRUBBED_HEADERS):
+        """
+
+        :param transport: Transport sending requests
+        :param path: str cassette file path, overwritten
+        :param scrub: bool replace credentials in headers and values of contacts in responses
+        :param scrub_headers: list of str headers replaced if scrub
+        """
+        self.transport = transport
+        self.path = path
+        self.scrub = scrub
+        self.scrub_headers = tuple(scrub_headers)
+        self.interactions = 0
+        self._start = monotonic()
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._write({'format': CASSETTE_FORMAT, 'created': int(time.time())})
+
+    def request(self, method, url, **kwargs):
+        start = monotonic()
+        r = self.transport.request(method, url, **kwargs)
+        duration = monotonic() - start
+
+        headers = {key: value for key, value in r.headers.items() if key.lower() not in _WIRE_HEADERS}
+        request_headers = dict(kwargs.get('headers') or {})
+        if self.scrub:
+            headers = _scrub_headers(headers, self.scrub_headers)
+            request_headers = _scrub_headers(request_headers, self.scrub_headers)
+        interaction = {
+            'key': request_key(method, url, kwargs.get('params')),
+            'request_headers': request_headers,
+            'status': r.status_code,
+            'headers': headers,
+            'started': start - self._start,
+            'duration': duration,
+        }
+        interaction.update(self._body(r.content))
+        with self._lock:
+            self._write(interaction)
+            self.interactions += 1
+        return r
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _body(self, content):
+        if self.scrub and content:
+            try:
+                content = json.dumps(scrub_contacts(json.loads(content.decode('utf-8')))).encode('utf-8')
+            except ValueError:
+                pass
+        try:
+            return {'body': content.decode('utf-8')}
+        except UnicodeDecodeError:
+            return {'body_base64': base64.b64encode(content).decode('ascii')}
+
+    def _write(self, record):
+        self._file.write(json.dumps(record))
+        self._file.write('\n')
+
+
+def load_cassette(path):
+    """
+    Read interactions of a cassette
+
+    :param path: str cassette file path
+    :return: list of dict interactions in order of recording
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != CASSETTE_FORMAT:
+            raise ValueError('Unsupported cassette format {}'.format(header.get('format')))
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayTransport(Transport):
+    """
+    Answers requests with responses recorded in a cassette. Repeated requests get recorded responses
+    in order of recording, the last one is repeated when they run out.
+    """
+    def __init__(self, path, timing=TIMING_FAST, sleep=time.sleep):
+        """
+
+        :param path: str cassette file path
+        :param timing: str TIMING_FAST to answer at once, TIMING_ORIGINAL to take as long as recorded responses
+        :param sleep: callable sleeping given seconds
+        """
+        if timing not in (TIMING_FAST, TIMING_ORIGINAL):
+            raise ValueError('Unknown timing "{}"'.format(timing))
+        self.timing = timing
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._responses = {}
+        for interaction in load_cassette(path):
+            self._responses.setdefault(interaction['key'], deque()).append(self._response(interaction))
+
+    def request(self, method, url, **kwargs):
+        with self._lock:
+            responses = self._responses.get(request_key(method, url, kwargs.get('params')))
+            if not responses:
+                raise CassetteError(method, url)
+            duration, response = responses.popleft() if len(responses) > 1 else responses[0]
+        if self.timing == TIMING_ORIGINAL and duration:
+            self._sleep(duration)
+        return Response(response.status_code, response.content, response.headers, url)
+
+    def _response(self, interaction):
+        if 'body_base64' in interaction:
+            content = base64.b64decode(interaction['body_base64'])
+        else:
+            content = interaction['body'].encode('utf-8')
+        headers = dict(interaction['headers'], **{'Content-Length': str(len(content))})
+        return interaction['duration'], Response(interaction['status'], content, headers)
@@ -0,0 +1,181 @@
+import threading
+from collections import deque
+
+from .compat import monotonic
+
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint, retry_in):
+        """
+
+        :param endpoint: str endpoint template
+        :param retry_in: float seconds until the circuit lets a trial request through
+        """
+        super(CircuitOpenError, self).__init__(
+            'circuit of {} is open, retry in {:.1f}s'.format(endpoint, retry_in),
+        )
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitSettings:
+    def __init__(
+            self,
+            failure_rate=0.5,
+            slow_call_duration=None,
+            slow_call_rate=0.5,
+            window=20,
+            min_calls=10,
+            open_timeout=30,
+            half_open_calls=1,
+    ):
+        """Thresholds of a circuit.
+
+        :param failure_rate: float share of failed calls opening the circuit
+        :param slow_call_duration: float seconds, calls taking longer are slow. None to ignore latency
+        :param slow_call_rate: float share of slow calls opening the circuit
+        :param window: int number of last calls taken into account
+        :param min_calls: int min number of calls in window to evaluate rates
+        :param open_timeout: float seconds the circuit stays open before trial calls
+        :param half_open_calls: int number of successful trial calls closing the circuit
+        """
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.open_timeout = open_timeout
+        self.half_open_calls = half_open_calls
+
+
+class _Circuit:
+    def __init__(self, settings):
+        self.settings = settings
+        self.state = STATE_CLOSED
+        self.calls = deque(maxlen=settings.window)
+        self.opened_at = None
+        self.trials = 0
+        self.trial_successes = 0
+
+
+class CircuitBreaker:
+    """
+    Fails requests fast while an endpoint is failing or slow.
+    Every endpoint template (e.g. 'trigger/{id}/state') has its own circuit:
+    closed - requests pass, open - requests fail with CircuitOpenError,
+    half-open - a few trial requests pass and close the circuit on success.
+    """
+    def __init__(self, settings=None, endpoint_settings=None, on_state_change=None, clock=monotonic):
+        """
+
+        :param settings: CircuitSettings default thresholds
+        :param endpoint_settings: dict CircuitSettings by endpoint template
+        :param on_state_change: callable(endpoint, old_state, new_state)
+        :param clock: callable returning monotonic time in seconds
+        """
+        self.settings = settings or CircuitSettings()
+        self.endpoint_settings = endpoint_settings or {}
+        self.on_state_change = on_state_change
+        self._clock = clock
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def state(self, endpoint):
+        """
+        Returns state of endpoint circuit
+
+        :param endpoint: str endpoint template
+        :return: str one of STATE_* constants
+        """
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            return circuit.state if circuit else STATE_CLOSED
+
+    def before(self, endpoint):
+        """
+        Let request through or fail it fast
+
+        :param endpoint: str endpoint template
+        :return: None
+
+        :raises: CircuitOpenError
+        """
+        changes = []
+        try:
+            with self._lock:
+                circuit = self._circuit(endpoint)
+                if circuit.state == STATE_OPEN:
+                    retry_in = circuit.opened_at + circuit.settings.open_timeout - self._clock()
+                    if retry_in > 0:
+                        raise CircuitOpenError(endpoint, retry_in)
+                    self._set_state(endpoint, circuit, STATE_HALF_OPEN, changes)
+                if circuit.state == STATE_HALF_OPEN:
+                    if circuit.trials >= circuit.settings.half_open_calls:
+                        raise CircuitOpenError(endpoint, 0)
+                    circuit.trials += 1
+        finally:
+            self._notify(changes)
+
+    def after(self, endpoint, latency, failed):
+        """
+        Account result of request
+
+        :param endpoint: str endpoint template
+        :param latency: float seconds the request took
+        :param failed: bool request failed because of the API
+        :return: None
+        """
+        changes = []
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            settings = circuit.settings
+            slow = settings.slow_call_duration is not None and latency > settings.slow_call_duration
+            if circuit.state == STATE_HALF_OPEN:
+                circuit.trials = max(0, circuit.trials - 1)
+                if failed or slow:
+                    self._open(endpoint, circuit, changes)
+                else:
+                    circuit.trial_successes += 1
+                    if circuit.trial_successes >= settings.half_open_calls:
+                        circuit.calls.clear()
+                        self._set_state(endpoint, circuit, STATE_CLOSED, changes)
+            elif circuit.state == STATE_CLOSED:
+                circuit.calls.append((failed, slow))
+                if len(circuit.calls) >= settings.min_calls:
+                    failures = sum(1 for f, _ in circuit.calls if f)
+                    slow_calls = sum(1 for _, s in circuit.calls if s)
+                    if failures >= settings.failure_rate * len(circuit.calls) or \
+                            slow_calls >= settings.slow_call_rate * len(circuit.calls):
+                        self._open(endpoint, circuit, changes)
+        self._notify(changes)
+
+    def _circuit(self, endpoint):
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = _Circuit(self.endpoint_settings.get(endpoint, self.settings))
+            self._circuits[endpoint] = circuit
+        return circuit
+
+    def _open(self, endpoint, circuit, changes):
+        circuit.opened_at = self._clock()
+        self._set_state(endpoint, circuit, STATE_OPEN, changes)
+
+    def _set_state(self, endpoint, circuit, state, changes):
+        if circuit.state == state:
+            return
+        changes.append((endpoint, circuit.state, state))
+        circuit.state = state
+        circuit.trials = 0
+        circuit.trial_successes = 0
+
+    def _notify(self, changes):
+        # callbacks run outside of the lock so that they may query the breaker
+        if self.on_state_change is None:
+            return
+        for endpoint, old_state, new_state in changes:
+            self.on_state_change(endpoint, old_state, new_state)
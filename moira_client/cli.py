@@ -0,0 +1,437 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import HTTPError
+
+from .compat import monotonic
+from .instrumentation import LatencyHistogram
+from .moira import Moira
+
+MODE_THREADS = 'threads'
+MODE_ASYNCIO = 'asyncio'
+
+DEFAULT_MIX = 'get_state=6,fetch_all=1,events=2'
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DURATION = 10.0
+DEFAULT_FAKE_TRIGGERS = 1000
+
+# options saved in workload profiles
+PROFILE_OPTIONS = (
+    'api_url', 'login', 'mix', 'rps', 'concurrency', 'duration', 'mode', 'timeout', 'seed',
+    'fake', 'fake_triggers', 'fake_latency',
+)
+DEFAULTS = {
+    'api_url': None,
+    'login': None,
+    'mix': DEFAULT_MIX,
+    'rps': None,
+    'concurrency': DEFAULT_CONCURRENCY,
+    'duration': DEFAULT_DURATION,
+    'mode': MODE_THREADS,
+    'timeout': 10.0,
+    'seed': 0,
+    'fake': False,
+    'fake_triggers': DEFAULT_FAKE_TRIGGERS,
+    'fake_latency': 0.005,
+}
+
+
+def _get_state(moira, trigger):
+    moira.trigger.get_state(trigger.id)
+
+
+def _fetch_all(moira, trigger):
+    moira.trigger.fetch_all()
+
+
+def _save(moira, trigger):
+    trigger.update()
+
+
+def _events(moira, trigger):
+    moira.event.fetch_by_trigger(trigger, limit=100)
+
+
+def _tag_stats(moira, trigger):
+    moira.tag.stats()
+
+
+OPERATIONS = {
+    'get_state': _get_state,
+    'fetch_all': _fetch_all,
+    'save': _save,
+    'events': _events,
+    'tag_stats': _tag_stats,
+}
+# operations changing data of Moira, run only on explicit request
+WRITE_OPERATIONS = frozenset(['save'])
+
+
+def parse_mix(mix, allow_writes=False):
+    """
+    Parse weights of operations, e.g. 'get_state=6,fetch_all=1'
+
+    :param mix: str comma separated operation=weight pairs
+    :param allow_writes: bool allow operations changing data of Moira, see WRITE_OPERATIONS
+    :return: list of (str operation, float weight)
+
+    :raises: ValueError
+    """
+    weights = []
+    for item in mix.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError('Unknown operation "{}", expected one of {}'.format(name, ', '.join(sorted(OPERATIONS))))
+        if name in WRITE_OPERATIONS and not allow_writes:
+            raise ValueError('Operation "{}" changes triggers of Moira, pass --allow-writes to run it'.format(name))
+        weights.append((name, float(weight) if weight else 1.0))
+    if not weights:
+        raise ValueError('Empty mix of operations')
+    return weights
+
+
+class BenchReport:
+    """
+    Latencies and errors of operations of a benchmark run
+    """
+    def __init__(self):
+        self.latency = {}
+        self.errors = Counter()
+        self.elapsed = None
+        self._lock = threading.Lock()
+
+    def record(self, operation, latency, error=None):
+        """
+        Add completed operation
+
+        :param operation: str operation name
+        :param latency: float seconds
+        :param error: Exception or None
+        :return: None
+        """
+        with self._lock:
+            histogram = self.latency.get(operation)
+            if histogram is None:
+                histogram = self.latency[operation] = LatencyHistogram()
+            histogram.record(latency)
+            if error is not None:
+                self.errors[(operation, error_name(error))] += 1
+
+    def snapshot(self):
+        """
+        Returns report as a dict
+
+        :return: dict
+        """
+        total = LatencyHistogram()
+        operations = {}
+        with self._lock:
+            for name, histogram in sorted(self.latency.items()):
+                total.merge(histogram)
+                operations[name] = dict(_latency(histogram), errors=sum(
+                    count for (operation, _), count in self.errors.items() if operation == name
+                ))
+            errors = {}
+            for (operation, error), count in self.errors.items():
+                errors.setdefault(operation, {})[error] = count
+        return {
+            'calls': total.count,
+            'elapsed': self.elapsed,
+            'throughput': total.count / self.elapsed if self.elapsed else None,
+            'errors': sum(self.errors.values()),
+            'latency': _latency(total),
+            'operations': operations,
+            'error_breakdown': errors,
+        }
+
+
+def error_name(error):
+    """
+    Returns name of error for reports, with HTTP status of error responses
+
+    :param error: Exception
+    :return: str
+    """
+    name = type(error).__name__
+    if isinstance(error, HTTPError) and error.response is not None:
+        return '{} {}'.format(name, error.response.status_code)
+    return name
+
+
+def _latency(histogram):
+    if not histogram.count:
+        return {'count': 0}
+    return {
+        'count': histogram.count,
+        'mean_ms': histogram.mean * 1000,
+        'p50_ms': histogram.percentile(50) * 1000,
+        'p90_ms': histogram.percentile(90) * 1000,
+        'p99_ms': histogram.percentile(99) * 1000,
+        'max_ms': histogram.max * 1000,
+    }
+
+
+class LoadGenerator:
+    """
+    Calls operations of a mix at a target rate (open loop) or by a number of concurrent workers (closed loop)
+    """
+    def __init__(self, moira, triggers, mix, rps=None, concurrency=DEFAULT_CONCURRENCY, seed=0, clock=monotonic):
+        """
+
+        :param moira: Moira
+        :param triggers: list of Trigger used by operations
+        :param mix: list of (str operation, float weight)
+        :param rps: float target calls per second, None for as many as workers can make
+        :param concurrency: int number of workers, the max number of calls in flight
+        :param seed: int seed of choice of operations and triggers
+        :param clock: callable returning monotonic seconds
+        """
+        self.moira = moira
+        self.triggers = triggers
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.rps = rps
+        self.concurrency = concurrency
+        self.report = BenchReport()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._clock = clock
+
+    def next_call(self):
+        """
+        Choose operation and trigger of the next call
+
+        :return: tuple (str operation, Trigger)
+        """
+        with self._rng_lock:
+            return self._rng.choices(self.names, self.weights)[0], self._rng.choice(self.triggers)
+
+    def call(self, scheduled=None):
+        """
+        Make a call and record it. Latency of scheduled calls counts from the scheduled time,
+        so that a slow API is not hidden by calls delayed behind slow ones.
+
+        :param scheduled: float clock time the call was scheduled at, None for now
+        :return: None
+        """
+        name, trigger = self.next_call()
+        start = self._clock() if scheduled is None else scheduled
+        try:
+            OPERATIONS[name](self.moira, trigger)
+        except Exception as e:
+            self.report.record(name, self._clock() - start, e)
+        else:
+            self.report.record(name, self._clock() - start)
+
+    def run_threads(self, duration):
+        """
+        Run calls in threads for duration seconds
+
+        :param duration: float seconds
+        :return: BenchReport
+        """
+        start = self._clock()
+        end = start + duration
+        if self.rps is None:
+            workers = [threading.Thread(target=self._closed_loop, args=(end,)) for _ in range(self.concurrency)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for scheduled in self._schedule(start, duration):
+                    delay = scheduled - self._clock()
+                    if delay > 0:
+                        time.sleep(delay)
+                    executor.submit(self.call, scheduled)
+        self.report.elapsed = self._clock() - start
+        return self.report
+
+    async def run_asyncio(self, duration):
+        """
+        Run calls from an event loop for duration seconds.
+        Calls of managers are blocking and run in an executor with `concurrency` threads.
+
+        :param duration: float seconds
+        :return: BenchReport
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        start = self._clock()
+        end = start + duration
+        try:
+            if self.rps is None:
+                async def worker():
+                    while self._clock() < end:
+                        await loop.run_in_executor(executor, self.call)
+
+                await asyncio.gather(*[worker() for _ in range(self.concurrency)])
+            else:
+                calls = []
+                for scheduled in self._schedule(start, duration):
+                    delay = scheduled - self._clock()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    calls.append(loop.run_in_executor(executor, self.call, scheduled))
+                await asyncio.gather(*calls)
+        finally:
+            executor.shutdown(wait=True)
+        self.report.elapsed = self._clock() - start
+        return self.report
+
+    def _closed_loop(self, end):
+        while self._clock() < end:
+            self.call()
+
+    def _schedule(self, start, duration):
+        interval = 1.0 / self.rps
+        calls = 0
+        while calls * interval < duration:
+            yield start + calls * interval
+            calls += 1
+
+
+def _fake_transport(options):
+    from .fake import FakeMoira
+    from .fake import FakeTransport
+
+    backend = FakeMoira(seed=options['seed']).populate(
+        triggers=options['fake_triggers'], notifications=0, subscriptions=max(10, options['fake_triggers'] // 10),
+    )
+    return FakeTransport(backend, latency=options['fake_latency'], jitter=options['fake_latency'])
+
+
+def load_options(args):
+    """
+    Merge defaults, options of the workload profile and options of the command line
+
+    :param args: argparse.Namespace
+    :return: dict options
+    """
+    options = dict(DEFAULTS)
+    if args.profile:
+        with open(args.profile) as f:
+            profile = json.load(f)
+        unknown = set(profile) - set(PROFILE_OPTIONS)
+        if unknown:
+            raise ValueError('Unknown options in profile: {}'.format(', '.join(sorted(unknown))))
+        options.update(profile)
+    options.update({name: getattr(args, name) for name in PROFILE_OPTIONS if getattr(args, name) is not None})
+    return options
+
+
+def bench(args, out=sys.stdout):
+    """
+    Run `bench` command
+
+    :param args: argparse.Namespace
+    :param out: file to write the report to
+    :return: dict report
+    """
+    options = load_options(args)
+    if args.save_profile:
+        with open(args.save_profile, 'w') as f:
+            json.dump({name: options[name] for name in PROFILE_OPTIONS}, f, indent=2, sort_keys=True)
+
+    # the in-memory Moira may be written to
+    mix = parse_mix(options['mix'], allow_writes=args.allow_writes or bool(options['fake']))
+    if options['fake']:
+        from .fake import FAKE_API_URL
+
+        moira = Moira(options['api_url'] or FAKE_API_URL, login=options['login'], timeout=options['timeout'],
+                      transport=_fake_transport(options))
+    elif options['api_url']:
+        moira = Moira(options['api_url'], login=options['login'], timeout=options['timeout'])
+    else:
+        raise ValueError('--api-url or --fake is required')
+
+    triggers = moira.trigger.fetch_all()
+    if not triggers:
+        raise ValueError('Moira has no triggers to run operations on')
+    generator = LoadGenerator(moira, triggers, mix, options['rps'], options['concurrency'], options['seed'])
+    if options['mode'] == MODE_ASYNCIO:
+        report = asyncio.run(generator.run_asyncio(options['duration']))
+    else:
+        report = generator.run_threads(options['duration'])
+
+    result = dict(report.snapshot(), options=options)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+    out.write(format_report(result))
+    return result
+
+
+def format_report(result):
+    """
+    Format report of bench command as text
+
+    :param result: dict report
+    :return: str
+    """
+    lines = ['{calls} calls in {elapsed:.2f}s, {throughput:.1f} calls/s, {errors} errors'.format(**result)]
+    row = '{:<12} {:>8} {:>8} {:>10} {:>10} {:>10} {:>10}'
+    lines.append(row.format('operation', 'calls', 'errors', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms'))
+    for name, stats in sorted(result['operations'].items()) + [('total', result['latency'])]:
+        if not stats['count']:
+            continue
+        lines.append(row.format(
+            name, stats['count'], stats.get('errors', result['errors']), '{:.2f}'.format(stats['p50_ms']),
+            '{:.2f}'.format(stats['p90_ms']), '{:.2f}'.format(stats['p99_ms']), '{:.2f}'.format(stats['max_ms']),
+        ))
+    for operation, errors in sorted(result['error_breakdown'].items()):
+        for error, count in sorted(errors.items()):
+            lines.append('{} {}: {}'.format(operation, error, count))
+    return '\n'.join(lines) + '\n'
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='moira-client', description='Moira API client tools')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    bench_parser = commands.add_parser('bench', help='generate load on Moira API with calls of managers')
+    bench_parser.add_argument('--api-url', help='Moira API URL')
+    bench_parser.add_argument('--login', help='login sent in X-Webauth-User header')
+    bench_parser.add_argument('--mix', help='weights of operations {}, default {}'.format(
+        ', '.join(sorted(OPERATIONS)), DEFAULT_MIX))
+    bench_parser.add_argument('--rps', type=float, help='target calls per second, by default as fast as possible')
+    bench_parser.add_argument('--concurrency', type=int, help='max calls in flight, default {}'.format(
+        DEFAULT_CONCURRENCY))
+    bench_parser.add_argument('--duration', type=float, help='seconds to run, default {}'.format(DEFAULT_DURATION))
+    bench_parser.add_argument('--mode', choices=(MODE_THREADS, MODE_ASYNCIO), help='run calls from threads '
+                              'or from an event loop, default threads')
+    bench_parser.add_argument('--timeout', type=float, help='request timeout in seconds')
+    bench_parser.add_argument('--seed', type=int, help='seed of choice of operations')
+    bench_parser.add_argument('--fake', action='store_true', default=None,
+                              help='run against an in-memory Moira instead of --api-url')
+    bench_parser.add_argument('--fake-triggers', type=int, help='triggers of the in-memory Moira')
+    bench_parser.add_argument('--fake-latency', type=float, help='seconds of latency of the in-memory Moira')
+    bench_parser.add_argument('--allow-writes', action='store_true',
+                              help='allow operations changing data of Moira ({})'.format(
+                                  ', '.join(sorted(WRITE_OPERATIONS))))
+    bench_parser.add_argument('--profile', help='JSON workload profile with defaults of these options')
+    bench_parser.add_argument('--save-profile', help='save options of this run as a workload profile')
+    bench_parser.add_argument('--output', help='write JSON report to file')
+    bench_parser.set_defaults(handler=bench)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args)
+    except (ValueError, OSError) as e:
+        parser.exit(2, '{}: error: {}\n'.format(parser.prog, e))
@@ -1,8 +1,59 @@
-from retry.api import retry_call
+import copy
+import functools
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from contextlib import contextmanager
+from email.utils import mktime_tz
+from email.utils import parsedate_tz
+
 from requests import HTTPError
 from requests.auth import HTTPBasicAuth
+from requests.exceptions import ConnectTimeout
+from requests.exceptions import ConnectionError
+from requests.exceptions import Timeout
 import requests
 
+from .codec import get_codec
+from .balancer import Balancer
+from .balancer import DEFAULT_PROBE_PATH
+from .cassette import RecordingTransport
+from .cassette import SCRUBBED_HEADERS
+from .compat import monotonic
+from .compat import string_types
+from .compression import ACCEPT_ENCODINGS
+from .compression import DEFAULT_MIN_SIZE
+from .compression import TransferStats
+from .compression import compress
+from .compression import wire_size
+from .instrumentation import RequestInfo
+from .tracing import NOOP_TRACER
+from .tracing import in_current_context
+from .transport import RequestsTransport
+
+# methods which are safe to repeat: Moira API PUTs may create new objects
+IDEMPOTENT_METHODS = ('GET', 'DELETE')
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# number of requests whose retry allowance may be accumulated by a retry budget
+RETRY_BUDGET_WINDOW = 1000
+
+# seconds, a number or a (connect, read) tuple
+DEFAULT_TIMEOUT = 10
+
+# GET calls with other parameters are never coalesced
+COALESCED_KWARGS = frozenset(['params', 'raw', 'deadline', 'timeout'])
+
+# path segments which are not object ids
+_ENDPOINT_SEGMENTS = frozenset(['stats', 'all', 'notifier', 'settings', 'state', 'metrics', 'throttling', 'test'])
+
+
+def _url_join(base_url, path):
+    return base_url.rstrip('/') + '/' + path.lstrip('/')
+
 
 def raise_for_status_with_body(r):
     try:
@@ -27,6 +78,77 @@ class ResponseStructureError(Exception):
         self.content = content
 
 
+class DeadlineExceeded(Exception):
+    def __init__(self, path):
+        """
+
+        :param path: str api path of request which missed the deadline
+        """
+        super(DeadlineExceeded, self).__init__('deadline exceeded before request to ' + path)
+        self.path = path
+
+
+class Deadline:
+    def __init__(self, seconds, clock=monotonic):
+        """End-to-end time limit of an operation including all its requests and retries.
+
+        :param seconds: float seconds from now
+        :param clock: callable returning monotonic time in seconds
+        """
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    @classmethod
+    def of(cls, deadline):
+        """
+        Returns Deadline given as Deadline, seconds from now or None
+
+        :param deadline: Deadline, float or None
+        :return: Deadline or None
+        """
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+        return cls(deadline)
+
+    def remaining(self):
+        """
+        Returns seconds left
+
+        :return: float, zero or negative if expired
+        """
+        return self.expires_at - self._clock()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+_scope = threading.local()
+
+
+def current_deadline():
+    """
+    Returns deadline set by deadline_scope for the current thread
+
+    :return: Deadline or None
+    """
+    return getattr(_scope, 'deadline', None)
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """
+    Apply deadline to all requests of clients made by the current thread in this context
+
+    :param deadline: Deadline, float seconds or None
+    """
+    previous = current_deadline()
+    _scope.deadline = Deadline.of(deadline)
+    try:
+        yield _scope.deadline
+    finally:
+        _scope.deadline = previous
+
+
 class InvalidJSONError(Exception):
     def __init__(self, content):
         """
@@ -36,54 +158,261 @@ class InvalidJSONError(Exception):
         self.content = content
 
 
+def retry_after(error):
+    """
+    Returns delay requested by Retry-After header of error response
+
+    :param error: Exception
+    :return: float seconds or None
+    """
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, mktime_tz(date) - time.time())
+
+
+def endpoint_template(path):
+    """
+    Returns API endpoint of path with object ids replaced, e.g. 'trigger/{id}/state'
+
+    :param path: str api path
+    :return: str
+    """
+    parts = [part for part in path.split('?', 1)[0].split('/') if part]
+    if not parts:
+        return ''
+    return '/'.join(parts[:1] + [part if part in _ENDPOINT_SEGMENTS else '{id}' for part in parts[1:]])
+
+
+def is_overload(error):
+    """
+    Check whether error shows that API is overloaded
+
+    :param error: Exception
+    :return: bool
+    """
+    if isinstance(error, (ConnectionError, Timeout)):
+        return True
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
 class RetryPolicy:
-    def __init__(self, max_tries=1, delay=0, backoff=1):
+    def __init__(
+        self,
+        max_tries=1,
+        delay=0,
+        backoff=1,
+        max_delay=None,
+        jitter=True,
+        methods=IDEMPOTENT_METHODS,
+        statuses=RETRY_STATUSES,
+        respect_retry_after=True,
+        budget_ratio=0.2,
+        budget_min_retries=10,
+    ):
         """A helper object describing client retry policy.
 
+        Only connection errors, timeouts and responses with one of `statuses` are retried.
+        Requests which failed to connect are retried for any method, other errors
+        only for `methods`.
+
         :param max_tries: maximum number of attempts
         :param delay: delay between attempts in seconds
         :param backoff: multiplier applied to delay between attempts
+        :param max_delay: maximum delay between attempts in seconds
+        :param jitter: bool wait a random time between 0 and the delay (full jitter)
+        :param methods: tuple of str HTTP methods to retry
+        :param statuses: tuple of int HTTP statuses to retry
+        :param respect_retry_after: bool wait as long as Retry-After header of response asks
+        :param budget_ratio: float retries allowed per request of a client
+        :param budget_min_retries: int retries allowed regardless of number of requests
         """
         self.max_tries = max_tries
         self.delay = delay
         self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.methods = tuple(method.upper() for method in methods)
+        self.statuses = tuple(statuses)
+        self.respect_retry_after = respect_retry_after
+        self.budget_ratio = budget_ratio
+        self.budget_min_retries = budget_min_retries
+
+    def is_retryable(self, method, error):
+        """
+        Check whether failed request may be repeated
+
+        :param method: str HTTP method
+        :param error: Exception
+        :return: bool
+        """
+        if isinstance(error, ConnectTimeout):
+            # request was not sent
+            return True
+        if method.upper() not in self.methods:
+            return False
+        if isinstance(error, (ConnectionError, Timeout)):
+            return True
+        if isinstance(error, HTTPError) and error.response is not None:
+            return error.response.status_code in self.statuses
+        return False
+
+    def get_delay(self, attempt, error=None):
+        """
+        Returns delay before next attempt
+
+        :param attempt: int number of failed attempt starting from 1
+        :param error: Exception error of failed attempt
+        :return: float seconds
+        """
+        delay = self.delay * self.backoff ** (attempt - 1)
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if self.respect_retry_after and error is not None:
+            requested = retry_after(error)
+            if requested is not None:
+                if self.max_delay is not None:
+                    requested = min(requested, self.max_delay)
+                delay = max(delay, requested)
+        return delay
+
+
+class RetryBudget:
+    def __init__(self, ratio=0.2, min_retries=10):
+        """Limits retries of a client to a share of its requests,
+        so that retries can't multiply load of an overloaded API.
+
+        :param ratio: float retries allowed per request
+        :param min_retries: int retries allowed regardless of number of requests
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self._balance = float(min_retries)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """
+        Account a request
+
+        :return: None
+        """
+        with self._lock:
+            self._balance = min(self._balance + self.ratio, self.min_retries + RETRY_BUDGET_WINDOW * self.ratio)
+
+    def withdraw(self):
+        """
+        Take a retry from the budget
+
+        :return: True if retry is allowed, False otherwise
+        """
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
 
-    def _as_kwargs(self):
-        return {
-            "tries": self.max_tries,
-            "delay": self.delay,
-            "backoff": self.backoff,
-        }
+def _copy_info(source, target):
+    if source is not None and target is not None:
+        for name in RequestInfo.__slots__:
+            setattr(target, name, getattr(source, name))
 
 
 class Client:
-    def __init__(self, api_url, auth_custom=None, auth_user=None, auth_pass=None, login=None, retry_policy=None):
+    def __init__(
+        self, api_url, auth_custom=None, auth_user=None, auth_pass=None, login=None, retry_policy=None,
+        rate_limiter=None, concurrency_limiter=None, circuit_breaker=None,
+        timeout=DEFAULT_TIMEOUT, endpoint_timeouts=None, codec=None,
+        compress_requests=None, compress_min_size=DEFAULT_MIN_SIZE, revalidation_cache=None,
+        single_flight=None, hedge_policy=None, balancer=None, hooks=None, tracer=None, transport=None,
+    ):
         """
 
-        :param api_url: str Moira API URL
+        :param api_url: str Moira API URL or list of URLs of API instances to balance requests between
         :param auth_custom: dict auth custom headers
         :param auth_user: str auth user
         :param auth_pass: str auth password
         :param login: str auth login
         :param retry_policy: RetryPolicy
+        :param rate_limiter: ratelimit.RateLimiter limits of request rate, may be shared by clients
+        :param concurrency_limiter: ratelimit.ConcurrencyLimiter adaptive limit of requests in flight
+        :param circuit_breaker: circuitbreaker.CircuitBreaker fails requests fast while endpoint is failing
+        :param timeout: float seconds or tuple (connect, read) timeout of a request attempt
+        :param endpoint_timeouts: dict timeouts by endpoint template, e.g. {'tag/stats': (3, 60)}
+        :param codec: str codec name ('json', 'orjson', 'auto') or codec object encoding and decoding JSON
+        :param compress_requests: str content encoding of request bodies ('gzip', 'deflate'),
+            None to send bodies as is. Use it only if the server accepts compressed bodies
+        :param compress_min_size: int min size of request body to compress
+        :param revalidation_cache: revalidation.RevalidationCache of GET responses revalidated
+            with ETag / Last-Modified, None to disable conditional requests
+        :param single_flight: singleflight.SingleFlight coalescing concurrent identical GET requests,
+            None to send every request
+        :param hedge_policy: hedging.HedgePolicy sending duplicates of slow GET requests, None to disable hedging
+        :param balancer: balancer.Balancer of API URLs, by default created if api_url is a list of several URLs
+        :param hooks: list of instrumentation.RequestHooks called before and after every request attempt
+        :param tracer: tracing.Tracer or OpenTelemetry tracer, None to disable tracing
+        :param transport: transport.Transport sending requests, transport.RequestsTransport by default
         """
+        api_urls = [api_url] if isinstance(api_url, string_types) else list(api_url)
+        api_url = api_urls[0]
         if not api_url.endswith('/'):
             self.api_url = api_url + '/'
         else:
             self.api_url = api_url
 
+        if balancer is None and len(api_urls) > 1:
+            balancer = Balancer(api_urls)
+        if balancer is not None and balancer.probe is None:
+            balancer.probe = self._probe
+        self.balancer = balancer
+        self._pinned = threading.local()
+        self.hooks = list(hooks or [])
+        self.tracer = tracer or NOOP_TRACER
+        self.transport = transport if transport is not None else RequestsTransport()
+
         self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = RetryBudget(self.retry_policy.budget_ratio, self.retry_policy.budget_min_retries)
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout
+        self.endpoint_timeouts = endpoint_timeouts or {}
+        self.codec = get_codec(codec)
+        self.compress_requests = compress_requests
+        self.compress_min_size = compress_min_size
+        self.transfer_stats = TransferStats()
+        self.revalidation_cache = revalidation_cache
+        self.single_flight = single_flight
+        self.hedge_policy = hedge_policy
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
 
         self.auth = None
         self.headers = {
             'X-Webauth-User': login,
             'Content-Type': 'application/json',
-            'User-Agent': 'Python Moira Client'
+            'User-Agent': 'Python Moira Client',
+            'Accept-Encoding': ', '.join(ACCEPT_ENCODINGS),
             }
 
         if auth_user and auth_pass:
             self.auth = HTTPBasicAuth(auth_user, auth_pass)
 
+        self._auth_headers = tuple(auth_custom or ())
         if auth_custom:
             self.headers.update(auth_custom)
 
@@ -91,75 +420,399 @@ class Client:
         """
 
         :param path: str api path
-        :param kwargs: additional parameters for request
-        :return: dict response
+        :param kwargs: additional parameters for request, `timeout` overrides timeout of attempts,
+            `deadline` (Deadline or seconds) limits the whole call including retries,
+            `raw` returns undecoded response body,
+            `revalidation_cache` overrides revalidation cache of the client
+        :return: dict response or bytes if raw
+
+        :raises: HTTPError
+        :raises: InvalidJSONError
+        :raises: DeadlineExceeded
+        """
+        if not self._coalesced(kwargs):
+            return self._request('GET', path, **kwargs)
+        deadline = Deadline.of(kwargs.get('deadline')) or current_deadline()
+        if deadline is not None:
+            kwargs['deadline'] = deadline
+        try:
+            return self.single_flight.do(
+                self._flight_key(path, kwargs),
+                lambda: self._request('GET', path, **kwargs),
+                timeout=deadline.remaining() if deadline is not None else None,
+            )
+        except FutureTimeoutError:
+            raise DeadlineExceeded(path)
+
+    async def get_async(self, path='', **kwargs):
+        """
+        GET in a thread of the default executor of the running event loop
+
+        :param path: str api path
+        :param kwargs: additional parameters for request, see get()
+        :return: dict response or bytes if raw
 
         :raises: HTTPError
         :raises: InvalidJSONError
+        :raises: DeadlineExceeded
         """
-        return retry_call(
-            self._get, (path, ), kwargs,
-            **self.retry_policy._as_kwargs(),
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        deadline = Deadline.of(kwargs.get('deadline')) or current_deadline()
+        if deadline is not None:
+            # the thread-local deadline scope does not cross to executor threads
+            kwargs['deadline'] = deadline
+        if not self._coalesced(kwargs):
+            return await loop.run_in_executor(None, in_current_context(functools.partial(self.get, path, **kwargs)))
+        # the call is coalesced here, not once more by the thread-level flight of get()
+        return await self.single_flight.do_async(
+            self._flight_key(path, kwargs),
+            lambda: loop.run_in_executor(
+                None, in_current_context(functools.partial(self._request, 'GET', path, **kwargs)),
+            ),
         )
 
-    def _get(self, path='', **kwargs):
-        r = requests.get(self._path_join(path), timeout=10, headers=self.headers, auth=self.auth, **kwargs)
-        raise_for_status_with_body(r)
+    @contextmanager
+    def pinned(self, endpoint=None):
+        """
+        Send requests of the current thread to one API instance, e.g. to read own writes.
+        Does nothing without a balancer.
+
+        :param endpoint: balancer.Endpoint to pin, by default the current or a newly chosen one
+        :return: context manager yielding pinned balancer.Endpoint or None
+        """
+        if self.balancer is None:
+            yield None
+            return
+        previous = getattr(self._pinned, 'endpoint', None)
+        self._pinned.endpoint = endpoint or previous or self.balancer.choose()
         try:
-            return r.json()
-        except ValueError:
-            raise InvalidJSONError(r.content)
+            yield self._pinned.endpoint
+        finally:
+            self._pinned.endpoint = previous
+
+    @contextmanager
+    def recording(self, path, scrub=True):
+        """
+        Record requests of all threads with their responses to a cassette replayed by cassette.ReplayTransport
+
+        :param path: str cassette file path, overwritten
+        :param scrub: bool replace credentials in headers and values of contacts in responses
+        :return: context manager yielding cassette.RecordingTransport
+        """
+        transport = self.transport
+        recording = RecordingTransport(
+            transport, path, scrub=scrub, scrub_headers=SCRUBBED_HEADERS + self._auth_headers,
+        )
+        self.transport = recording
+        try:
+            yield recording
+        finally:
+            self.transport = transport
+            recording.close()
+
+    def get_models(self, path, build, **kwargs):
+        """
+        GET and build models of response.
+        Models are reused while the response is not modified, see RevalidationCache.
+
+        :param path: str api path
+        :param build: callable(response) returning models
+        :param kwargs: additional parameters for request, see get()
+        :return: models
+        """
+        result = self.get(path, **kwargs)
+        if self.tracer is not NOOP_TRACER:
+            build = self._traced_build(build)
+        if self.revalidation_cache is None:
+            return build(result)
+        return self.revalidation_cache.models(self._cache_key(path, kwargs.get('params')), result, build)
+
+    def _traced_build(self, build):
+        def traced_build(result):
+            with self.tracer.start_as_current_span('build_models'):
+                return build(result)
+        return traced_build
 
     def delete(self, path='', **kwargs):
         """
 
         :param path: str api path
-        :param kwargs: additional parameters for request
-        :return: dict response
+        :param kwargs: additional parameters for request, `timeout` overrides timeout of attempts,
+            `deadline` (Deadline or seconds) limits the whole call including retries,
+            `raw` returns undecoded response body
+        :return: dict response or bytes if raw
 
         :raises: HTTPError
         :raises: InvalidJSONError
+        :raises: DeadlineExceeded
         """
-        return retry_call(
-            self._delete, (path, ), kwargs,
-            **self.retry_policy._as_kwargs(),
-        )
-
-    def _delete(self, path='', **kwargs):
-        r = requests.delete(self._path_join(path), timeout=10, headers=self.headers, auth=self.auth, **kwargs)
-        raise_for_status_with_body(r)
-        # AD-13298: DELETE requests (sometimes?) return a 0-byte response
-        # and this is not an error
-        if len(r.content) == 0:
-            return None
-        else:
-            try:
-                return r.json()
-            except ValueError:
-                raise InvalidJSONError(r.content)
+        return self._request('DELETE', path, **kwargs)
 
     def put(self, path='', **kwargs):
         """
 
         :param path: str api path
-        :param kwargs: additional parameters for request
-        :return: dict response
+        :param kwargs: additional parameters for request, `timeout` overrides timeout of attempts,
+            `deadline` (Deadline or seconds) limits the whole call including retries,
+            `raw` returns undecoded response body
+        :return: dict response or bytes if raw
 
         :raises: HTTPError
         :raises: InvalidJSONError
+        :raises: DeadlineExceeded
         """
-        return retry_call(
-            self._put, (path, ), kwargs,
-            **self.retry_policy._as_kwargs(),
+        return self._request('PUT', path, **kwargs)
+
+    def _request(self, method, path='', **kwargs):
+        deadline = Deadline.of(kwargs.pop('deadline', None)) or current_deadline()
+        timeout = kwargs.pop('timeout', None)
+        self.retry_budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                return self._attempt(method, path, timeout, deadline, attempt, **kwargs)
+            except Exception as e:
+                if attempt >= self.retry_policy.max_tries or \
+                        not self.retry_policy.is_retryable(method, e) or \
+                        not self.retry_budget.withdraw():
+                    raise
+                delay = self.retry_policy.get_delay(attempt, e)
+                if deadline is not None and delay >= deadline.remaining():
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    def _attempt_timeout(self, path, endpoint, timeout, deadline):
+        if timeout is None:
+            timeout = self.endpoint_timeouts.get(endpoint, self.timeout)
+        if deadline is None:
+            return timeout
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(path)
+        if isinstance(timeout, tuple):
+            return tuple(min(t, remaining) if t is not None else remaining for t in timeout)
+        return min(timeout, remaining) if timeout is not None else remaining
+
+    def _attempt(self, method, path='', timeout=None, deadline=None, attempt=1, **kwargs):
+        endpoint = endpoint_template(path)
+        wait = None
+        if deadline is not None:
+            wait = deadline.remaining()
+            if wait <= 0:
+                raise DeadlineExceeded(path)
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(method, path, timeout=wait):
+            raise DeadlineExceeded(path)
+        if self.concurrency_limiter is not None:
+            if deadline is not None:
+                wait = deadline.remaining()
+            if not self.concurrency_limiter.acquire(timeout=wait):
+                raise DeadlineExceeded(path)
+        if self.circuit_breaker is not None:
+            try:
+                self.circuit_breaker.before(endpoint)
+            except Exception:
+                if self.concurrency_limiter is not None:
+                    self.concurrency_limiter.release(None)
+                raise
+
+        info = RequestInfo(method, path, endpoint, attempt) if self.hooks else None
+        start = monotonic()
+        overloaded = False
+        try:
+            for hook in self.hooks:
+                hook.before(info)
+            # waiting for limiters counts against the deadline
+            kwargs['timeout'] = self._attempt_timeout(path, endpoint, timeout, deadline)
+            if self.hedge_policy is not None and self.hedge_policy.applies(method, endpoint):
+                return self._send_hedged(method, path, endpoint, info=info, **kwargs)
+            return self._send(method, path, info=info, **kwargs)
+        except Exception as e:
+            overloaded = is_overload(e)
+            if info is not None:
+                info.error = e
+            raise
+        finally:
+            latency = monotonic() - start
+            if self.concurrency_limiter is not None:
+                self.concurrency_limiter.release(latency, overloaded, method + ' ' + endpoint)
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.after(endpoint, latency, overloaded)
+            if info is not None:
+                info.latency = latency
+                for hook in self.hooks:
+                    hook.after(info)
+
+    def _send_hedged(self, method, path, endpoint, info=None, **kwargs):
+        # requests can not be aborted: the losing request is abandoned and its response dropped
+        policy = self.hedge_policy
+        policy.start()
+        executor = self._hedging_executor()
+        # requests pinned to an API instance stay pinned in executor threads
+        pinned = getattr(self._pinned, 'endpoint', None)
+        target = pinned
+        if target is None and self.balancer is not None and policy.alternate_url is None:
+            target = self.balancer.choose()
+        # attempts run concurrently, each one fills its own copy of request info and kwargs
+        infos = {}
+        start = monotonic()
+        original = self._submit_hedged(executor, infos, info, target, method, path, kwargs)
+        delay = policy.delay(endpoint)
+        if delay is None or wait([original], timeout=delay).done or not policy.try_hedge():
+            try:
+                result = original.result()
+            finally:
+                _copy_info(infos[original], info)
+            policy.observe(endpoint, monotonic() - start)
+            return result
+
+        hedge_target = pinned
+        if hedge_target is None and target is not None:
+            # a hedge sent to the slow instance of the original request would likely be slow too
+            hedge_target = self.balancer.choose(exclude=target)
+        hedge = self._submit_hedged(
+            executor, infos, info, hedge_target, method, path, dict(kwargs, base_url=policy.alternate_url),
         )
-
-    def _put(self, path='', **kwargs):
-        r = requests.put(self._path_join(path), timeout=10, headers=self.headers, auth=self.auth, **kwargs)
-        raise_for_status_with_body(r)
+        pending = [original, hedge]
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        policy.won()
+                    policy.observe(endpoint, monotonic() - start)
+                    _copy_info(infos[future], info)
+                    return future.result()
+        _copy_info(infos[original], info)
+        return original.result()
+
+    def _submit_hedged(self, executor, infos, info, target, method, path, kwargs):
+        attempt_info = copy.copy(info)
+        future = executor.submit(
+            in_current_context(self._send_pinned), target, method, path, info=attempt_info, **kwargs
+        )
+        infos[future] = attempt_info
+        return future
+
+    def _send_pinned(self, endpoint, method, path, **kwargs):
+        if endpoint is None:
+            return self._send(method, path, **kwargs)
+        with self.pinned(endpoint):
+            return self._send(method, path, **kwargs)
+
+    def _hedging_executor(self):
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.hedge_policy.max_workers)
+            return self._hedge_executor
+
+    def _send(self, method, path='', raw=False, base_url=None, info=None, **kwargs):
+        with self.tracer.start_as_current_span('HTTP ' + method) as span:
+            if not span.is_recording():
+                return self._send_in_span(method, path, raw, base_url, info, None, kwargs)
+            span.set_attribute('http.method', method)
+            span.set_attribute('http.route', endpoint_template(path))
+            try:
+                return self._send_in_span(method, path, raw, base_url, info, span, kwargs)
+            except HTTPError as e:
+                if e.response is not None:
+                    span.set_attribute('http.status_code', e.response.status_code)
+                raise
+
+    def _send_in_span(self, method, path, raw, base_url, info, span, kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        headers = self.headers
+        if kwargs.get('json') is not None:
+            kwargs['data'] = self.codec.dumps(kwargs.pop('json'))
+        data = kwargs.get('data')
+        if self.compress_requests and isinstance(data, bytes) and len(data) >= self.compress_min_size:
+            kwargs['data'] = compress(data, self.compress_requests)
+            headers = dict(headers, **{'Content-Encoding': self.compress_requests})
+        cache = kwargs.pop('revalidation_cache', self.revalidation_cache)
+        cache_key = entry = None
+        if method == 'GET' and cache is not None and not raw:
+            cache_key = self._cache_key(path, kwargs.get('params'))
+            entry = cache.get(cache_key)
+            if entry is not None:
+                headers = dict(headers, **entry.conditional_headers())
+        r = self._exchange(method, path, base_url, headers, kwargs, info)
+        if span is not None:
+            span.set_attribute('http.status_code', r.status_code)
+        if raw:
+            return r.content
+        if entry is not None and r.status_code == 304:
+            return cache.hit(cache_key, entry)
+        # AD-13298: DELETE requests (sometimes?) return a 0-byte response
+        # and this is not an error
+        if method == 'DELETE' and len(r.content) == 0:
+            return None
+        start = monotonic()
         try:
-            return r.json()
+            with self.tracer.start_as_current_span('decode'):
+                result = self.codec.loads(r.content)
         except ValueError:
             raise InvalidJSONError(r.content)
+        finally:
+            if info is not None:
+                info.decode_time = monotonic() - start
+        if cache_key is not None:
+            cache.store(cache_key, r.headers, result)
+        return result
+
+    def _exchange(self, method, path, base_url, headers, kwargs, info=None):
+        if base_url is not None or self.balancer is None:
+            url = self._path_join(path) if base_url is None else _url_join(base_url, path)
+            if info is not None:
+                info.url = url
+            r = self.transport.request(method, url, headers=headers, auth=self.auth, **kwargs)
+            self._record_transfer(path, kwargs.get('data'), r, info)
+            raise_for_status_with_body(r)
+            return r
+
+        endpoint = getattr(self._pinned, 'endpoint', None) or self.balancer.choose()
+        self.balancer.start(endpoint)
+        start = monotonic()
+        try:
+            r = self._exchange(method, path, endpoint.url, headers, kwargs, info)
+        except Exception as e:
+            self.balancer.finish(endpoint, monotonic() - start, is_overload(e))
+            raise
+        self.balancer.finish(endpoint, monotonic() - start, False)
+        return r
+
+    def _probe(self, url):
+        r = self.transport.request(
+            'GET', _url_join(url, DEFAULT_PROBE_PATH), headers=self.headers, auth=self.auth, timeout=self.timeout,
+        )
+        raise_for_status_with_body(r)
+        return True
+
+    def _coalesced(self, kwargs):
+        return self.single_flight is not None and COALESCED_KWARGS.issuperset(kwargs)
+
+    def _flight_key(self, path, kwargs):
+        return self._cache_key(path, kwargs.get('params')), bool(kwargs.get('raw'))
+
+    def _cache_key(self, path, params=None):
+        url = self._path_join(path)
+        if params:
+            url = requests.Request('GET', url, params=params).prepare().url
+        return url
+
+    def _record_transfer(self, path, data, r, info=None):
+        sent_bytes = len(data) if isinstance(data, bytes) else 0
+        decoded_bytes = len(r.content)
+        received_bytes = wire_size(r) if decoded_bytes else 0
+        self.transfer_stats.record(endpoint_template(path), sent_bytes, received_bytes, decoded_bytes)
+        if info is not None:
+            info.status = r.status_code
+            info.sent_bytes = sent_bytes
+            info.received_bytes = received_bytes
+            info.decoded_bytes = decoded_bytes
 
     def _path_join(self, *args):
         path = self.api_url
@@ -0,0 +1,81 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .compat import string_types
+
+
+class JSONCodec:
+    """
+    Standard library JSON codec
+    """
+    name = 'json'
+
+    def dumps(self, obj):
+        """
+        Encode object
+
+        :param obj: object
+        :return: bytes
+        """
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        """
+        Decode object
+
+        :param data: bytes or str
+        :return: object
+
+        :raises: ValueError
+        """
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """
+    Fast JSON codec, requires orjson
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('orjson is required for OrjsonCodec')
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+CODECS = {
+    JSONCodec.name: JSONCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+
+def get_codec(codec=None):
+    """
+    Returns codec by name.
+    'auto' selects the fastest installed codec.
+
+    :param codec: str codec name, codec object or None for the standard library codec
+    :return: codec object with dumps and loads methods
+
+    :raises: ValueError
+    """
+    if codec is None:
+        return JSONCodec()
+    if codec == 'auto':
+        return OrjsonCodec() if orjson is not None else JSONCodec()
+    if isinstance(codec, string_types):
+        if codec not in CODECS:
+            raise ValueError('Unknown codec "{}"'.format(codec))
+        return CODECS[codec]()
+    return codec
@@ -0,0 +1,10 @@
+import sys
+import time
+
+
+if sys.version_info[0] >= 3:
+    string_types = (str,)
+else:
+    string_types = (basestring,)  # noqa: F821
+
+monotonic = getattr(time, 'monotonic', time.time)
@@ -0,0 +1,151 @@
+import gzip
+import threading
+import zlib
+
+from urllib3.util.request import ACCEPT_ENCODING
+
+# content codings decoded by urllib3, zstd and br are included when their packages are installed
+ACCEPT_ENCODINGS = tuple(coding.strip() for coding in ACCEPT_ENCODING.split(','))
+
+ENCODING_GZIP = 'gzip'
+ENCODING_DEFLATE = 'deflate'
+
+# request bodies smaller than that are sent as is
+DEFAULT_MIN_SIZE = 1024
+
+
+def compress(data, encoding=ENCODING_GZIP, level=6):
+    """
+    Compress request body
+
+    :param data: bytes
+    :param encoding: str ENCODING_GZIP or ENCODING_DEFLATE
+    :param level: int compression level
+    :return: bytes
+
+    :raises: ValueError
+    """
+    if encoding == ENCODING_GZIP:
+        return gzip.compress(data, compresslevel=level)
+    if encoding == ENCODING_DEFLATE:
+        return zlib.compress(data, level)
+    raise ValueError('Unsupported content encoding "{}"'.format(encoding))
+
+
+def wire_size(response):
+    """
+    Returns number of response body bytes received over the network
+
+    :param response: requests.Response with body read
+    :return: int
+    """
+    raw = getattr(response, 'raw', None)
+    tell = getattr(raw, 'tell', None)
+    if tell is not None:
+        try:
+            size = tell()
+        except (IOError, ValueError):
+            size = None
+        if isinstance(size, int) and size > 0:
+            return size
+    length = getattr(response, 'headers', {}).get('Content-Length')
+    if length is not None and length.isdigit():
+        return int(length)
+    return len(response.content)
+
+
+class Transfer:
+    def __init__(self):
+        self.requests = 0
+        self.sent_bytes = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+
+    @property
+    def ratio(self):
+        """
+        Compression ratio of responses
+
+        :return: float decoded bytes per wire byte, None if nothing was received
+        """
+        if not self.wire_bytes:
+            return None
+        return float(self.decoded_bytes) / self.wire_bytes
+
+    def __repr__(self):
+        return '(Transfer requests={} sent={} wire={} decoded={})'.format(
+            self.requests, self.sent_bytes, self.wire_bytes, self.decoded_bytes,
+        )
+
+
+class TransferStats:
+    """
+    Bytes sent and received by endpoint template (e.g. 'trigger/{id}/state').
+    Wire bytes are response bytes received over the network, decoded bytes are bytes after
+    content decoding.
+    """
+    def __init__(self):
+        self._transfers = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, sent_bytes, wire_bytes, decoded_bytes):
+        """
+        Account a request
+
+        :param endpoint: str endpoint template
+        :param sent_bytes: int request body bytes sent
+        :param wire_bytes: int response body bytes received
+        :param decoded_bytes: int response body bytes after content decoding
+        :return: None
+        """
+        with self._lock:
+            transfer = self._transfers.get(endpoint)
+            if transfer is None:
+                transfer = self._transfers[endpoint] = Transfer()
+            transfer.requests += 1
+            transfer.sent_bytes += sent_bytes
+            transfer.wire_bytes += wire_bytes
+            transfer.decoded_bytes += decoded_bytes
+
+    def get(self, endpoint):
+        """
+        Returns totals of endpoint
+
+        :param endpoint: str endpoint template
+        :return: Transfer
+        """
+        with self._lock:
+            transfer = self._transfers.get(endpoint) or Transfer()
+            return self._copy(transfer)
+
+    def snapshot(self):
+        """
+        Returns totals of all endpoints
+
+        :return: dict Transfer by str endpoint template
+        """
+        with self._lock:
+            return {endpoint: self._copy(transfer) for endpoint, transfer in self._transfers.items()}
+
+    def total(self):
+        """
+        Returns totals of all requests
+
+        :return: Transfer
+        """
+        total = Transfer()
+        for transfer in self.snapshot().values():
+            total.requests += transfer.requests
+            total.sent_bytes += transfer.sent_bytes
+            total.wire_bytes += transfer.wire_bytes
+            total.decoded_bytes += transfer.decoded_bytes
+        return total
+
+    @staticmethod
+    def _copy(transfer):
+        copy = Transfer()
+        copy.requests = transfer.requests
+        copy.sent_bytes = transfer.sent_bytes
+        copy.wire_bytes = transfer.wire_bytes
+        copy.decoded_bytes = transfer.decoded_bytes
+        return copy
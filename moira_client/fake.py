@@ -0,0 +1,546 @@
+import asyncio
+import copy
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from urllib.parse import parse_qsl
+from urllib.parse import urlsplit
+
+from .transport import AsyncTransport
+from .transport import Response
+from .transport import Transport
+
+FAKE_API_URL = 'http://moira.fake/api/'
+FAKE_LOGIN = 'moira-client'
+
+METRIC_STATES = ('OK', 'OK', 'OK', 'OK', 'OK', 'OK', 'WARN', 'ERROR', 'NODATA')
+CONTACT_TYPES = ('mail', 'slack', 'telegram', 'pushover')
+DAYS_OF_WEEK = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+class FakeMoira:
+    """
+    In-memory Moira API backend for offline tests, profiling and load tests.
+    Implements the endpoints used by the managers of this package.
+    """
+    def __init__(self, seed=0, clock=time.time):
+        """
+
+        :param seed: int seed of generated data
+        :param clock: callable returning unix time in seconds
+        """
+        self.seed = seed
+        self.triggers = {}
+        self.states = {}
+        self.contacts = {}
+        self.subscriptions = {}
+        self.events = {}
+        self.notifications = []
+        self.extra_tags = set()
+        self.notifier_state = 'OK'
+        # incremented on every change, used as ETag of responses
+        self.version = 0
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._routes = [
+            ('GET', r'trigger', self._get_triggers),
+            ('PUT', r'trigger', self._put_trigger),
+            ('GET', r'trigger/(?P<id>[^/]+)', self._get_trigger),
+            ('PUT', r'trigger/(?P<id>[^/]+)', self._put_trigger),
+            ('DELETE', r'trigger/(?P<id>[^/]+)', self._delete_trigger),
+            ('GET', r'trigger/(?P<id>[^/]+)/state', self._get_state),
+            ('DELETE', r'trigger/(?P<id>[^/]+)/throttling', self._empty),
+            ('DELETE', r'trigger/(?P<id>[^/]+)/metrics', self._delete_metric),
+            ('GET', r'tag', self._get_tags),
+            ('GET', r'tag/stats', self._get_tag_stats),
+            ('DELETE', r'tag/(?P<tag>[^/]+)', self._delete_tag),
+            ('GET', r'pattern', self._get_patterns),
+            ('DELETE', r'pattern/(?P<pattern>.+)', self._empty),
+            ('GET', r'contact', self._get_contacts),
+            ('PUT', r'contact', self._put_contact),
+            ('DELETE', r'contact/(?P<id>[^/]+)', self._delete_contact),
+            ('GET', r'user/settings', self._get_user_settings),
+            ('GET', r'subscription', self._get_subscriptions),
+            ('PUT', r'subscription', self._put_subscription),
+            ('PUT', r'subscription/(?P<id>[^/]+)', self._put_subscription),
+            ('DELETE', r'subscription/(?P<id>[^/]+)', self._delete_subscription),
+            ('PUT', r'subscription/(?P<id>[^/]+)/test', self._empty),
+            ('DELETE', r'event/all', self._delete_events),
+            ('GET', r'event/(?P<id>[^/]+)', self._get_events),
+            ('GET', r'notification', self._get_notifications),
+            ('DELETE', r'notification/all', self._delete_notifications),
+            ('GET', r'health/notifier', self._get_notifier),
+            ('PUT', r'health/notifier', self._put_notifier),
+        ]
+        self._routes = [(method, re.compile(pattern + '$'), handler) for method, pattern, handler in self._routes]
+
+    def populate(
+            self,
+            triggers=1000,
+            metrics=10,
+            tags=100,
+            tags_per_trigger=3,
+            contacts=50,
+            subscriptions=100,
+            events=10,
+            notifications=100,
+    ):
+        """
+        Generate installation of the given size
+
+        :param triggers: int number of triggers
+        :param metrics: int number of metrics per trigger state
+        :param tags: int number of distinct tags
+        :param tags_per_trigger: int number of tags per trigger
+        :param contacts: int number of contacts of the current user
+        :param subscriptions: int number of subscriptions
+        :param events: int number of events per trigger
+        :param notifications: int number of notifications in the queue
+        :return: FakeMoira
+        """
+        rng = random.Random(self.seed)
+        tag_names = ['tag-{}'.format(i) for i in range(tags)]
+        with self._lock:
+            for i in range(triggers):
+                trigger_id = self._new_id(rng)
+                self.triggers[trigger_id] = self._trigger(trigger_id, {
+                    'name': 'trigger {}'.format(i),
+                    'desc': 'generated trigger {}'.format(i),
+                    'targets': ['servers.host-{}.cpu.*'.format(i % max(1, triggers // 10))],
+                    'tags': rng.sample(tag_names, min(tags_per_trigger, len(tag_names))),
+                    'warn_value': 80,
+                    'error_value': 90,
+                })
+            self._metrics_per_trigger = metrics
+            self._events_per_trigger = events
+            for i in range(contacts):
+                contact_id = self._new_id(rng)
+                contact_type = CONTACT_TYPES[i % len(CONTACT_TYPES)]
+                self.contacts[contact_id] = {
+                    'id': contact_id, 'type': contact_type, 'value': '{}-{}'.format(contact_type, i),
+                    'user': FAKE_LOGIN,
+                }
+            contact_ids = list(self.contacts)
+            for i in range(subscriptions):
+                subscription_id = self._new_id(rng)
+                self.subscriptions[subscription_id] = self._subscription(subscription_id, {
+                    'tags': rng.sample(tag_names, min(2, len(tag_names))),
+                    'contacts': rng.sample(contact_ids, min(2, len(contact_ids))),
+                })
+            trigger_ids = list(self.triggers)
+            now = int(self._clock())
+            for i in range(notifications):
+                trigger_id = trigger_ids[i % len(trigger_ids)] if trigger_ids else ''
+                self.notifications.append({
+                    'id': self._new_id(rng),
+                    'timestamp': now + i,
+                    'contact': self.contacts[contact_ids[i % len(contact_ids)]] if contact_ids else {},
+                    'event': self._event(trigger_id, 'servers.host-{}.cpu.user'.format(i), now, 'ERROR'),
+                    'trigger': {'id': trigger_id, 'name': self.triggers.get(trigger_id, {}).get('name', '')},
+                    'throttled': False,
+                    'send_fail': 0,
+                })
+            self._changed()
+        return self
+
+    def handle(self, method, path, params=None, body=None):
+        """
+        Handle API request
+
+        :param method: str HTTP method
+        :param path: str API path without API URL, e.g. 'trigger/1/state'
+        :param params: dict query parameters
+        :param body: decoded JSON body or None
+        :return: tuple (int status, payload), payload None for an empty body
+        """
+        path = re.sub('/+', '/', path).strip('/')
+        matched_path = False
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            matched_path = True
+            if route_method == method:
+                with self._lock:
+                    return handler(params or {}, body, **match.groupdict())
+        if matched_path:
+            return 405, {'status': 'Method Not Allowed'}
+        return 404, {'status': 'Not Found'}
+
+    def _changed(self):
+        self.version += 1
+
+    def _new_id(self, rng=None):
+        if rng is None:
+            return str(uuid.uuid4())
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def _trigger(self, trigger_id, data):
+        trigger = {
+            'id': trigger_id,
+            'name': '',
+            'desc': '',
+            'targets': [],
+            'warn_value': None,
+            'error_value': None,
+            'trigger_type': 'rising',
+            'tags': [],
+            'ttl_state': 'NODATA',
+            'ttl': 600,
+            'sched': {
+                'days': [{'name': day, 'enabled': True} for day in DAYS_OF_WEEK],
+                'tzOffset': 0, 'startOffset': 0, 'endOffset': 1439,
+            },
+            'expression': '',
+            'patterns': [],
+            'is_remote': False,
+            'mute_new_metrics': False,
+            'throttling': 0,
+            'parents': [],
+            'saturation': [],
+        }
+        trigger.update(data)
+        trigger['id'] = trigger_id
+        trigger['patterns'] = list(trigger['targets'])
+        return trigger
+
+    def _subscription(self, subscription_id, data):
+        subscription = {
+            'id': subscription_id,
+            'contacts': [],
+            'tags': [],
+            'enabled': True,
+            'throttling': True,
+            'sched': {
+                'days': [{'name': day, 'enabled': True} for day in DAYS_OF_WEEK],
+                'tzOffset': 0, 'startOffset': 0, 'endOffset': 1439,
+            },
+            'ignore_warnings': False,
+            'ignore_recoverings': False,
+            'plotting': {'enabled': False, 'theme': 'light'},
+            'escalations': [],
+            'user': FAKE_LOGIN,
+        }
+        subscription.update(data)
+        subscription['id'] = subscription_id
+        return subscription
+
+    def _event(self, trigger_id, metric, timestamp, state):
+        return {
+            'timestamp': timestamp,
+            'metric': metric,
+            'value': 95.0,
+            'trigger_id': trigger_id,
+            'state': state,
+            'old_state': 'OK',
+            'msg': '',
+        }
+
+    def _state(self, trigger_id):
+        state = self.states.get(trigger_id)
+        if state is None:
+            rng = random.Random('{}:{}'.format(self.seed, trigger_id))
+            now = int(self._clock())
+            metrics = {}
+            for i in range(getattr(self, '_metrics_per_trigger', 0)):
+                metric_state = rng.choice(METRIC_STATES)
+                timestamp = now - (3600 * 24 if metric_state == 'NODATA' else rng.randint(0, 60))
+                metrics['servers.host-{}.cpu.user'.format(i)] = {
+                    'state': metric_state,
+                    'timestamp': timestamp,
+                    'event_timestamp': timestamp - rng.randint(0, 3600),
+                    'values': {'t1': round(rng.uniform(0, 100), 2)},
+                    'maintenance': 0,
+                    'suppressed': False,
+                }
+            worst = 'OK'
+            for metric in metrics.values():
+                if metric['state'] in ('ERROR', 'NODATA') or worst == 'OK' and metric['state'] == 'WARN':
+                    worst = 'ERROR' if metric['state'] in ('ERROR', 'NODATA') else 'WARN'
+            state = self.states[trigger_id] = {
+                'trigger_id': trigger_id,
+                'state': worst,
+                'timestamp': now,
+                'score': sum(1 for metric in metrics.values() if metric['state'] != 'OK'),
+                'metrics': metrics,
+            }
+        return state
+
+    def _empty(self, params, body, **kwargs):
+        return 200, None
+
+    def _get_triggers(self, params, body):
+        return 200, {'list': list(self.triggers.values())}
+
+    def _get_trigger(self, params, body, id):
+        trigger = self.triggers.get(id)
+        if trigger is None:
+            return 404, {'status': 'Resource not found', 'error': 'trigger not found'}
+        return 200, trigger
+
+    def _put_trigger(self, params, body, id=None):
+        if not isinstance(body, dict) or not body.get('name') or not body.get('targets'):
+            return 400, {'status': 'Invalid request', 'error': 'trigger name and targets are required'}
+        created = id is None or id not in self.triggers
+        trigger_id = id or body.get('id') or self._new_id()
+        self.triggers[trigger_id] = self._trigger(trigger_id, body)
+        self._changed()
+        return 200, {'id': trigger_id, 'message': 'trigger created' if created else 'trigger updated'}
+
+    def _delete_trigger(self, params, body, id):
+        self.triggers.pop(id, None)
+        self.states.pop(id, None)
+        self._changed()
+        return 200, None
+
+    def _get_state(self, params, body, id):
+        if id not in self.triggers:
+            # Moira answers with an empty state for unknown triggers
+            return 200, {'trigger_id': id, 'metrics': {}}
+        return 200, self._state(id)
+
+    def _delete_metric(self, params, body, id):
+        if id in self.triggers:
+            self._state(id)['metrics'].pop(params.get('name'), None)
+            self._changed()
+        return 200, None
+
+    def _tag_names(self):
+        names = set(self.extra_tags)
+        for trigger in self.triggers.values():
+            names.update(trigger['tags'])
+        for subscription in self.subscriptions.values():
+            names.update(subscription['tags'])
+        return sorted(names)
+
+    def _get_tags(self, params, body):
+        return 200, {'list': self._tag_names()}
+
+    def _get_tag_stats(self, params, body):
+        stats = {name: {'name': name, 'triggers': [], 'subscriptions': []} for name in self._tag_names()}
+        for trigger in self.triggers.values():
+            for tag in trigger['tags']:
+                stats[tag]['triggers'].append(trigger['id'])
+        for subscription in self.subscriptions.values():
+            for tag in subscription['tags']:
+                stats[tag]['subscriptions'].append(subscription)
+        return 200, {'list': list(stats.values())}
+
+    def _delete_tag(self, params, body, tag):
+        if any(tag in trigger['tags'] for trigger in self.triggers.values()):
+            return 400, {'status': 'Invalid request', 'error': 'this tag is assigned to triggers'}
+        self.extra_tags.discard(tag)
+        self._changed()
+        return 200, {'message': 'tag deleted'}
+
+    def _get_patterns(self, params, body):
+        patterns = {}
+        for trigger in self.triggers.values():
+            for target in trigger['targets']:
+                pattern = patterns.get(target)
+                if pattern is None:
+                    pattern = patterns[target] = {'pattern': target, 'metrics': [], 'triggers': []}
+                pattern['triggers'].append(trigger)
+        for pattern in patterns.values():
+            prefix = pattern['pattern'].rstrip('*')
+            pattern['metrics'] = [prefix + name for name in ('user', 'system', 'iowait')]
+        return 200, {'list': list(patterns.values())}
+
+    def _get_contacts(self, params, body):
+        return 200, {'list': list(self.contacts.values())}
+
+    def _put_contact(self, params, body):
+        if not isinstance(body, dict) or not body.get('type') or not body.get('value'):
+            return 400, {'status': 'Invalid request', 'error': 'contact type and value are required'}
+        contact_id = self._new_id()
+        self.contacts[contact_id] = dict(body, id=contact_id, user=FAKE_LOGIN)
+        self._changed()
+        return 200, self.contacts[contact_id]
+
+    def _delete_contact(self, params, body, id):
+        self.contacts.pop(id, None)
+        self._changed()
+        return 200, None
+
+    def _get_user_settings(self, params, body):
+        return 200, {
+            'login': FAKE_LOGIN,
+            'contacts': list(self.contacts.values()),
+            'subscriptions': list(self.subscriptions.values()),
+        }
+
+    def _get_subscriptions(self, params, body):
+        return 200, {'list': list(self.subscriptions.values())}
+
+    def _put_subscription(self, params, body, id=None):
+        if not isinstance(body, dict) or not body.get('tags'):
+            return 400, {'status': 'Invalid request', 'error': 'subscription tags are required'}
+        subscription_id = id or self._new_id()
+        self.subscriptions[subscription_id] = self._subscription(subscription_id, body)
+        self._changed()
+        return 200, self.subscriptions[subscription_id]
+
+    def _delete_subscription(self, params, body, id):
+        self.subscriptions.pop(id, None)
+        self._changed()
+        return 200, None
+
+    def _get_events(self, params, body, id):
+        events = self.events.get(id)
+        if events is None:
+            now = int(self._clock())
+            events = [
+                self._event(id, 'servers.host-{}.cpu.user'.format(i), now - 60 * i, 'ERROR' if i % 2 else 'OK')
+                for i in range(getattr(self, '_events_per_trigger', 0) if id in self.triggers else 0)
+            ]
+            self.events[id] = events
+        page, size = int(params.get('p', 0)), int(params.get('size', 100))
+        return 200, {'list': events[page * size:(page + 1) * size], 'page': page, 'size': size, 'total': len(events)}
+
+    def _delete_events(self, params, body):
+        self.events = {trigger_id: [] for trigger_id in self.triggers}
+        self._changed()
+        return 200, None
+
+    def _get_notifications(self, params, body):
+        start, end = int(params.get('start', 0)), int(params.get('end', -1))
+        notifications = self.notifications[start:] if end == -1 else self.notifications[start:end + 1]
+        return 200, {'list': notifications, 'total': len(self.notifications)}
+
+    def _delete_notifications(self, params, body):
+        del self.notifications[:]
+        self._changed()
+        return 200, None
+
+    def _get_notifier(self, params, body):
+        return 200, {'state': self.notifier_state}
+
+    def _put_notifier(self, params, body):
+        state = (body or {}).get('state')
+        if state not in ('OK', 'ERROR'):
+            return 400, {'status': 'Invalid request', 'error': 'unknown notifier state'}
+        self.notifier_state = state
+        self._changed()
+        return 200, {'state': state}
+
+
+def _decode_body(kwargs, headers):
+    if kwargs.get('json') is not None:
+        return kwargs['json']
+    data = kwargs.get('data')
+    if not data:
+        return None
+    encoding = headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        data = gzip.decompress(data)
+    elif encoding == 'deflate':
+        data = zlib.decompress(data)
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+class FakeTransport(Transport):
+    """
+    Transport answering requests with a FakeMoira backend.
+    GET responses carry an ETag of the backend version and answer 304 to a matching If-None-Match.
+    """
+    def __init__(self, backend=None, latency=0.0, jitter=0.0, sleep=time.sleep, seed=0, cache_responses=False):
+        """
+
+        :param backend: FakeMoira, an empty one by default
+        :param latency: float seconds added to every request
+        :param jitter: float max random seconds added to latency
+        :param sleep: callable sleeping given seconds
+        :param seed: int seed of jitter
+        :param cache_responses: bool reuse encoded GET responses until the backend changes,
+            keeps the cost of the fake server out of client benchmarks
+        """
+        self.backend = backend if backend is not None else FakeMoira()
+        self.latency = latency
+        self.jitter = jitter
+        self.cache_responses = cache_responses
+        self.requests = 0
+        self._responses = {}
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+
+    def request(self, method, url, **kwargs):
+        delay = self._delay()
+        if delay:
+            self._sleep(delay)
+        return self._respond(method, url, kwargs)
+
+    def _delay(self):
+        if not self.jitter:
+            return self.latency
+        return self.latency + self._rng.uniform(0, self.jitter)
+
+    def _respond(self, method, url, kwargs):
+        self.requests += 1
+        headers = kwargs.get('headers') or {}
+        parts = urlsplit(url)
+        path = parts.path
+        base_path = urlsplit(FAKE_API_URL).path
+        if '/api/' in path:
+            path = path.split('/api/', 1)[1]
+        elif path.startswith(base_path):
+            path = path[len(base_path):]
+        params = dict(parse_qsl(parts.query))
+        params.update({key: str(value) for key, value in (kwargs.get('params') or {}).items()})
+        try:
+            body = _decode_body(kwargs, headers)
+        except ValueError:
+            return Response(400, b'{"status":"Invalid request"}', {'Content-Type': 'application/json'}, url)
+
+        etag = '"{}"'.format(self.backend.version)
+        if method == 'GET' and headers.get('If-None-Match') == etag:
+            return Response(304, b'', {'ETag': etag}, url)
+        status, content = self._handle(method, path, params, body)
+        response_headers = {'Content-Type': 'application/json', 'Content-Length': str(len(content))}
+        if method == 'GET' and status == 200:
+            response_headers['ETag'] = etag
+        return Response(status, content, response_headers, url)
+
+    def _handle(self, method, path, params, body):
+        key = (path, tuple(sorted(params.items())))
+        if method == 'GET' and self.cache_responses:
+            version, status, content = self._responses.get(key, (None, None, None))
+            if version == self.backend.version:
+                return status, content
+        version = self.backend.version
+        status, payload = self.backend.handle(method, path, params, copy.deepcopy(body))
+        content = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        if method == 'GET' and self.cache_responses:
+            self._responses[key] = (version, status, content)
+        return status, content
+
+
+class AsyncFakeTransport(AsyncTransport):
+    """
+    FakeTransport for event loops, latency is awaited instead of blocking
+    """
+    def __init__(self, backend=None, latency=0.0, jitter=0.0, seed=0):
+        """
+
+        :param backend: FakeMoira, an empty one by default
+        :param latency: float seconds added to every request
+        :param jitter: float max random seconds added to latency
+        :param seed: int seed of jitter
+        """
+        self._transport = FakeTransport(backend, latency, jitter, seed=seed)
+
+    @property
+    def backend(self):
+        return self._transport.backend
+
+    async def request(self, method, url, **kwargs):
+        delay = self._transport._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._transport._respond(method, url, kwargs)
@@ -0,0 +1,245 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from requests.exceptions import ConnectionError
+from requests.exceptions import ReadTimeout
+
+from .client import endpoint_template
+from .transport import Response
+from .transport import Transport
+
+FAULT_LATENCY = 'latency'
+FAULT_RESET = 'reset'
+FAULT_STATUS = 'status'
+FAULT_TRUNCATE = 'truncate'
+FAULT_EMPTY_BODY = 'empty_body'
+
+FAULTS = (FAULT_LATENCY, FAULT_RESET, FAULT_STATUS, FAULT_TRUNCATE, FAULT_EMPTY_BODY)
+
+
+class Fault:
+    """
+    Fault injected in requests matching its methods and endpoints.
+    Every matching request is counted; the fault applies to `count` requests after the first `start` ones
+    (repeated every `period` requests if given) with the given probability.
+    """
+    def __init__(
+            self,
+            type,
+            probability=1.0,
+            methods=None,
+            endpoints=None,
+            start=0,
+            count=None,
+            period=None,
+            delay=0.0,
+            jitter=0.0,
+            status=503,
+            retry_after=None,
+            ratio=0.5,
+    ):
+        """
+
+        :param type: str one of FAULT_* constants
+        :param probability: float 0..1 probability to inject the fault in a request of its window
+        :param methods: list of str HTTP methods, None for all
+        :param endpoints: list of str endpoint templates or their prefixes, e.g. 'trigger/{id}/state', None for all
+        :param start: int number of matching requests passed before the fault starts
+        :param count: int number of matching requests in the window of the fault, None for unlimited
+        :param period: int number of matching requests after which the window repeats, None to not repeat
+        :param delay: float seconds of FAULT_LATENCY, longer than the read timeout raises ReadTimeout
+        :param jitter: float max random seconds added to delay
+        :param status: int HTTP status of FAULT_STATUS
+        :param retry_after: float seconds of Retry-After header of FAULT_STATUS, None to omit it
+        :param ratio: float share of the body kept by FAULT_TRUNCATE
+        """
+        if type not in FAULTS:
+            raise ValueError('Unknown fault "{}", expected one of {}'.format(type, ', '.join(FAULTS)))
+        self.type = type
+        self.probability = probability
+        self.methods = tuple(method.upper() for method in methods) if methods else None
+        self.endpoints = tuple(endpoints) if endpoints else None
+        self.start = start
+        self.count = count
+        self.period = period
+        self.delay = delay
+        self.jitter = jitter
+        self.status = status
+        self.retry_after = retry_after
+        self.ratio = ratio
+        self.seen = 0
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create fault from its declaration, e.g. {"type": "status", "status": 503, "start": 100, "count": 20}
+
+        :param data: dict parameters of Fault
+        :return: Fault
+        """
+        return cls(**data)
+
+    def matches(self, method, endpoint):
+        """
+        Check whether request is subject to the fault
+
+        :param method: str HTTP method
+        :param endpoint: str endpoint template
+        :return: bool
+        """
+        if self.methods is not None and method.upper() not in self.methods:
+            return False
+        if self.endpoints is not None and not endpoint.startswith(self.endpoints):
+            return False
+        return True
+
+    def fires(self, rng):
+        """
+        Count a matching request and check whether the fault is injected in it
+
+        :param rng: random.Random
+        :return: bool
+        """
+        position = self.seen
+        self.seen += 1
+        if self.period:
+            position %= self.period
+        if position < self.start:
+            return False
+        if self.count is not None and position >= self.start + self.count:
+            return False
+        return self.probability >= 1 or rng.random() < self.probability
+
+
+class Scenario:
+    """
+    Named list of faults
+    """
+    def __init__(self, name, faults=None, description=''):
+        """
+
+        :param name: str scenario name
+        :param faults: list of Fault or dicts declaring faults
+        :param description: str
+        """
+        self.name = name
+        self.faults = [fault if isinstance(fault, Fault) else Fault.from_dict(fault) for fault in faults or []]
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create scenario from its declaration, e.g. {"name": "brownout", "faults": [{"type": "reset"}]}
+
+        :param data: dict
+        :return: Scenario
+        """
+        return cls(data['name'], data.get('faults'), data.get('description', ''))
+
+    def reset(self):
+        """
+        Forget requests counted by faults, e.g. before the scenario is run again
+
+        :return: None
+        """
+        for fault in self.faults:
+            fault.seen = 0
+
+
+def load_scenarios(path):
+    """
+    Load scenarios from a JSON file with a list of scenario declarations
+
+    :param path: str file path
+    :return: list of Scenario
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data['scenarios']
+    return [Scenario.from_dict(scenario) for scenario in data]
+
+
+def _api_path(url):
+    path = urlsplit(url).path
+    if '/api/' in path:
+        return path.split('/api/', 1)[1]
+    return path
+
+
+def _read_timeout(timeout):
+    if isinstance(timeout, tuple):
+        return timeout[1]
+    return timeout
+
+
+class FaultInjectingTransport(Transport):
+    """
+    Wraps a transport and injects faults of a scenario: latency, connection resets,
+    error statuses, truncated and empty bodies.
+    """
+    def __init__(self, transport, scenario, seed=0, sleep=time.sleep):
+        """
+
+        :param transport: Transport sending requests without faults, e.g. fake.FakeTransport
+        :param scenario: Scenario
+        :param seed: int seed of fault probabilities
+        :param sleep: callable sleeping given seconds
+        """
+        self.transport = transport
+        self.scenario = scenario
+        self.requests = 0
+        self.injected = Counter()
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        delay, fault = self._faults(method, endpoint_template(_api_path(url)))
+        if delay:
+            timeout = _read_timeout(kwargs.get('timeout'))
+            if timeout is not None and delay >= timeout:
+                self._sleep(timeout)
+                raise ReadTimeout('Injected delay of {:.3f}s exceeds read timeout'.format(delay))
+            self._sleep(delay)
+        if fault is None:
+            return self.transport.request(method, url, **kwargs)
+        if fault.type == FAULT_RESET:
+            raise ConnectionError(ConnectionResetError(104, 'Connection reset by peer'))
+        if fault.type == FAULT_STATUS:
+            headers = {'Content-Type': 'application/json'}
+            if fault.retry_after is not None:
+                headers['Retry-After'] = str(fault.retry_after)
+            content = json.dumps({'status': 'Injected fault', 'error': str(fault.status)}).encode('utf-8')
+            return Response(fault.status, content, headers, url)
+        r = self.transport.request(method, url, **kwargs)
+        if fault.type == FAULT_TRUNCATE:
+            content = r.content[:int(len(r.content) * fault.ratio)]
+        else:
+            content = b''
+        headers = dict(r.headers, **{'Content-Length': str(len(content))})
+        return Response(r.status_code, content, headers, r.url)
+
+    def close(self):
+        self.transport.close()
+
+    def _faults(self, method, endpoint):
+        delay = 0.0
+        fault = None
+        with self._lock:
+            self.requests += 1
+            for candidate in self.scenario.faults:
+                if not candidate.matches(method, endpoint) or not candidate.fires(self._rng):
+                    continue
+                if candidate.type == FAULT_LATENCY:
+                    delay += candidate.delay + (self._rng.uniform(0, candidate.jitter) if candidate.jitter else 0)
+                elif fault is None:
+                    fault = candidate
+                else:
+                    continue
+                self.injected[candidate.type] += 1
+        return delay, fault
@@ -0,0 +1,148 @@
+import threading
+from collections import deque
+
+DEFAULT_WINDOW = 1000
+# the hedge delay is recomputed after that many observed latencies
+_RECOMPUTE_EVERY = 16
+
+
+class _Latencies:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.delay = None
+        self.observed = 0
+
+
+class HedgePolicy:
+    """
+    Hedging of GET requests: if a request is not answered within a percentile of latencies
+    of its endpoint template, a duplicate request is sent and the first response wins.
+    Hedges are limited by a budget of the share of requests sent.
+    """
+    def __init__(
+            self,
+            percentile=95,
+            min_samples=20,
+            min_delay=0.005,
+            max_delay=None,
+            budget_ratio=0.05,
+            window=DEFAULT_WINDOW,
+            endpoints=None,
+            alternate_url=None,
+            max_workers=16,
+    ):
+        """
+
+        :param percentile: float percentile of endpoint latencies to wait before hedging
+        :param min_samples: int min number of endpoint latencies observed before hedging
+        :param min_delay: float min seconds to wait before hedging
+        :param max_delay: float max seconds to wait before hedging, None for no limit
+        :param budget_ratio: float max share of hedged requests among the last `window` requests
+        :param window: int number of last latencies and requests taken into account
+        :param endpoints: iterable of str endpoint templates to hedge, None to hedge all GET requests
+        :param alternate_url: str API URL of another replica to send hedges to, None to use the client URL
+        :param max_workers: int max number of hedged GET requests of a client in flight, including hedges,
+            further hedged requests wait for a free worker
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.window = window
+        self.endpoints = frozenset(endpoints) if endpoints is not None else None
+        self.alternate_url = alternate_url
+        self.max_workers = max_workers
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies = {}
+        self._recent = deque(maxlen=window)
+        self._recent_hedges = 0
+        self._lock = threading.Lock()
+
+    def applies(self, method, endpoint):
+        """
+        Check whether requests to endpoint may be hedged
+
+        :param method: str HTTP method
+        :param endpoint: str endpoint template
+        :return: bool
+        """
+        return method == 'GET' and (self.endpoints is None or endpoint in self.endpoints)
+
+    def delay(self, endpoint):
+        """
+        Returns seconds to wait for a response before hedging
+
+        :param endpoint: str endpoint template
+        :return: float or None if there are not enough observed latencies
+        """
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            return latencies.delay if latencies is not None else None
+
+    def observe(self, endpoint, latency):
+        """
+        Account latency of a response
+
+        :param endpoint: str endpoint template
+        :param latency: float seconds
+        :return: None
+        """
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = _Latencies(self.window)
+            latencies.samples.append(latency)
+            latencies.observed += 1
+            if len(latencies.samples) >= self.min_samples and \
+                    (latencies.delay is None or latencies.observed % _RECOMPUTE_EVERY == 0):
+                latencies.delay = self._percentile_delay(latencies.samples)
+
+    def start(self):
+        """
+        Account a request
+
+        :return: None
+        """
+        with self._lock:
+            self.requests += 1
+            self._record(False)
+
+    def try_hedge(self):
+        """
+        Withdraw a hedge from the budget
+
+        :return: True if hedge is allowed, False otherwise
+        """
+        with self._lock:
+            if self._recent_hedges + 1 > self.budget_ratio * len(self._recent):
+                return False
+            self.hedges += 1
+            self._record(True)
+            return True
+
+    def won(self):
+        """
+        Account a hedge answered before the original request
+
+        :return: None
+        """
+        with self._lock:
+            self.hedge_wins += 1
+
+    def _record(self, hedged):
+        if len(self._recent) == self._recent.maxlen and self._recent[0]:
+            self._recent_hedges -= 1
+        self._recent.append(hedged)
+        if hedged:
+            self._recent_hedges += 1
+
+    def _percentile_delay(self, samples):
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))
+        delay = max(ordered[index], self.min_delay)
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        return delay
@@ -0,0 +1,240 @@
+import math
+import threading
+
+# latencies are recorded in microseconds
+_UNIT = 1e-6
+
+
+class RequestInfo:
+    """
+    Request attempt passed to hooks. Fields of the response are None in before().
+    """
+    __slots__ = (
+        'method', 'path', 'endpoint', 'attempt', 'url', 'status', 'sent_bytes', 'received_bytes',
+        'decoded_bytes', 'decode_time', 'latency', 'error',
+    )
+
+    def __init__(self, method, path, endpoint, attempt):
+        """
+
+        :param method: str HTTP method
+        :param path: str api path
+        :param endpoint: str endpoint template, e.g. 'trigger/{id}/state'
+        :param attempt: int number of attempt starting with 1
+        """
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.attempt = attempt
+        self.url = None
+        self.status = None
+        self.sent_bytes = 0
+        self.received_bytes = 0
+        self.decoded_bytes = 0
+        self.decode_time = 0.0
+        self.latency = None
+        self.error = None
+
+    def __repr__(self):
+        return '(RequestInfo {} {} attempt={} status={} latency={})'.format(
+            self.method, self.path, self.attempt, self.status, self.latency,
+        )
+
+
+class RequestHooks:
+    """
+    Base class of Client hooks, called in the thread sending the request.
+    Exceptions of hooks are raised to the caller.
+    """
+    def before(self, info):
+        """
+        Called before a request attempt is sent
+
+        :param info: RequestInfo
+        :return: None
+        """
+
+    def after(self, info):
+        """
+        Called after a request attempt completed or failed
+
+        :param info: RequestInfo with response fields
+        :return: None
+        """
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of durations: values below 2 ** significant_bits microseconds
+    are exact, larger values are counted in buckets with relative width 2 ** (1 - significant_bits).
+    """
+    def __init__(self, significant_bits=8):
+        """
+
+        :param significant_bits: int precision, 8 bits keep relative error below 1%
+        """
+        self.significant_bits = significant_bits
+        self._half = 1 << (significant_bits - 1)
+        self.counts = []
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        """
+        Add duration
+
+        :param seconds: float
+        :return: None
+        """
+        value = max(0, int(round(seconds / _UNIT)))
+        index = self._index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other):
+        """
+        Add durations of other histogram of the same precision
+
+        :param other: LatencyHistogram
+        :return: None
+        """
+        if other.count == 0:
+            return
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percentile):
+        """
+        Returns duration below which the given percent of durations fall
+
+        :param percentile: float 0..100
+        :return: float seconds or None if empty
+        """
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(percentile / 100.0 * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._upper(index) * _UNIT, self.max)
+        return self.max
+
+    def snapshot(self):
+        """
+        Returns summary of durations
+
+        :return: dict
+        """
+        return {
+            'count': self.count,
+            'min': self.min,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max,
+        }
+
+    def _index(self, value):
+        if value < 2 * self._half:
+            return value
+        exponent = value.bit_length() - self.significant_bits
+        return exponent * self._half + (value >> exponent)
+
+    def _upper(self, index):
+        if index < 2 * self._half:
+            return index
+        exponent = index // self._half - 1
+        mantissa = index - exponent * self._half
+        return ((mantissa + 1) << exponent) - 1
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.statuses = {}
+        self.sent_bytes = 0
+        self.received_bytes = 0
+        self.decoded_bytes = 0
+        self.latency = LatencyHistogram()
+        self.decode_time = LatencyHistogram()
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'errors': self.errors,
+            'statuses': dict(self.statuses),
+            'sent_bytes': self.sent_bytes,
+            'received_bytes': self.received_bytes,
+            'decoded_bytes': self.decoded_bytes,
+            'latency': self.latency.snapshot(),
+            'decode_time': self.decode_time.snapshot(),
+        }
+
+
+class Metrics(RequestHooks):
+    """
+    Counters and latency histograms of request attempts by endpoint template
+    """
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def after(self, info):
+        with self._lock:
+            metrics = self._endpoints.get(info.endpoint)
+            if metrics is None:
+                metrics = self._endpoints[info.endpoint] = EndpointMetrics()
+            metrics.requests += 1
+            if info.attempt > 1:
+                metrics.retries += 1
+            if info.error is not None:
+                metrics.errors += 1
+            if info.status is not None:
+                metrics.statuses[info.status] = metrics.statuses.get(info.status, 0) + 1
+            metrics.sent_bytes += info.sent_bytes
+            metrics.received_bytes += info.received_bytes
+            metrics.decoded_bytes += info.decoded_bytes
+            metrics.latency.record(info.latency)
+            if info.decode_time:
+                metrics.decode_time.record(info.decode_time)
+
+    def snapshot(self):
+        """
+        Returns metrics of all endpoints
+
+        :return: dict of dict metrics by str endpoint template
+        """
+        with self._lock:
+            return {endpoint: metrics.snapshot() for endpoint, metrics in self._endpoints.items()}
+
+    def reset(self):
+        """
+        Forget all metrics
+
+        :return: None
+        """
+        with self._lock:
+            self._endpoints.clear()
@@ -1,4 +1,24 @@
-from .trigger import Trigger
-from .contact import Contact
-from .pattern import Pattern
-from .subscription import Subscription
+import importlib
+
+# models are imported on first use, e.g. trigger models import numpy for state tables only when needed
+_LAZY_ATTRIBUTES = {
+    'Trigger': 'moira_client.models.trigger',
+    'Contact': 'moira_client.models.contact',
+    'Pattern': 'moira_client.models.pattern',
+    'Subscription': 'moira_client.models.subscription',
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
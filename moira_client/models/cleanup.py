@@ -0,0 +1,202 @@
+import errno
+import fnmatch
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import RequestException
+
+from ..client import Deadline
+from ..client import DeadlineExceeded
+from ..client import InvalidJSONError
+from ..client import deadline_scope
+from ..compat import string_types
+from ..ratelimit import TokenBucket
+from ..tracing import in_current_context
+from .state import DEFAULT_MAX_WORKERS
+from .state import fetch_states
+from .trigger import STATE_NODATA
+
+
+StaleMetric = namedtuple('StaleMetric', ['trigger_id', 'metric', 'state', 'timestamp'])
+
+
+class CleanupReport:
+    def __init__(self, dry_run):
+        """
+
+        :param dry_run: bool nothing was removed
+        """
+        self.dry_run = dry_run
+        self.selected = []
+        self.removed = []
+        self.skipped = []
+        self.failed = []
+        self.scan_errors = {}
+        self.remove_errors = {}
+
+    def __repr__(self):
+        return '(CleanupReport selected={} removed={} skipped={} failed={} scan_errors={} dry_run={})'.format(
+            len(self.selected), len(self.removed), len(self.skipped), len(self.failed), len(self.scan_errors),
+            self.dry_run,
+        )
+
+
+class MetricCleaner:
+    """
+    Removes metrics from trigger states in bulk, e.g. NODATA metrics of decommissioned hosts.
+    A metric is selected if it matches all given criteria.
+    """
+    def __init__(
+            self,
+            trigger_manager,
+            states=(STATE_NODATA,),
+            max_age=None,
+            pattern=None,
+            max_workers=DEFAULT_MAX_WORKERS,
+            rate=None,
+            progress_log=None,
+            clock=time.time,
+    ):
+        """
+
+        :param trigger_manager: TriggerManager
+        :param states: iterable of str metric states to select, None to select any state
+        :param max_age: int select metrics without values for at least max_age seconds,
+            metrics without timestamp are never selected by age
+        :param pattern: str shell-style metric name pattern or compiled regular expression
+        :param max_workers: int number of parallel requests
+        :param rate: float max DELETE requests per second, None for no limit
+        :param progress_log: str path of a file with removed metrics, removals listed there are skipped
+        :param clock: callable returning unix time in seconds
+        """
+        self._trigger_manager = trigger_manager
+        self.states = set(states) if states is not None else None
+        self.max_age = max_age
+        self.pattern = pattern
+        self.max_workers = max_workers
+        self.progress_log = progress_log
+        self._bucket = TokenBucket(rate) if rate else None
+        self._clock = clock
+        self._log_lock = threading.Lock()
+
+    def match(self, name, metric, now):
+        """
+        Check whether metric of trigger state should be removed
+
+        :param name: str metric name
+        :param metric: dict metric state
+        :param now: int unix time
+        :return: bool
+        """
+        if self.states is not None and metric.get('state') not in self.states:
+            return False
+        if self.max_age is not None:
+            timestamp = metric.get('timestamp')
+            if timestamp is None or now - timestamp < self.max_age:
+                return False
+        if self.pattern is not None:
+            if isinstance(self.pattern, string_types):
+                if not fnmatch.fnmatchcase(name, self.pattern):
+                    return False
+            elif not self.pattern.search(name):
+                return False
+        return True
+
+    def scan(self, trigger_ids=None, errors=None, deadline=None):
+        """
+        Fetch states of triggers concurrently and select metrics to remove
+
+        :param trigger_ids: iterable of str trigger id, all triggers if None
+        :param errors: dict to collect errors by trigger id, triggers failed to fetch are skipped.
+            If None, the first error is raised.
+        :param deadline: client.Deadline or float seconds limiting all requests
+        :return: list of StaleMetric
+        """
+        deadline = Deadline.of(deadline)
+        if trigger_ids is None:
+            with deadline_scope(deadline):
+                trigger_ids = [trigger.id for trigger in self._trigger_manager.fetch_all()]
+
+        now = self._clock()
+        selected = []
+        states = fetch_states(self._trigger_manager, trigger_ids, self.max_workers, errors=errors, deadline=deadline)
+        for trigger_id, state in states:
+            for name, metric in (state.get('metrics') or {}).items():
+                if self.match(name, metric, now):
+                    selected.append(StaleMetric(trigger_id, name, metric.get('state'), metric.get('timestamp')))
+        return selected
+
+    def run(self, trigger_ids=None, dry_run=False, deadline=None):
+        """
+        Remove selected metrics.
+        Metrics not removed before the deadline are reported as failed.
+
+        :param trigger_ids: iterable of str trigger id, all triggers if None
+        :param dry_run: bool only report metrics which would be removed
+        :param deadline: client.Deadline or float seconds limiting the whole run
+        :return: CleanupReport
+        """
+        deadline = Deadline.of(deadline)
+        report = CleanupReport(dry_run)
+        report.selected = self.scan(trigger_ids, errors=report.scan_errors, deadline=deadline)
+        done = self._read_progress()
+
+        pending = []
+        for item in report.selected:
+            if (item.trigger_id, item.metric) in done:
+                report.skipped.append(item)
+            else:
+                pending.append(item)
+
+        if dry_run:
+            return report
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(in_current_context(self._remove), item, deadline) for item in pending]
+            for item, future in zip(pending, futures):
+                ok, error = future.result()
+                if ok:
+                    report.removed.append(item)
+                else:
+                    report.failed.append(item)
+                    if error is not None:
+                        report.remove_errors[(item.trigger_id, item.metric)] = error
+        return report
+
+    def _remove(self, item, deadline=None):
+        try:
+            with deadline_scope(deadline):
+                if self._bucket is not None:
+                    timeout = deadline.remaining() if deadline is not None else None
+                    if not self._bucket.acquire(timeout=timeout):
+                        raise DeadlineExceeded(item.trigger_id)
+                ok = self._trigger_manager.remove_metric(item.trigger_id, item.metric)
+        except (RequestException, InvalidJSONError, DeadlineExceeded) as e:
+            return False, e
+        if ok:
+            self._write_progress(item)
+        return ok, None
+
+    def _read_progress(self):
+        done = set()
+        if not self.progress_log:
+            return done
+        try:
+            with open(self.progress_log) as f:
+                for line in f:
+                    trigger_id, sep, metric = line.rstrip('\n').partition('\t')
+                    if sep:
+                        done.add((trigger_id, metric))
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        return done
+
+    def _write_progress(self, item):
+        if not self.progress_log:
+            return
+        with self._log_lock:
+            with open(self.progress_log, 'a') as f:
+                f.write('{}\t{}\n'.format(item.trigger_id, item.metric))
@@ -1,5 +1,6 @@
 from ..client import InvalidJSONError
 from ..client import ResponseStructureError
+from ..tracing import traced
 from .base import Base
 
 CONTACT_EMAIL = 'mail'
@@ -29,6 +30,7 @@ class ContactManager:
     def __init__(self, client):
         self._client = client
 
+    @traced
     def add(self, value, contact_type, fallback_value=None):
         """
         Add new contact
@@ -61,6 +63,7 @@ class ContactManager:
 
         return Contact(id=result['id'], **data)
 
+    @traced
     def fetch_all(self):
         """
         Returns all existing contacts
@@ -80,6 +83,7 @@ class ContactManager:
 
         return contacts
 
+    @traced
     def fetch_by_current_user(self):
         """
         Returns all contacts by current user
@@ -99,6 +103,7 @@ class ContactManager:
 
         return contacts
 
+    @traced
     def get_id(self, type, value):
         """
         Returns contact id by type and value
@@ -112,6 +117,7 @@ class ContactManager:
             if contact.type == type and contact.value == value:
                 return contact.id
 
+    @traced
     def delete(self, contact_id):
         """
         Delete contact by contact id
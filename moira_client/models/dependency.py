@@ -0,0 +1,218 @@
+from collections import deque
+
+from ..compat import string_types
+
+
+class CycleError(Exception):
+    def __init__(self, cycle):
+        """
+
+        :param cycle: list of trigger keys forming a cycle
+        """
+        super(CycleError, self).__init__('trigger parents form a cycle: ' + ' -> '.join(cycle))
+        self.cycle = cycle
+
+
+def trigger_key(trigger):
+    """
+    Returns graph key of trigger: its id or a placeholder for unsaved triggers
+
+    :param trigger: Trigger or str trigger id
+    :return: str
+    """
+    if isinstance(trigger, string_types):
+        return trigger
+    if trigger.id:
+        return trigger.id
+    return 'local:{}'.format(id(trigger))
+
+
+class TriggerGraph:
+    """
+    Dependency graph of triggers built from `Trigger.parents`.
+    Parents may be given as trigger ids or as Trigger objects which are not saved yet.
+    """
+    def __init__(self, triggers):
+        """
+
+        :param triggers: iterable of Trigger, later triggers override earlier ones with the same id
+
+        :raises: CycleError
+        """
+        self._triggers = {}
+        self._parents = {}
+        self._children = {}
+        self._ancestors = {}
+        self._descendants = {}
+
+        for trigger in triggers:
+            self._triggers[trigger_key(trigger)] = trigger
+
+        for key, trigger in self._triggers.items():
+            parents = []
+            for parent in trigger.parents:
+                parent_key = trigger_key(parent)
+                if parent_key not in parents:
+                    parents.append(parent_key)
+            self._parents[key] = parents
+            self._children.setdefault(key, [])
+            for parent_key in parents:
+                self._children.setdefault(parent_key, []).append(key)
+                self._parents.setdefault(parent_key, [])
+
+        self._levels = self._compute_levels()
+
+    def _compute_levels(self):
+        pending = {key: len(parents) for key, parents in self._parents.items()}
+        level = [key for key, count in pending.items() if count == 0]
+        levels = []
+        while level:
+            levels.append(level)
+            next_level = []
+            for key in level:
+                del pending[key]
+                for child in self._children[key]:
+                    pending[child] -= 1
+                    if pending[child] == 0:
+                        next_level.append(child)
+            level = next_level
+
+        if pending:
+            raise CycleError(self._find_cycle(pending))
+        return levels
+
+    def _find_cycle(self, pending):
+        # every pending node has a pending parent, so walking up must loop
+        key = next(iter(pending))
+        path = []
+        seen = {}
+        while key not in seen:
+            seen[key] = len(path)
+            path.append(key)
+            key = next(parent for parent in self._parents[key] if parent in pending)
+        cycle = path[seen[key]:]
+        cycle.reverse()
+        return cycle + [cycle[0]]
+
+    def __len__(self):
+        return len(self._parents)
+
+    def __contains__(self, trigger):
+        return trigger_key(trigger) in self._parents
+
+    def get(self, trigger_id):
+        """
+        Returns trigger by graph key
+        Returns None for parents referenced by id but unknown to the graph
+
+        :param trigger_id: str trigger id
+        :return: Trigger
+        """
+        return self._triggers.get(trigger_id)
+
+    def parents(self, trigger):
+        """
+        Returns direct parents of trigger
+
+        :param trigger: Trigger or str trigger id
+        :return: list of str trigger keys
+        """
+        return list(self._parents[trigger_key(trigger)])
+
+    def children(self, trigger):
+        """
+        Returns direct children of trigger
+
+        :param trigger: Trigger or str trigger id
+        :return: list of str trigger keys
+        """
+        return list(self._children[trigger_key(trigger)])
+
+    def ancestors(self, trigger):
+        """
+        Returns all triggers the given trigger depends on
+
+        :param trigger: Trigger or str trigger id
+        :return: frozenset of str trigger keys
+        """
+        return self._closure(trigger_key(trigger), self._parents, self._ancestors)
+
+    def descendants(self, trigger):
+        """
+        Returns all triggers depending on the given trigger (impact of its change)
+
+        :param trigger: Trigger or str trigger id
+        :return: frozenset of str trigger keys
+        """
+        return self._closure(trigger_key(trigger), self._children, self._descendants)
+
+    def _closure(self, key, edges, cache):
+        if key in cache:
+            return cache[key]
+        # the graph is acyclic, so results of visited nodes can be cached and reused
+        stack = [key]
+        while stack:
+            node = stack[-1]
+            missing = [n for n in edges[node] if n not in cache]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            if node in cache:
+                continue
+            result = set(edges[node])
+            for n in edges[node]:
+                result.update(cache[n])
+            cache[node] = frozenset(result)
+        return cache[key]
+
+    def levels(self):
+        """
+        Returns triggers grouped so that parents always precede children.
+        Triggers of one level don't depend on each other.
+        Parents unknown to the graph are skipped, levels consisting only of them are omitted.
+
+        :return: list of lists of Trigger
+        """
+        levels = []
+        for level in self._levels:
+            triggers = [self._triggers[key] for key in level if key in self._triggers]
+            if triggers:
+                levels.append(triggers)
+        return levels
+
+    def topological_order(self):
+        """
+        Returns triggers ordered so that parents precede children
+
+        :return: list of Trigger
+        """
+        return [trigger for level in self.levels() for trigger in level]
+
+    def roots(self):
+        """
+        Returns keys of triggers without parents
+
+        :return: list of str trigger keys
+        """
+        return list(self._levels[0]) if self._levels else []
+
+    def impact(self, trigger_ids):
+        """
+        Returns all triggers affected by a change of any of given triggers
+
+        :param trigger_ids: iterable of Trigger or str trigger id
+        :return: set of str trigger keys
+        """
+        affected = set()
+        queue = deque(trigger_key(t) for t in trigger_ids)
+        while queue:
+            key = queue.popleft()
+            if key in affected or key not in self._children:
+                continue
+            affected.add(key)
+            if key in self._descendants:
+                affected.update(self._descendants[key])
+            else:
+                queue.extend(self._children[key])
+        return affected
@@ -1,5 +1,6 @@
 from ..client import InvalidJSONError
 from ..client import ResponseStructureError
+from ..tracing import traced
 
 
 MAX_FETCH_LIMIT = 1000
@@ -9,6 +10,7 @@ class EventManager:
     def __init__(self, client):
         self._client = client
 
+    @traced
     def fetch_by_trigger(self, trigger, limit=MAX_FETCH_LIMIT):
         """
         Get all events by trigger
@@ -31,6 +33,7 @@ class EventManager:
 
         return result['list']
 
+    @traced
     def delete_all(self):
         """
         Remove all events
@@ -1,4 +1,5 @@
 from ..client import ResponseStructureError
+from ..tracing import traced
 
 
 STATE_ENABLED = 'OK'
@@ -9,6 +10,7 @@ class HealthManager:
     def __init__(self, client):
         self._client = client
 
+    @traced
     def get_notifier_state(self):
         """
         Returns current Moira Notifier state
@@ -22,6 +24,7 @@ class HealthManager:
 
         return result['state']
 
+    @traced
     def disable_notifications(self):
         """
         Manage Moira Notifier to stop sending notifications
@@ -39,6 +42,7 @@ class HealthManager:
 
         return result['state']
 
+    @traced
     def enable_notifications(self):
         """
         Manage Moira Notifier to start sending notifications
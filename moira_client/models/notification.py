@@ -1,11 +1,13 @@
 from ..client import InvalidJSONError
 from ..client import ResponseStructureError
+from ..tracing import traced
 
 
 class NotificationManager:
     def __init__(self, client):
         self._client = client
 
+    @traced
     def fetch_all(self):
         """
         Returns all notifications
@@ -23,6 +25,7 @@ class NotificationManager:
 
         return result['list']
 
+    @traced
     def delete_all(self):
         """
         Remove all notifications
@@ -2,6 +2,7 @@ from collections import namedtuple
 
 from ..client import InvalidJSONError
 from ..client import ResponseStructureError
+from ..tracing import traced
 from .trigger import Trigger
 
 
@@ -15,6 +16,7 @@ class PatternManager:
     def __init__(self, client):
         self._client = client
 
+    @traced
     def fetch_all(self):
         """
         Returns all existing patterns in all triggers
@@ -23,17 +25,21 @@ class PatternManager:
 
         :raises: ResponseStructureError
         """
-        result = self._client.get(self._full_path())
+        return list(self._client.get_models(self._full_path(), self._build_patterns))
+
+    def _build_patterns(self, result):
         if 'list' in result:
             patterns = []
             for pattern in result['list']:
                 if 'triggers' in pattern:
-                    pattern['triggers'] = [Trigger(self._client, **trigger) for trigger in pattern['triggers']]
+                    triggers = [Trigger(self._client, **trigger) for trigger in pattern['triggers']]
+                    pattern = dict(pattern, triggers=triggers)
                 patterns.append(Pattern(**pattern))
             return patterns
         else:
             raise ResponseStructureError("list doesn't exist in response", result)
 
+    @traced
     def delete(self, pattern):
         """
         Delete pattern
@@ -0,0 +1,236 @@
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+
+from requests.exceptions import RequestException
+
+from ..client import Deadline
+from ..client import DeadlineExceeded
+from ..client import InvalidJSONError
+from ..client import current_deadline
+from ..client import deadline_scope
+from ..tracing import in_current_context
+
+
+DEFAULT_MAX_WORKERS = 8
+
+# trigger and metric states in order of columns of summaries, same as trigger.STATE_*
+STATES = ('OK', 'WARN', 'ERROR', 'NODATA', 'EXCEPTION')
+STATE_INDEX = {state: i for i, state in enumerate(STATES)}
+
+GROUP_BY_TAG = 'tag'
+GROUP_BY_TRIGGER = 'trigger'
+GROUP_BY_METRIC = 'metric'
+
+# triggers changed during this number of seconds are re-polled on refresh
+DEFAULT_RECENT = 600
+
+
+def fetch_states(
+        trigger_manager, trigger_ids, max_workers=DEFAULT_MAX_WORKERS, errors=None, bucket=None, deadline=None,
+):
+    """
+    Fetch states of triggers concurrently
+
+    :param trigger_manager: TriggerManager
+    :param trigger_ids: iterable of str trigger id
+    :param max_workers: int number of parallel requests
+    :param errors: dict to collect errors by trigger id, triggers failed to fetch are skipped.
+        If None, the first error is raised.
+    :param bucket: TokenBucket limiting rate of requests
+    :param deadline: client.Deadline or float seconds limiting all requests, deadline of the
+        current thread if None
+    :return: generator of (trigger_id, state) in order of completion
+
+    :raises: RequestException
+    :raises: InvalidJSONError
+    :raises: DeadlineExceeded
+    """
+    deadline = Deadline.of(deadline) or current_deadline()
+
+    def get_state(trigger_id):
+        with deadline_scope(deadline):
+            if bucket is not None:
+                bucket.acquire()
+            return trigger_manager.get_state(trigger_id)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(in_current_context(get_state), trigger_id): trigger_id
+            for trigger_id in trigger_ids
+        }
+        try:
+            for future in as_completed(futures):
+                trigger_id = futures[future]
+                try:
+                    state = future.result()
+                except (RequestException, InvalidJSONError, DeadlineExceeded) as e:
+                    if errors is None:
+                        raise
+                    errors[trigger_id] = e
+                    continue
+                yield trigger_id, state
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+class TriggerStateRecord:
+    __slots__ = ('state', 'counts', 'metrics', 'changed')
+
+    def __init__(self, state):
+        """
+        Compact representation of trigger state
+
+        :param state: dict trigger state as returned by TriggerManager.get_state
+        """
+        self.state = state.get('state')
+        self.counts = array('l', [0] * len(STATES))
+        self.metrics = {}
+        self.changed = state.get('timestamp') or 0
+
+        for name, metric in (state.get('metrics') or {}).items():
+            code = STATE_INDEX.get(metric.get('state'), -1)
+            self.metrics[name] = code
+            if code >= 0:
+                self.counts[code] += 1
+            changed = metric.get('event_timestamp') or 0
+            if changed > self.changed:
+                self.changed = changed
+
+        # triggers without metrics are counted by their own state
+        if not self.metrics and self.state in STATE_INDEX:
+            self.counts[STATE_INDEX[self.state]] += 1
+
+    def is_ok(self):
+        """
+        Check whether trigger and all its metrics are OK
+
+        :return: bool
+        """
+        return self.state == STATES[0] and sum(self.counts) == self.counts[0]
+
+
+class StateSummary:
+    """
+    Counts of metric states of many triggers grouped by tag, trigger or metric name.
+    Counts are arrays ordered as STATES.
+    """
+    def __init__(
+            self,
+            trigger_manager,
+            tags=None,
+            group_by=GROUP_BY_TAG,
+            max_workers=DEFAULT_MAX_WORKERS,
+            clock=time.time,
+    ):
+        """
+
+        :param trigger_manager: TriggerManager
+        :param tags: dict list of str tags by trigger id
+        :param group_by: str default grouping, one of GROUP_BY_* constants
+        :param max_workers: int number of parallel requests
+        :param clock: callable returning unix time in seconds
+        """
+        if group_by not in (GROUP_BY_TAG, GROUP_BY_TRIGGER, GROUP_BY_METRIC):
+            raise ValueError('Unknown grouping "{}"'.format(group_by))
+        self._trigger_manager = trigger_manager
+        self._tags = tags or {}
+        self.group_by = group_by
+        self.max_workers = max_workers
+        self._clock = clock
+        self.triggers = {}
+        self.errors = {}
+        self.updated = None
+
+    def update(self, trigger_ids, deadline=None):
+        """
+        Fetch states of triggers concurrently and replace their records
+
+        :param trigger_ids: iterable of str trigger id
+        :param deadline: client.Deadline or float seconds limiting all requests
+        :return: None
+        """
+        trigger_ids = list(trigger_ids)
+        for trigger_id in trigger_ids:
+            self.errors.pop(trigger_id, None)
+        states = fetch_states(
+            self._trigger_manager, trigger_ids, self.max_workers, errors=self.errors, deadline=deadline,
+        )
+        for trigger_id, state in states:
+            self.triggers[trigger_id] = TriggerStateRecord(state)
+        self.updated = self._clock()
+
+    def refresh(self, recent=DEFAULT_RECENT, deadline=None):
+        """
+        Re-poll only triggers which are not OK, changed recently or failed to fetch
+
+        :param recent: int seconds since the last state change of recently changed triggers
+        :param deadline: client.Deadline or float seconds limiting all requests
+        :return: list of str re-polled trigger ids
+        """
+        now = self._clock()
+        trigger_ids = [
+            trigger_id for trigger_id, record in self.triggers.items()
+            if not record.is_ok() or now - record.changed <= recent
+        ]
+        trigger_ids.extend(trigger_id for trigger_id in self.errors if trigger_id not in self.triggers)
+        self.update(trigger_ids, deadline=deadline)
+        return trigger_ids
+
+    def counts(self, group_by=None):
+        """
+        Returns counts of states by group
+
+        :param group_by: str one of GROUP_BY_* constants, default grouping if None
+        :return: dict of array counts ordered as STATES by group key
+        """
+        group_by = group_by or self.group_by
+        if group_by == GROUP_BY_TRIGGER:
+            return {trigger_id: record.counts for trigger_id, record in self.triggers.items()}
+
+        result = {}
+        size = len(STATES)
+        if group_by == GROUP_BY_TAG:
+            for trigger_id, record in self.triggers.items():
+                for tag in self._tags.get(trigger_id, ()):
+                    counts = result.get(tag)
+                    if counts is None:
+                        counts = result[tag] = array('l', [0] * size)
+                    for i in range(size):
+                        counts[i] += record.counts[i]
+        elif group_by == GROUP_BY_METRIC:
+            for record in self.triggers.values():
+                for name, code in record.metrics.items():
+                    if code < 0:
+                        continue
+                    counts = result.get(name)
+                    if counts is None:
+                        counts = result[name] = array('l', [0] * size)
+                    counts[code] += 1
+        else:
+            raise ValueError('Unknown grouping "{}"'.format(group_by))
+        return result
+
+    def rows(self, group_by=None):
+        """
+        Returns counts as a table sorted by group key
+
+        :param group_by: str one of GROUP_BY_* constants, default grouping if None
+        :return: list of tuples (key, count of STATES[0], count of STATES[1], ...)
+        """
+        counts = self.counts(group_by)
+        return [(key,) + tuple(counts[key]) for key in sorted(counts)]
+
+    def totals(self):
+        """
+        Returns counts of states of all triggers
+
+        :return: dict int count by str state
+        """
+        totals = [0] * len(STATES)
+        for record in self.triggers.values():
+            for i, count in enumerate(record.counts):
+                totals[i] += count
+        return dict(zip(STATES, totals))
@@ -1,5 +1,6 @@
 from ..client import InvalidJSONError
 from ..client import ResponseStructureError
+from ..tracing import traced
 from .base import Base
 
 DAYS_OF_WEEK = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
@@ -156,6 +157,7 @@ class Subscription(Base):
             'theme': 'light'
             }
 
+    @traced
     def save(self):
         """
         Save subscription
@@ -166,6 +168,7 @@ class Subscription(Base):
             return self.update()
         self._send_request()
 
+    @traced
     def update(self):
         """
         Update subscription
@@ -230,6 +233,7 @@ class SubscriptionManager:
     def __init__(self, client):
         self._client = client
 
+    @traced
     def fetch_all(self):
         """
         Returns all existing subscriptions
@@ -247,6 +251,7 @@ class SubscriptionManager:
         else:
             raise ResponseStructureError("list doesn't exist in response", result)
 
+    @traced
     def is_exist(self, **kwargs):
         """
         Check whether subscription exists or not by any attributes
@@ -300,6 +305,7 @@ class SubscriptionManager:
             **kwargs
         )
 
+    @traced
     def delete(self, subscription_id):
         """
         Remove subscription by given id
@@ -314,6 +320,7 @@ class SubscriptionManager:
                 return True
             return False
 
+    @traced
     def test(self, subscription_id):
         """
         Send test notification to subscription contact
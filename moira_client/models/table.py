@@ -0,0 +1,166 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .state import STATE_INDEX
+from .state import STATES
+
+
+COLUMNS = ('state', 'value', 'timestamp', 'event_timestamp', 'maintenance')
+
+# code of metric states unknown to this client
+STATE_UNKNOWN = -1
+
+
+def _metric_value(metric):
+    # older Moira versions return `value`, newer ones a map of values by target
+    value = metric.get('value')
+    if value is None:
+        values = metric.get('values')
+        if values:
+            value = values.get('t1', next(iter(values.values())))
+    return np.nan if value is None else value
+
+
+class StateTable:
+    """
+    Metrics of trigger state as columnar NumPy arrays.
+    Row i describes metric names[i], states are stored as indexes in STATES.
+    """
+    def __init__(self, trigger_id, names, state, value, timestamp, event_timestamp, maintenance):
+        """
+
+        :param trigger_id: str trigger id
+        :param names: numpy array of str metric names
+        :param state: numpy int8 array of state codes
+        :param value: numpy float64 array of last values, NaN if unknown
+        :param timestamp: numpy int64 array of last value timestamps
+        :param event_timestamp: numpy int64 array of last event timestamps
+        :param maintenance: numpy int64 array of maintenance end timestamps
+        """
+        self.trigger_id = trigger_id
+        self.names = names
+        self.state = state
+        self.value = value
+        self.timestamp = timestamp
+        self.event_timestamp = event_timestamp
+        self.maintenance = maintenance
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Parse metrics of trigger state
+
+        :param state: dict trigger state as returned by TriggerManager.get_state
+        :return: StateTable
+
+        :raises: ImportError
+        """
+        if np is None:
+            raise ImportError('numpy is required for state tables')
+        metrics = state.get('metrics') or {}
+        count = len(metrics)
+        items = list(metrics.values())
+        return cls(
+            state.get('trigger_id'),
+            np.array(list(metrics), dtype=object),
+            np.fromiter((STATE_INDEX.get(m.get('state'), STATE_UNKNOWN) for m in items), np.int8, count),
+            np.fromiter((_metric_value(m) for m in items), np.float64, count),
+            np.fromiter((m.get('timestamp') or 0 for m in items), np.int64, count),
+            np.fromiter((m.get('event_timestamp') or 0 for m in items), np.int64, count),
+            np.fromiter((m.get('maintenance') or 0 for m in items), np.int64, count),
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return '(StateTable {} metrics={})'.format(self.trigger_id, len(self))
+
+    def take(self, index):
+        """
+        Returns table of selected rows
+
+        :param index: numpy bool mask or int array of rows
+        :return: StateTable
+        """
+        return StateTable(
+            self.trigger_id,
+            self.names[index],
+            *[getattr(self, column)[index] for column in COLUMNS]
+        )
+
+    def mask(self, states=None, older_than=None, now=None, in_maintenance=None):
+        """
+        Returns bool mask of rows matching all given criteria
+
+        :param states: iterable of str metric states
+        :param older_than: int seconds since the last value
+        :param now: int unix time, required with older_than and in_maintenance
+        :param in_maintenance: bool select metrics in or out of maintenance
+        :return: numpy bool array
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if states is not None:
+            codes = [STATE_INDEX[state] for state in states]
+            mask &= np.isin(self.state, codes)
+        if older_than is not None:
+            mask &= self.timestamp <= now - older_than
+        if in_maintenance is not None:
+            mask &= (self.maintenance > now) == in_maintenance
+        return mask
+
+    def filter(self, **kwargs):
+        """
+        Returns table of rows matching all given criteria, see mask()
+
+        :return: StateTable
+        """
+        return self.take(self.mask(**kwargs))
+
+    def sort(self, column, descending=False):
+        """
+        Returns table sorted by column, NaN values go last
+
+        :param column: str one of COLUMNS
+        :param descending: bool
+        :return: StateTable
+        """
+        values = getattr(self, column)
+        order = np.argsort(-values if descending else values, kind='stable')
+        return self.take(order)
+
+    def top(self, k, column='value', largest=True):
+        """
+        Returns k rows with the largest (or smallest) values of column, NaN values are skipped
+
+        :param k: int number of rows
+        :param column: str one of COLUMNS
+        :param largest: bool
+        :return: StateTable sorted by column
+        """
+        values = getattr(self, column).astype(np.float64)
+        index = np.flatnonzero(~np.isnan(values))
+        keys = -values[index] if largest else values[index]
+        if k < len(index):
+            part = np.argpartition(keys, k)[:k]
+            index, keys = index[part], keys[part]
+        return self.take(index[np.argsort(keys, kind='stable')])
+
+    def state_counts(self):
+        """
+        Returns number of metrics by state
+
+        :return: dict int count by str state
+        """
+        counts = np.bincount(self.state[self.state >= 0], minlength=len(STATES))
+        return dict(zip(STATES, counts.tolist()))
+
+    def states(self):
+        """
+        Returns state names of rows
+
+        :return: list of str, None for unknown states
+        """
+        return [STATES[code] if code >= 0 else None for code in self.state.tolist()]
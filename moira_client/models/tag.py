@@ -4,6 +4,7 @@ from requests.exceptions import HTTPError
 
 from ..client import InvalidJSONError
 from ..client import ResponseStructureError
+from ..tracing import traced
 from .subscription import Subscription
 
 
@@ -14,6 +15,7 @@ class TagManager:
     def __init__(self, client):
         self._client = client
 
+    @traced
     def fetch_all(self):
         """
         Returns all existing tags
@@ -28,6 +30,7 @@ class TagManager:
 
         return result['list']
 
+    @traced
     def delete(self, tag):
         """
         Delete tag.
@@ -44,6 +47,7 @@ class TagManager:
 
         return True
 
+    @traced
     def stats(self):
         """
         Returns stats by all triggers
@@ -52,17 +56,23 @@ class TagManager:
 
         :raises: ResponseStructureError
         """
-        result = self._client.get(self._full_path('stats'))
+        return list(self._client.get_models(self._full_path('stats'), self._build_stats))
+
+    def _build_stats(self, result):
         if 'list' in result:
+            stats = []
             for stat in result['list']:
                 if 'subscriptions' in stat:
-                    stat['subscriptions'] = [
+                    subscriptions = [
                         Subscription(self._client, **subscription) for subscription in stat['subscriptions']
                         ]
-            return [TagStats(**stat) for stat in result['list']]
+                    stat = dict(stat, subscriptions=subscriptions)
+                stats.append(TagStats(**stat))
+            return stats
         else:
             raise ResponseStructureError("list doesn't exist in response", result)
 
+    @traced
     def fetch_assigned_triggers(self, tag):
         """
         Returns triggers assigned to tag
@@ -85,6 +95,7 @@ class TagManager:
         else:
             raise ResponseStructureError("list doesn't exist in response", result)
 
+    @traced
     def fetch_assigned_triggers_by_tags(self, tags):
         """
         Returns triggers assigned to at least one tag of tags
@@ -109,6 +120,7 @@ class TagManager:
         else:
             raise ResponseStructureError("list doesn't exist in response", result)
 
+    @traced
     def fetch_assigned_subscriptions(self, tag):
         """
         Returns subscriptions assigned to tag
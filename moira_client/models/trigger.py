@@ -1,8 +1,18 @@
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 from ..client import ResponseStructureError
 from ..client import InvalidJSONError
+from ..client import Deadline
+from ..client import deadline_scope
 from .base import Base
-from ..expression import convert_python_expression
+from .dependency import TriggerGraph
+from .dependency import trigger_key
+from .state import GROUP_BY_TAG
+from .state import StateSummary
+from ..compat import string_types
+from ..tracing import in_current_context
+from ..tracing import traced
 
 
 DAYS_OF_WEEK = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
@@ -15,6 +25,8 @@ STATE_EXCEPTION = 'EXCEPTION'
 
 MINUTES_IN_HOUR = 60
 
+DEFAULT_MAX_WORKERS = 8
+
 RISING_TRIGGER = 'rising'
 FALLING_TRIGGER = 'falling'
 EXPRESSION_TRIGGER = 'expression'
@@ -63,7 +75,7 @@ class Trigger(Base):
         :param is_pull_type: bool pull metrrics from graphite (useful for functions with historical data)
         :param dashboard: str url of grafana dashboard. screenshot of this dashboard will be sent on alert
         :param pending_interval: int causes Moira to wait for a certain duration (in seconds) between first encountering a new trigger state and counting an alert as firing for this element.
-        :param parents: list of str IDs of parent triggers
+        :param parents: list of str IDs of parent triggers or unsaved parent Trigger objects
         :param saturation: list of Saturation objects
         :param kwargs: additional parameters
         """
@@ -99,6 +111,9 @@ class Trigger(Base):
                 'Python expressions are deprecated. Please update your alerts to new govaluate syntax.',
                 DeprecationWarning
             )
+            # the converter of legacy expressions imports ast, it is loaded only when needed
+            from ..expression import convert_python_expression
+
             self.expression = convert_python_expression(expression)
         else:
             self.expression = expression
@@ -186,7 +201,24 @@ class Trigger(Base):
     def id(self):
         return self._id
 
-    def _send_request(self, trigger_id=None):
+    def parent_ids(self):
+        """
+        Returns ids of parent triggers, parents given as Trigger objects must be saved first
+
+        :return: list of str
+
+        :raises: ValueError
+        """
+        ids = []
+        for parent in self.parents:
+            if not isinstance(parent, string_types):
+                if not parent.id:
+                    raise ValueError('Parent trigger "{}" is not saved'.format(parent.name))
+                parent = parent.id
+            ids.append(parent)
+        return ids
+
+    def _send_request(self, trigger_id=None, exists=None):
         data = {
             'name': self.name,
             'tags': self.tags,
@@ -204,14 +236,14 @@ class Trigger(Base):
             'is_pull_type': self.is_pull_type,
             'dashboard': self.dashboard,
             'pending_interval': self.pending_interval,
-            'parents': self.parents,
+            'parents': self.parent_ids(),
             'saturation': [s.to_dict() for s in self.saturation],
         }
 
         if trigger_id:
             data['id'] = trigger_id
-            api_response = TriggerManager(
-                self._client).fetch_by_id(trigger_id)
+            if exists is None:
+                exists = bool(TriggerManager(self._client).fetch_by_id(trigger_id))
 
         data['sched']['days'] = []
         for day in DAYS_OF_WEEK:
@@ -224,7 +256,7 @@ class Trigger(Base):
         data['sched']['startOffset'] = self._start_hour * MINUTES_IN_HOUR + self._start_minute
         data['sched']['endOffset'] = self._end_hour * MINUTES_IN_HOUR + self._end_minute
 
-        if trigger_id and api_response:
+        if trigger_id and exists:
             res = self._client.put('trigger/' + trigger_id, json=data)
         else:
             res = self._client.put('trigger', json=data)
@@ -233,23 +265,27 @@ class Trigger(Base):
         self._id = res['id']
         return self._id
 
+    @traced
     def save(self):
         """
         Save trigger
 
         :return: trigger_id
         """
-        if self._id:
-            return self.update()
-        trigger = self.check_exists()
+        # the existence check must see writes of the same API instance
+        with self._client.pinned():
+            if self._id:
+                return self.update()
+            trigger = self.check_exists()
 
-        if trigger:
-            self._id = trigger.id
-            self.update()
-            return trigger.id
+            if trigger:
+                self._id = trigger.id
+                self.update()
+                return trigger.id
 
-        return self._send_request()
+            return self._send_request()
 
+    @traced
     def update(self):
         """
         Update trigger
@@ -294,6 +330,7 @@ class Trigger(Base):
         """
         self._end_minute = int(minute)
 
+    @traced
     def check_exists(self):
         """
         Check if current trigger exists
@@ -345,6 +382,7 @@ class TriggerManager:
     def trigger_client(self):
         return self._client
 
+    @traced
     def fetch_all(self):
         """
         Returns all existing triggers
@@ -353,7 +391,9 @@ class TriggerManager:
 
         :raises: ResponseStructureError
         """
-        result = self._client.get(self._full_path())
+        return list(self._client.get_models(self._full_path(), self._build_triggers))
+
+    def _build_triggers(self, result):
         if 'list' in result:
             triggers = []
             for trigger in result['list']:
@@ -362,6 +402,7 @@ class TriggerManager:
         else:
             raise ResponseStructureError("list doesn't exist in response", result)
 
+    @traced
     def fetch_by_id(self, trigger_id):
         """
         Returns Trigger by trigger id
@@ -378,6 +419,7 @@ class TriggerManager:
         elif not 'trigger_id' in result:
             raise ResponseStructureError("invalid api response", result)
 
+    @traced
     def delete(self, trigger_id):
         """
         Delete trigger by trigger id
@@ -391,6 +433,7 @@ class TriggerManager:
         except InvalidJSONError:
             return True
 
+    @traced
     def reset_throttling(self, trigger_id):
         """
         Resets throttling by trigger id
@@ -404,6 +447,7 @@ class TriggerManager:
         except InvalidJSONError:
             return False
 
+    @traced
     def get_state(self, trigger_id):
         """
         Get state of trigger by trigger id
@@ -413,6 +457,57 @@ class TriggerManager:
         """
         return self._client.get(self._full_path(trigger_id + '/state'))
 
+    @traced
+    def get_state_table(self, trigger_id):
+        """
+        Get state of trigger by trigger id with metrics parsed into NumPy columns.
+        Requires numpy.
+
+        :param trigger_id: str trigger id
+        :return: StateTable
+
+        :raises: ImportError
+        """
+        # numpy is imported with the table module
+        from .table import StateTable
+
+        state = self.get_state(trigger_id)
+        if not state.get('trigger_id'):
+            # the decoded state may be shared through revalidation cache and request coalescing
+            state = dict(state, trigger_id=trigger_id)
+        return StateTable.from_state(state)
+
+    @traced
+    def state_summary(
+            self, trigger_ids=None, group_by=GROUP_BY_TAG, max_workers=DEFAULT_MAX_WORKERS, deadline=None,
+    ):
+        """
+        Fetch states of triggers concurrently and count them.
+        Call refresh() of the result to re-poll only triggers which are not OK or changed recently.
+
+        :param trigger_ids: list of str trigger id, all triggers if None
+        :param group_by: str default grouping, one of state.GROUP_BY_* constants
+        :param max_workers: int number of parallel requests
+        :param deadline: client.Deadline or float seconds limiting all requests
+        :return: StateSummary
+
+        :raises: ResponseStructureError
+        :raises: DeadlineExceeded
+        """
+        deadline = Deadline.of(deadline)
+        tags = None
+        if trigger_ids is None or group_by == GROUP_BY_TAG:
+            with deadline_scope(deadline):
+                triggers = self.fetch_all()
+            tags = {trigger.id: trigger.tags for trigger in triggers}
+            if trigger_ids is None:
+                trigger_ids = list(tags)
+
+        summary = StateSummary(self, tags=tags, group_by=group_by, max_workers=max_workers)
+        summary.update(trigger_ids, deadline=deadline)
+        return summary
+
+    @traced
     def remove_metric(self, trigger_id, metric):
         """
         Remove metric by trigger id
@@ -431,6 +526,7 @@ class TriggerManager:
             return False
 
 
+    @traced
     def is_exist(self, trigger):
         """
         Check whether trigger exists or not
@@ -445,6 +541,7 @@ class TriggerManager:
                 return True
         return False
 
+    @traced
     def get_non_existent(self, triggers):
         """
         Returns triggers which are not exist yet
@@ -520,7 +617,99 @@ class TriggerManager:
             **kwargs
         )
 
+    @traced
+    def dependency_graph(self, triggers=None):
+        """
+        Returns dependency graph of all existing triggers and local ones.
+        Local triggers override existing triggers with the same id.
+        Unsaved local triggers matching existing ones by name, targets and tags
+        get ids of existing triggers.
+
+        :param triggers: list of Trigger local triggers
+        :return: TriggerGraph
+
+        :raises: ResponseStructureError
+        :raises: CycleError
+        """
+        triggers = list(triggers or [])
+        existing = self.fetch_all()
+        _resolve_ids(triggers, existing)
+        return TriggerGraph(existing + triggers)
+
+    @traced
+    def save_all(self, triggers, max_workers=DEFAULT_MAX_WORKERS, deadline=None):
+        """
+        Save triggers level by level so that parents are saved before their children.
+        Triggers of one level are saved in parallel, ids of saved parents are
+        substituted into children.
+
+        :param triggers: list of Trigger
+        :param max_workers: int number of parallel requests
+        :param deadline: client.Deadline or float seconds limiting all requests
+        :return: list of str trigger ids in the same order as triggers
+
+        :raises: CycleError
+        :raises: ValueError
+        :raises: ResponseStructureError
+        :raises: DeadlineExceeded
+        """
+        deadline = Deadline.of(deadline)
+        with self._client.pinned() as endpoint:
+            return self._save_all(triggers, max_workers, deadline, endpoint)
+
+    def _save_all(self, triggers, max_workers, deadline, endpoint):
+        # resolve existing triggers once instead of fetch_all and fetch_by_id per Trigger.save
+        with deadline_scope(deadline):
+            existing_ids = _resolve_ids(triggers, self.fetch_all())
+        graph = TriggerGraph(triggers)
+
+        for trigger in triggers:
+            for parent in trigger.parents:
+                if isinstance(parent, string_types) or parent.id:
+                    continue
+                if graph.get(trigger_key(parent)) is None:
+                    raise ValueError('Parent trigger "{}" of "{}" is neither saved nor being saved'.format(
+                        parent.name, trigger.name,
+                    ))
+
+        def save(trigger):
+            with deadline_scope(deadline), self._client.pinned(endpoint):
+                if trigger.id:
+                    return trigger._send_request(trigger.id, exists=trigger.id in existing_ids)
+                return trigger._send_request()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for level in graph.levels():
+                futures = [executor.submit(in_current_context(save), trigger) for trigger in level]
+                for future in futures:
+                    future.result()
+
+        return [trigger.id for trigger in triggers]
+
     def _full_path(self, path=''):
         if path:
             return 'trigger/' + path
         return 'trigger'
+
+
+def _identity(trigger):
+    return trigger.name, frozenset(trigger.targets), frozenset(trigger.tags)
+
+
+def _resolve_ids(triggers, existing):
+    """
+    Set ids of existing triggers to unsaved triggers and their unsaved parents
+
+    :param triggers: list of Trigger local triggers
+    :param existing: list of Trigger fetched triggers
+    :return: set of str ids of existing triggers
+    """
+    by_identity = {}
+    for trigger in existing:
+        by_identity[_identity(trigger)] = trigger.id
+
+    for trigger in triggers:
+        for candidate in [trigger] + list(trigger.parents):
+            if not isinstance(candidate, string_types) and not candidate.id:
+                candidate._id = by_identity.get(_identity(candidate))
+    return set(by_identity.values())
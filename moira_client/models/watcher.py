@@ -0,0 +1,202 @@
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+from ..compat import monotonic
+from ..ratelimit import TokenBucket
+from .state import DEFAULT_MAX_WORKERS
+from .state import fetch_states
+
+
+StateChange = namedtuple('StateChange', ['trigger_id', 'metric', 'old_state', 'new_state'])
+
+DEFAULT_MIN_INTERVAL = 5
+DEFAULT_MAX_INTERVAL = 300
+DEFAULT_BACKOFF = 2
+
+
+class _WatchedTrigger:
+    __slots__ = ('interval', 'next_poll', 'state', 'metrics')
+
+    def __init__(self, interval, next_poll):
+        self.interval = interval
+        self.next_poll = next_poll
+        self.state = None
+        self.metrics = None
+
+
+class StateWatcher:
+    """
+    Polls states of triggers and yields their changes.
+    A trigger is polled every min_interval seconds while it changes,
+    the interval grows by backoff up to max_interval while it is stable.
+    Changes of trigger state itself are yielded with metric None.
+    """
+    def __init__(
+            self,
+            trigger_manager,
+            trigger_ids,
+            min_interval=DEFAULT_MIN_INTERVAL,
+            max_interval=DEFAULT_MAX_INTERVAL,
+            backoff=DEFAULT_BACKOFF,
+            max_workers=DEFAULT_MAX_WORKERS,
+            rate=None,
+            clock=monotonic,
+            sleep=time.sleep,
+    ):
+        """
+
+        :param trigger_manager: TriggerManager
+        :param trigger_ids: iterable of str trigger id
+        :param min_interval: float seconds between polls of a changing trigger
+        :param max_interval: float seconds between polls of a stable trigger
+        :param backoff: float multiplier applied to interval after a poll without changes
+        :param max_workers: int number of parallel requests
+        :param rate: float max requests per second, None for no limit
+        :param clock: callable returning monotonic time in seconds
+        :param sleep: callable used to wait for the next poll
+        """
+        self._trigger_manager = trigger_manager
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self._bucket = TokenBucket(rate) if rate else None
+        self._clock = clock
+        self._sleep = sleep
+        self._stopped = threading.Event()
+        self.errors = {}
+
+        now = clock()
+        self._triggers = {trigger_id: _WatchedTrigger(min_interval, now) for trigger_id in trigger_ids}
+
+    def add(self, trigger_id):
+        """
+        Start watching trigger
+
+        :param trigger_id: str trigger id
+        :return: None
+        """
+        if trigger_id not in self._triggers:
+            self._triggers[trigger_id] = _WatchedTrigger(self.min_interval, self._clock())
+
+    def remove(self, trigger_id):
+        """
+        Stop watching trigger
+
+        :param trigger_id: str trigger id
+        :return: None
+        """
+        self._triggers.pop(trigger_id, None)
+
+    def stop(self):
+        """
+        Stop iteration after the current poll
+
+        :return: None
+        """
+        self._stopped.set()
+
+    def interval(self, trigger_id):
+        """
+        Returns current poll interval of trigger
+
+        :param trigger_id: str trigger id
+        :return: float seconds
+        """
+        return self._triggers[trigger_id].interval
+
+    def next_poll_in(self):
+        """
+        Returns seconds until some trigger is due to be polled
+
+        :return: float seconds, None if nothing is watched
+        """
+        if not self._triggers:
+            return None
+        next_poll = min(watched.next_poll for watched in self._triggers.values())
+        return max(0.0, next_poll - self._clock())
+
+    def poll(self):
+        """
+        Poll triggers which are due and return their changes.
+        The first poll of a trigger only remembers its state.
+
+        :return: list of StateChange
+        """
+        now = self._clock()
+        due = [trigger_id for trigger_id, watched in self._triggers.items() if watched.next_poll <= now]
+        self.errors = {}
+        changes = []
+        states = fetch_states(self._trigger_manager, due, self.max_workers, errors=self.errors, bucket=self._bucket)
+        for trigger_id, state in states:
+            watched = self._triggers.get(trigger_id)
+            if watched is None:
+                continue
+            trigger_changes = self._diff(trigger_id, watched, state)
+            if trigger_changes:
+                watched.interval = self.min_interval
+                changes.extend(trigger_changes)
+            else:
+                watched.interval = min(self.max_interval, watched.interval * self.backoff)
+
+        now = self._clock()
+        for trigger_id in due:
+            watched = self._triggers.get(trigger_id)
+            if watched is not None:
+                watched.next_poll = now + watched.interval
+        return changes
+
+    def _diff(self, trigger_id, watched, state):
+        metrics = {name: metric.get('state') for name, metric in (state.get('metrics') or {}).items()}
+        trigger_state = state.get('state')
+        changes = []
+        if watched.metrics is not None:
+            if watched.state != trigger_state:
+                changes.append(StateChange(trigger_id, None, watched.state, trigger_state))
+            for name, new_state in metrics.items():
+                old_state = watched.metrics.get(name)
+                if old_state != new_state:
+                    changes.append(StateChange(trigger_id, name, old_state, new_state))
+            for name, old_state in watched.metrics.items():
+                if name not in metrics:
+                    changes.append(StateChange(trigger_id, name, old_state, None))
+        watched.state = trigger_state
+        watched.metrics = metrics
+        return changes
+
+    def __iter__(self):
+        return self.watch()
+
+    def watch(self):
+        """
+        Poll triggers until stop() is called
+
+        :return: generator of StateChange
+        """
+        while not self._stopped.is_set():
+            for change in self.poll():
+                yield change
+            wait = self.next_poll_in()
+            if wait is None or self._stopped.is_set():
+                return
+            self._sleep(wait)
+
+    def __aiter__(self):
+        return self.watch_async()
+
+    async def watch_async(self):
+        """
+        Poll triggers in a thread until stop() is called
+
+        :return: async generator of StateChange
+        """
+        loop = asyncio.get_event_loop()
+        while not self._stopped.is_set():
+            for change in await loop.run_in_executor(None, self.poll):
+                yield change
+            wait = self.next_poll_in()
+            if wait is None or self._stopped.is_set():
+                return
+            await asyncio.sleep(wait)
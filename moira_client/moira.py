@@ -1,32 +1,63 @@
 from .client import Client
-from .models.contact import ContactManager
-from .models.event import EventManager
-from .models.notification import NotificationManager
-from .models.pattern import PatternManager
-from .models.subscription import SubscriptionManager
-from .models.tag import TagManager
-from .models.trigger import TriggerManager
-from .models.health import HealthManager
+from .client import DEFAULT_TIMEOUT
+from .compression import DEFAULT_MIN_SIZE
 
 
 class Moira:
     def __init__(
         self, api_url, auth_custom=None,
         auth_user=None, auth_pass=None, login=None,
-        retry_policy=None,
+        retry_policy=None, rate_limiter=None, concurrency_limiter=None,
+        circuit_breaker=None, timeout=DEFAULT_TIMEOUT, endpoint_timeouts=None, codec=None,
+        compress_requests=None, compress_min_size=DEFAULT_MIN_SIZE, revalidation_cache=None,
+        single_flight=None, hedge_policy=None, balancer=None, hooks=None, tracer=None,
+        transport=None,
     ):
         """
-        :param api_url: str API URL
+        :param api_url: str API URL or list of URLs of API instances to balance requests between
         :param auth_custom: dict auth custom headers
         :param auth_user: str auth user
         :param auth_pass: str auth password
         :param login: str auth login
         :param retry_policy: client.RetryPolicy configuration of retries
+        :param rate_limiter: ratelimit.RateLimiter limits of request rate
+        :param concurrency_limiter: ratelimit.ConcurrencyLimiter adaptive limit of requests in flight
+        :param circuit_breaker: circuitbreaker.CircuitBreaker fails requests fast while endpoint is failing
+        :param timeout: float seconds or tuple (connect, read) timeout of a request attempt
+        :param endpoint_timeouts: dict timeouts by endpoint template, e.g. {'tag/stats': (3, 60)}
+        :param codec: str codec name ('json', 'orjson', 'auto') or codec object encoding and decoding JSON
+        :param compress_requests: str content encoding of request bodies ('gzip', 'deflate'),
+            None to send bodies as is. Use it only if the server accepts compressed bodies
+        :param compress_min_size: int min size of request body to compress
+        :param revalidation_cache: revalidation.RevalidationCache of GET responses revalidated
+            with ETag / Last-Modified, None to disable conditional requests
+        :param single_flight: singleflight.SingleFlight coalescing concurrent identical GET requests,
+            None to send every request
+        :param hedge_policy: hedging.HedgePolicy sending duplicates of slow GET requests, None to disable hedging
+        :param balancer: balancer.Balancer of API URLs, by default created if api_url is a list of several URLs
+        :param hooks: list of instrumentation.RequestHooks called before and after every request attempt
+        :param tracer: tracing.Tracer or OpenTelemetry tracer, None to disable tracing
+        :param transport: transport.Transport sending requests, transport.RequestsTransport by default
         """
         self._client = Client(
             api_url, auth_custom,
             auth_user, auth_pass, login,
             retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            concurrency_limiter=concurrency_limiter,
+            circuit_breaker=circuit_breaker,
+            timeout=timeout,
+            endpoint_timeouts=endpoint_timeouts,
+            codec=codec,
+            compress_requests=compress_requests,
+            compress_min_size=compress_min_size,
+            revalidation_cache=revalidation_cache,
+            single_flight=single_flight,
+            hedge_policy=hedge_policy,
+            balancer=balancer,
+            hooks=hooks,
+            tracer=tracer,
+            transport=transport,
         )
 
         self._trigger = None
@@ -38,6 +69,65 @@ class Moira:
         self._subscription = None
         self._health = None
 
+    def recording(self, path, scrub=True):
+        """
+        Record requests with their responses to a cassette, see Client.recording()
+
+        :param path: str cassette file path, overwritten
+        :param scrub: bool replace credentials in headers and values of contacts in responses
+        :return: context manager yielding cassette.RecordingTransport
+        """
+        return self._client.recording(path, scrub)
+
+    def load_snapshot(self, path, max_age=None, refresh_interval=None):
+        """
+        Open local snapshot of triggers, subscriptions, contacts and tag stats
+
+        :param path: str SQLite database file path
+        :param max_age: float seconds, an older or empty snapshot is refreshed before it is returned,
+            None to refresh only an empty snapshot
+        :param refresh_interval: float seconds between refreshes in a background thread, None to not refresh
+        :return: snapshot.InventorySnapshot
+        """
+        from .snapshot import InventorySnapshot
+
+        snapshot = InventorySnapshot(path, self._client)
+        staleness = snapshot.staleness()
+        if staleness is None or max_age is not None and staleness > max_age:
+            snapshot.refresh()
+        if refresh_interval is not None:
+            snapshot.start(refresh_interval)
+        return snapshot
+
+    def shared_inventory(self, path, check_interval=1.0):
+        """
+        Open triggers and subscriptions of a shared inventory file, mapped read-only and
+        shared by processes of a host
+
+        :param path: str file path written by shared_inventory_refresher()
+        :param check_interval: float seconds between checks whether the file is replaced
+        :return: sharedcache.SharedInventory
+        """
+        from .sharedcache import SharedInventory
+
+        return SharedInventory(path, self._client, check_interval)
+
+    def shared_inventory_refresher(self, path, refresh_interval=None):
+        """
+        Refresh shared inventory file of triggers and subscriptions, one refresher per host
+
+        :param path: str file path
+        :param refresh_interval: float seconds between refreshes in a background thread, None to not refresh
+        :return: sharedcache.SharedInventoryRefresher
+        """
+        from .sharedcache import SharedInventoryRefresher
+
+        refresher = SharedInventoryRefresher(path, self._client)
+        refresher.refresh()
+        if refresh_interval is not None:
+            refresher.start(refresh_interval)
+        return refresher
+
     @property
     def trigger(self):
         """
@@ -46,6 +136,8 @@ class Moira:
         :return: TriggerManager
         """
         if not self._trigger:
+            from .models.trigger import TriggerManager
+
             self._trigger = TriggerManager(self._client)
         return self._trigger
 
@@ -57,6 +149,8 @@ class Moira:
         :return: TagManager
         """
         if not self._tag:
+            from .models.tag import TagManager
+
             self._tag = TagManager(self._client)
         return self._tag
 
@@ -68,6 +162,8 @@ class Moira:
         :return: EventManager
         """
         if not self._event:
+            from .models.event import EventManager
+
             self._event = EventManager(self._client)
         return self._event
 
@@ -79,6 +175,8 @@ class Moira:
         :return: NotificationManager
         """
         if not self._notification:
+            from .models.notification import NotificationManager
+
             self._notification = NotificationManager(self._client)
         return self._notification
 
@@ -90,6 +188,8 @@ class Moira:
         :return: ContactManager
         """
         if not self._contact:
+            from .models.contact import ContactManager
+
             self._contact = ContactManager(self._client)
         return self._contact
 
@@ -101,6 +201,8 @@ class Moira:
         :return: PatternManager
         """
         if not self._pattern:
+            from .models.pattern import PatternManager
+
             self._pattern = PatternManager(self._client)
         return self._pattern
 
@@ -112,6 +214,8 @@ class Moira:
         :return: SubscriptionManager
         """
         if not self._subscription:
+            from .models.subscription import SubscriptionManager
+
             self._subscription = SubscriptionManager(self._client)
         return self._subscription
 
@@ -123,5 +227,7 @@ class Moira:
         :return: HealthManager
         """
         if not self._health:
+            from .models.health import HealthManager
+
             self._health = HealthManager(self._client)
         return self._health
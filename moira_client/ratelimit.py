@@ -0,0 +1,232 @@
+import threading
+import time
+
+from .compat import monotonic
+
+
+# tolerance for float rounding of refilled tokens
+EPSILON = 1e-9
+# min wait so that waiting for a token never degrades into a busy loop
+MIN_WAIT = 0.001
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None, clock=monotonic, sleep=time.sleep):
+        """A thread-safe token bucket.
+
+        :param rate: float tokens added per second
+        :param burst: float bucket capacity, defaults to max(rate, 1)
+        :param clock: callable returning monotonic time in seconds
+        :param sleep: callable used to wait for tokens
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens without waiting
+
+        :param tokens: float number of tokens
+        :return: True if tokens were taken, False otherwise
+        """
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens + EPSILON >= tokens:
+                self._tokens = max(0.0, self._tokens - tokens)
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Take tokens waiting for them if necessary
+
+        :param tokens: float number of tokens
+        :param timeout: float max seconds to wait, None to wait forever
+        :return: True if tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if self._tokens + EPSILON >= tokens:
+                    self._tokens = max(0.0, self._tokens - tokens)
+                    return True
+                wait = max(MIN_WAIT, (tokens - self._tokens) / self.rate)
+            if deadline is not None:
+                if now >= deadline:
+                    return False
+                wait = min(wait, deadline - now)
+            self._sleep(wait)
+
+
+class RateLimit:
+    def __init__(self, rate, burst=None, method=None, prefix=None):
+        """A limit of request rate, applies to requests matching method and path prefix.
+
+        :param rate: float max requests per second
+        :param burst: float max requests sent at once
+        :param method: str HTTP method, None for any method
+        :param prefix: str API path prefix, e.g. 'trigger/' or 'tag/stats', None for any path
+        """
+        self.method = method.upper() if method else None
+        self.prefix = prefix.lstrip('/') if prefix else None
+        self.bucket = TokenBucket(rate, burst)
+
+    def matches(self, method, path):
+        """
+        Check whether limit applies to request
+
+        :param method: str HTTP method
+        :param path: str API path
+        :return: bool
+        """
+        if self.method is not None and self.method != method.upper():
+            return False
+        if self.prefix is not None and not path.lstrip('/').startswith(self.prefix):
+            return False
+        return True
+
+
+class RateLimiter:
+    """
+    Limits request rate of clients sharing it, every matching limit applies to a request.
+    """
+    def __init__(self, limits):
+        """
+
+        :param limits: list of RateLimit
+        """
+        self.limits = list(limits)
+
+    def acquire(self, method, path, timeout=None):
+        """
+        Wait until request is allowed by all matching limits
+
+        :param method: str HTTP method
+        :param path: str API path
+        :param timeout: float max seconds to wait for every limit, None to wait forever
+        :return: True if request is allowed, False on timeout
+        """
+        for limit in self.limits:
+            if limit.matches(method, path) and not limit.bucket.acquire(timeout=timeout):
+                return False
+        return True
+
+
+class ConcurrencyLimiter:
+    """
+    Adaptive (AIMD) limit of requests in flight.
+    The limit is multiplied by `decrease` when the API is overloaded: it answers 429/5xx,
+    times out or latency grows above `latency_ratio` times the usual latency of the endpoint.
+    Otherwise the limit grows by `increase` per `limit` successful requests.
+    """
+    def __init__(
+            self,
+            initial=8,
+            min_limit=1,
+            max_limit=64,
+            increase=1.0,
+            decrease=0.5,
+            latency_ratio=2.0,
+            clock=monotonic,
+    ):
+        """
+
+        :param initial: int initial limit
+        :param min_limit: int min limit
+        :param max_limit: int max limit
+        :param increase: float limit increase per `limit` successful requests
+        :param decrease: float multiplier of limit on overload
+        :param latency_ratio: float latency above usual one of the endpoint multiplied by this is an overload,
+            None to ignore latency
+        :param clock: callable returning monotonic time in seconds
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_ratio = latency_ratio
+        self._clock = clock
+        self._limit = float(initial)
+        self._in_flight = 0
+        # endpoints differ in latency, a slow endpoint is overloaded only when it is slower than usual
+        self._usual_latency = {}
+        self._last_decrease = None
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a free slot
+
+        :param timeout: float max seconds to wait, None to wait forever
+        :return: True if slot is taken, False on timeout
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            self._in_flight += 1
+            return True
+
+    def release(self, latency, overloaded=False, endpoint=None):
+        """
+        Free a slot and adjust limit by result of the request
+
+        :param latency: float seconds the request took, None if request was not sent
+        :param overloaded: bool API answered 429/5xx or didn't answer in time
+        :param endpoint: str key of the endpoint latency is compared with, e.g. method and path template
+        :return: None
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if latency is None:
+                self._condition.notify_all()
+                return
+            usual_latency = self._usual_latency.get(endpoint)
+            if not overloaded and self.latency_ratio is not None:
+                if usual_latency is None:
+                    self._usual_latency[endpoint] = latency
+                elif latency > usual_latency * self.latency_ratio:
+                    overloaded = True
+                else:
+                    # slowly follow the usual latency
+                    self._usual_latency[endpoint] = usual_latency + (latency - usual_latency) * 0.05
+
+            now = self._clock()
+            if overloaded:
+                # requests in flight during an overload fail together, react once per usual latency
+                window = usual_latency or 0
+                if self._last_decrease is None or now - self._last_decrease >= window:
+                    self._limit = max(self.min_limit, self._limit * self.decrease)
+                    self._last_decrease = now
+            else:
+                self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+            self._condition.notify_all()
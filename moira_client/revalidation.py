@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 128
+
+
+class _Entry:
+    __slots__ = ('etag', 'last_modified', 'value', 'models')
+
+    def __init__(self, etag, last_modified, value):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.value = value
+        self.models = None
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class RevalidationCache:
+    """
+    Decoded GET responses by URL with their ETag / Last-Modified validators.
+    Client sends the validators with the next GET of the URL and reuses the cached
+    response (and models built of it) if the server answers 304 Not Modified.
+    Cached responses are shared by callers and must not be modified.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+
+        :param max_entries: int max number of cached URLs, least recently used are evicted
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url):
+        """
+        Returns cache entry of URL
+
+        :param url: str
+        :return: entry or None
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.pop(url)
+                self._entries[url] = entry
+            return entry
+
+    def hit(self, url, entry):
+        """
+        Account response not modified since entry was stored
+
+        :param url: str
+        :param entry: entry returned by get()
+        :return: cached decoded response
+        """
+        with self._lock:
+            self.hits += 1
+        return entry.value
+
+    def store(self, url, headers, value):
+        """
+        Store decoded response, responses without validators are not cached
+
+        :param url: str
+        :param headers: dict response headers
+        :param value: decoded response
+        :return: None
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        with self._lock:
+            self._entries.pop(url, None)
+            if not etag and not last_modified:
+                return
+            self._entries[url] = _Entry(etag, last_modified, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def models(self, url, value, build):
+        """
+        Returns models built of response, reusing models of a not modified response
+
+        :param url: str
+        :param value: decoded response
+        :param build: callable(value) returning models
+        :return: models
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and entry.value is value and entry.models is not None:
+                return entry.models
+        models = build(value)
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and entry.value is value:
+                entry.models = models
+        return models
+
+    def clear(self):
+        """
+        Remove all entries
+
+        :return: None
+        """
+        with self._lock:
+            self._entries.clear()
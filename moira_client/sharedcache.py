@@ -0,0 +1,534 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+
+from .client import ResponseStructureError
+from .compat import monotonic
+from .snapshot import _NOT_MODIFIED
+from .snapshot import _Validators
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MOIRAINV'
+FORMAT_VERSION = 1
+
+TABLE_TRIGGERS = 'triggers'
+TABLE_SUBSCRIPTIONS = 'subscriptions'
+
+TABLES = (TABLE_TRIGGERS, TABLE_SUBSCRIPTIONS)
+
+# API path of every table
+_PATHS = {
+    TABLE_TRIGGERS: 'trigger',
+    TABLE_SUBSCRIPTIONS: 'subscription',
+}
+
+# magic, format version, number of tables, creation time, offset and length of JSON metadata.
+# The file is shared by processes of one host, numbers are in native byte order, so that
+# index arrays are read in place with memoryview.cast().
+_HEADER = struct.Struct('=8sIIdQQ')
+# number of items, offsets of id offsets, data offsets, then number of tags,
+# offsets of tag offsets, posting offsets and postings arrays
+_TABLE = struct.Struct('=7Q')
+_OFFSET = 'Q'
+_POSTING = 'I'
+
+
+class SharedInventoryError(ValueError):
+    pass
+
+
+def _align(buf):
+    buf.extend(b'\0' * (-len(buf) % 8))
+
+
+def _append_array(buf, typecode, values):
+    _align(buf)
+    offset = len(buf)
+    buf.extend(array(typecode, values).tobytes())
+    return offset
+
+
+def _append_blobs(buf, blobs):
+    """
+    Append blobs and return array of their absolute offsets, one more than blobs
+    """
+    offsets = [len(buf)]
+    for blob in blobs:
+        buf.extend(blob)
+        offsets.append(len(buf))
+    return offsets
+
+
+def _encode_table(buf, items):
+    """
+    Append table of items sorted by id with an index of tags, return its _TABLE fields
+    """
+    records = {}
+    for item in items:
+        if item.get('id') is None:
+            continue
+        records[str(item['id']).encode('utf-8')] = item
+    ids = sorted(records)
+
+    postings = {}
+    for index, item_id in enumerate(ids):
+        for tag in set(records[item_id].get('tags') or []):
+            postings.setdefault(tag.encode('utf-8'), []).append(index)
+    tags = sorted(postings)
+
+    id_offsets = _append_blobs(buf, ids)
+    data_offsets = _append_blobs(
+        buf, [json.dumps(records[item_id], separators=(',', ':')).encode('utf-8') for item_id in ids],
+    )
+    tag_offsets = _append_blobs(buf, tags)
+    posting_offsets = [0]
+    for tag in tags:
+        posting_offsets.append(posting_offsets[-1] + len(postings[tag]))
+    return (
+        len(ids),
+        _append_array(buf, _OFFSET, id_offsets),
+        _append_array(buf, _OFFSET, data_offsets),
+        len(tags),
+        _append_array(buf, _OFFSET, tag_offsets),
+        _append_array(buf, _OFFSET, posting_offsets),
+        _append_array(buf, _POSTING, [index for tag in tags for index in postings[tag]]),
+    )
+
+
+def encode_inventory(tables, meta=None, created=None):
+    """
+    Serialize items to the shared inventory format
+
+    :param tables: dict of list of dict items by TABLE_* constant
+    :param meta: dict JSON-serializable metadata
+    :param created: float unix time, now by default
+    :return: bytes
+    """
+    buf = bytearray(_HEADER.size + _TABLE.size * len(TABLES))
+    fields = [_encode_table(buf, tables.get(table) or []) for table in TABLES]
+    meta = json.dumps(meta or {}).encode('utf-8')
+    meta_offset = len(buf)
+    buf.extend(meta)
+    _HEADER.pack_into(buf, 0, MAGIC, FORMAT_VERSION, len(TABLES),
+                      time.time() if created is None else created, meta_offset, len(meta))
+    for i, table in enumerate(fields):
+        _TABLE.pack_into(buf, _HEADER.size + _TABLE.size * i, *table)
+    return bytes(buf)
+
+
+def write_inventory(path, tables, meta=None):
+    """
+    Atomically replace the shared inventory file, readers keep the previous version mapped
+    until they notice the new one
+
+    :param path: str file path
+    :param tables: dict of list of dict items by TABLE_* constant
+    :param meta: dict JSON-serializable metadata
+    :return: None
+    """
+    data = encode_inventory(tables, meta)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class _Table:
+    """
+    Table of a mapped inventory: items sorted by id and an index of tags, read in place
+    """
+    def __init__(self, mm, view, n_items, id_offsets, data_offsets, n_tags, tag_offsets, posting_offsets,
+                 postings):
+        self._mm = mm
+        self._view = view
+        self.size = n_items
+        self._ids = view[id_offsets:id_offsets + 8 * (n_items + 1)].cast(_OFFSET)
+        self._data = view[data_offsets:data_offsets + 8 * (n_items + 1)].cast(_OFFSET)
+        self._tags = view[tag_offsets:tag_offsets + 8 * (n_tags + 1)].cast(_OFFSET)
+        self._posting_offsets = view[posting_offsets:posting_offsets + 8 * (n_tags + 1)].cast(_OFFSET)
+        n_postings = self._posting_offsets[n_tags]
+        self._postings = view[postings:postings + 4 * n_postings].cast(_POSTING)
+        self._n_tags = n_tags
+
+    def release(self):
+        for view in (self._ids, self._data, self._tags, self._posting_offsets, self._postings):
+            view.release()
+
+    @staticmethod
+    def _search(mm, offsets, count, key):
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mm[offsets[mid]:offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < count and mm[offsets[lo]:offsets[lo + 1]] == key:
+            return lo
+        return -1
+
+    def find(self, item_id):
+        return self._search(self._mm, self._ids, self.size, item_id.encode('utf-8'))
+
+    def id(self, index):
+        return self._mm[self._ids[index]:self._ids[index + 1]].decode('utf-8')
+
+    def data(self, index):
+        return self._view[self._data[index]:self._data[index + 1]]
+
+    def indexes(self, tag=None):
+        if tag is None:
+            return range(self.size)
+        index = self._search(self._mm, self._tags, self._n_tags, tag.encode('utf-8'))
+        if index < 0:
+            return ()
+        return self._postings[self._posting_offsets[index]:self._posting_offsets[index + 1]]
+
+    def tags(self):
+        return [self._mm[self._tags[i]:self._tags[i + 1]].decode('utf-8') for i in range(self._n_tags)]
+
+
+class _Mapping:
+    """
+    Read-only mapping of one version of the inventory file
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < _HEADER.size:
+                raise SharedInventoryError('Truncated shared inventory {}'.format(path))
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_dev, stat.st_ino)
+        self._view = memoryview(self._mm)
+        magic, version, n_tables, self.created, meta_offset, meta_length = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != FORMAT_VERSION or n_tables != len(TABLES):
+            self.close()
+            raise SharedInventoryError('Unsupported shared inventory {} format {}'.format(path, version))
+        self.meta = json.loads(self._mm[meta_offset:meta_offset + meta_length].decode('utf-8'))
+        self.tables = {
+            table: _Table(self._mm, self._view, *_TABLE.unpack_from(self._mm, _HEADER.size + _TABLE.size * i))
+            for i, table in enumerate(TABLES)
+        }
+
+    def close(self):
+        """
+        Unmap the file unless views of it are still referenced, then it is unmapped when they are released
+        """
+        for table in getattr(self, 'tables', {}).values():
+            table.release()
+        self._view.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+
+
+class SharedInventory:
+    """
+    Triggers and subscriptions of a shared inventory file written by SharedInventoryRefresher.
+
+    The file is mapped read-only, so processes of a host share one copy of it in the page cache.
+    Lookups by id and tag are binary searches over index arrays read in place, items are decoded
+    only when they are returned. A file replaced by the refresher is remapped on the next lookup
+    after `check_interval`.
+    """
+    def __init__(self, path, client=None, check_interval=1.0, clock=monotonic):
+        """
+
+        :param path: str file path, it may not exist yet
+        :param client: Client passed to models
+        :param check_interval: float seconds between checks whether the file is replaced
+        :param clock: callable returning monotonic time in seconds
+        """
+        self.path = path
+        self.client = client
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._current = None
+        self._checked_at = None
+        self._closed = False
+
+    def _mapping(self):
+        now = self._clock()
+        checked_at = self._checked_at
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return self._current
+        with self._lock:
+            if self._closed:
+                raise ValueError('Shared inventory is closed')
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return self._current
+            current = self._current
+            if current is not None and current.identity == (stat.st_dev, stat.st_ino):
+                return current
+            try:
+                self._current = _Mapping(self.path)
+            except (OSError, ValueError) as e:
+                logger.warning('Failed to map shared inventory %s: %s', self.path, e)
+                return current
+            # the previous mapping is not closed: lookups of other threads and views returned to callers
+            # may still read it, it is unmapped when the last of them drops its reference
+            return self._current
+
+    def _table(self, table):
+        mapping = self._mapping()
+        return mapping.tables[table] if mapping is not None else None
+
+    def _data(self, table, item_id):
+        table = self._table(table)
+        if table is None:
+            return None
+        index = table.find(item_id)
+        return table.data(index) if index >= 0 else None
+
+    def _items(self, table, tag):
+        table = self._table(table)
+        if table is None:
+            return []
+        return [json.loads(bytes(table.data(index))) for index in table.indexes(tag)]
+
+    def _ids(self, table, tag):
+        table = self._table(table)
+        if table is None:
+            return []
+        return [table.id(index) for index in table.indexes(tag)]
+
+    def trigger_data(self, trigger_id):
+        """
+        Returns JSON of trigger without copying it out of the mapped file
+
+        :param trigger_id: str trigger id
+        :return: memoryview of UTF-8 JSON or None
+        """
+        return self._data(TABLE_TRIGGERS, trigger_id)
+
+    def trigger(self, trigger_id):
+        """
+        Returns trigger by id
+
+        :param trigger_id: str trigger id
+        :return: Trigger or None
+        """
+        from .models.trigger import Trigger
+
+        data = self.trigger_data(trigger_id)
+        return Trigger(self.client, **json.loads(bytes(data))) if data is not None else None
+
+    def triggers(self, tag=None):
+        """
+        Returns triggers, all or with tag
+
+        :param tag: str tag of triggers
+        :return: list of Trigger
+        """
+        from .models.trigger import Trigger
+
+        return [Trigger(self.client, **data) for data in self._items(TABLE_TRIGGERS, tag)]
+
+    def trigger_ids(self, tag=None):
+        """
+        Returns sorted ids of triggers, all or with tag
+
+        :param tag: str tag of triggers
+        :return: list of str
+        """
+        return self._ids(TABLE_TRIGGERS, tag)
+
+    def subscription_data(self, subscription_id):
+        """
+        Returns JSON of subscription without copying it out of the mapped file
+
+        :param subscription_id: str subscription id
+        :return: memoryview of UTF-8 JSON or None
+        """
+        return self._data(TABLE_SUBSCRIPTIONS, subscription_id)
+
+    def subscription(self, subscription_id):
+        """
+        Returns subscription by id
+
+        :param subscription_id: str subscription id
+        :return: Subscription or None
+        """
+        from .models.subscription import Subscription
+
+        data = self.subscription_data(subscription_id)
+        return Subscription(self.client, **json.loads(bytes(data))) if data is not None else None
+
+    def subscriptions(self, tag=None):
+        """
+        Returns subscriptions, all or with tag
+
+        :param tag: str tag of subscriptions
+        :return: list of Subscription
+        """
+        from .models.subscription import Subscription
+
+        return [Subscription(self.client, **data) for data in self._items(TABLE_SUBSCRIPTIONS, tag)]
+
+    def subscription_ids(self, tag=None):
+        """
+        Returns sorted ids of subscriptions, all or with tag
+
+        :param tag: str tag of subscriptions
+        :return: list of str
+        """
+        return self._ids(TABLE_SUBSCRIPTIONS, tag)
+
+    def tags(self):
+        """
+        Returns names of tags of triggers and subscriptions
+
+        :return: list of str
+        """
+        mapping = self._mapping()
+        if mapping is None:
+            return []
+        return sorted(set(mapping.tables[TABLE_TRIGGERS].tags()) | set(mapping.tables[TABLE_SUBSCRIPTIONS].tags()))
+
+    def staleness(self):
+        """
+        Returns seconds since the refresher last checked the inventory
+
+        :return: float seconds or None if the file does not exist
+        """
+        try:
+            return max(0.0, time.time() - os.stat(self.path).st_mtime)
+        except FileNotFoundError:
+            return None
+
+    def close(self):
+        """
+        Stop using the file, it is unmapped once lookups in progress and views returned to callers are done
+
+        :return: None
+        """
+        with self._lock:
+            self._closed = True
+            self._current = None
+            self._checked_at = None
+
+
+class SharedInventoryRefresher:
+    """
+    Fetches triggers and subscriptions with conditional GETs and replaces the shared inventory file
+    when they are modified. One refresher per host serves any number of SharedInventory readers.
+    """
+    def __init__(self, path, client):
+        """
+
+        :param path: str file path
+        :param client: Client
+        """
+        self.path = path
+        self.client = client
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._items = {}
+        self._validators = {}
+        self._load()
+
+    def _load(self):
+        """
+        Continue from the existing file, so that a restarted refresher revalidates it
+        """
+        try:
+            mapping = _Mapping(self.path)
+        except (OSError, ValueError):
+            return
+        try:
+            for table in TABLES:
+                items = mapping.tables[table]
+                self._items[table] = [json.loads(bytes(items.data(i))) for i in range(items.size)]
+                etag, last_modified = mapping.meta.get('validators', {}).get(table) or (None, None)
+                self._validators[table] = _Validators(etag, last_modified)
+        finally:
+            mapping.close()
+
+    def refresh(self):
+        """
+        Fetch triggers and subscriptions modified since the last refresh and replace the file
+        if any of them changed, otherwise only its modification time is updated
+
+        :return: bool whether the file was replaced
+
+        :raises: HTTPError
+        :raises: ResponseStructureError
+        """
+        with self._lock:
+            modified = False
+            for table in TABLES:
+                validators = self._validators.get(table)
+                if validators is None or table not in self._items:
+                    validators = _Validators(None, None)
+                result = self.client.get(_PATHS[table], revalidation_cache=validators)
+                if result is _NOT_MODIFIED:
+                    continue
+                if 'list' not in result:
+                    raise ResponseStructureError("list doesn't exist in response", result)
+                self._items[table] = result['list']
+                self._validators[table] = validators
+                modified = True
+            if modified or not os.path.exists(self.path):
+                meta = {'validators': {
+                    table: [validators.etag, validators.last_modified] for table, validators in self._validators.items()
+                }}
+                write_inventory(self.path, self._items, meta)
+                return True
+            os.utime(self.path)
+            return False
+
+    def start(self, interval=60.0):
+        """
+        Refresh inventory in a background thread. Errors are logged and kept in `last_error`.
+
+        :param interval: float seconds between refreshes
+        :return: None
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='moira-shared-inventory')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop background refresh
+
+        :return: None
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                logger.warning('Failed to refresh shared Moira inventory %s: %s', self.path, e)
+                self.last_error = e
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call with some key is in flight,
+    other calls with the same key wait for it and share its result or exception.
+    Results are shared by callers and must not be modified.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._async_flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        """
+        Call fn unless a call with the same key is in flight
+
+        :param key: hashable key of the call
+        :param fn: callable without arguments
+        :param timeout: float max seconds to wait for a call in flight, None to wait forever
+        :return: result of fn
+
+        :raises: concurrent.futures.TimeoutError
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result(timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    async def do_async(self, key, fn):
+        """
+        Await fn() unless a call with the same key is in flight in the running event loop
+
+        :param key: hashable key of the call
+        :param fn: callable without arguments returning an awaitable
+        :return: result of fn
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            self.calls += 1
+            future = self._async_flights.get(flight_key)
+            leader = future is None
+            if leader:
+                future = self._async_flights[flight_key] = loop.create_future()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return await asyncio.shield(future)
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # followers may be absent, mark the exception retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._async_flights[flight_key]
+
+    def in_flight(self):
+        """
+        Returns number of calls in flight
+
+        :return: int
+        """
+        with self._lock:
+            return len(self._flights) + len(self._async_flights)
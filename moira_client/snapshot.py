@@ -0,0 +1,426 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from .client import ResponseStructureError
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+COLLECTION_TRIGGERS = 'triggers'
+COLLECTION_SUBSCRIPTIONS = 'subscriptions'
+COLLECTION_CONTACTS = 'contacts'
+COLLECTION_TAG_STATS = 'tag_stats'
+
+COLLECTIONS = (COLLECTION_TRIGGERS, COLLECTION_SUBSCRIPTIONS, COLLECTION_CONTACTS, COLLECTION_TAG_STATS)
+
+# API path of every collection
+_PATHS = {
+    COLLECTION_TRIGGERS: 'trigger',
+    COLLECTION_SUBSCRIPTIONS: 'subscription',
+    COLLECTION_CONTACTS: 'contact',
+    COLLECTION_TAG_STATS: 'tag/stats',
+}
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS triggers (id TEXT PRIMARY KEY, name TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS triggers_name ON triggers (name);
+CREATE TABLE IF NOT EXISTS trigger_tags (tag TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY (tag, id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigger_tags_id ON trigger_tags (id);
+CREATE TABLE IF NOT EXISTS subscriptions (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS subscription_tags (tag TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY (tag, id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS subscription_tags_id ON subscription_tags (id);
+CREATE TABLE IF NOT EXISTS contacts (id TEXT PRIMARY KEY, type TEXT, value TEXT, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tag_stats (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+'''
+
+# main table and tag index table of every collection
+_TABLES = {
+    COLLECTION_TRIGGERS: ('triggers', 'trigger_tags'),
+    COLLECTION_SUBSCRIPTIONS: ('subscriptions', 'subscription_tags'),
+    COLLECTION_CONTACTS: ('contacts', None),
+    COLLECTION_TAG_STATS: ('tag_stats', None),
+}
+
+_NOT_MODIFIED = object()
+
+
+class _Validators:
+    """
+    Revalidation cache of one refresh of a collection: sends the stored validators
+    and keeps validators of a modified response to store them with its items
+    """
+    def __init__(self, etag, last_modified):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def get(self, url):
+        return self if self.etag or self.last_modified else None
+
+    def hit(self, url, entry):
+        return _NOT_MODIFIED
+
+    def store(self, url, headers, value):
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def _encode(item):
+    return json.dumps(item, sort_keys=True, separators=(',', ':'))
+
+
+def _item_id(collection, item):
+    if collection == COLLECTION_TAG_STATS:
+        return item.get('name')
+    return item.get('id')
+
+
+class InventorySnapshot:
+    """
+    Local SQLite snapshot of triggers, subscriptions, contacts and tag stats of a Moira installation,
+    indexed by id, tag and trigger name, so that tools can start without fetching the whole inventory.
+
+    Refresh sends conditional GETs and writes only changed items. The snapshot file may be shared
+    by processes, one of them refreshing it.
+    """
+    def __init__(self, path, client=None, clock=time.time):
+        """
+
+        :param path: str SQLite database file path, ':memory:' for an in-memory snapshot
+        :param client: Client refreshing the snapshot and passed to models, None for a read-only snapshot
+        :param clock: callable returning unix time in seconds
+        """
+        self.path = path
+        self.client = client
+        self.last_error = None
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            if path != ':memory:':
+                # readers of other processes are not blocked by the refresher
+                self._db.execute('PRAGMA journal_mode=WAL')
+            self._create_schema()
+
+    def _create_schema(self):
+        self._db.executescript(_SCHEMA)
+        version = self._meta('schema')
+        if version is not None and int(version) != SCHEMA_VERSION:
+            for table in ('meta', 'triggers', 'trigger_tags', 'subscriptions', 'subscription_tags', 'contacts',
+                          'tag_stats'):
+                self._db.execute('DROP TABLE IF EXISTS ' + table)
+            self._db.executescript(_SCHEMA)
+        self._set_meta('schema', str(SCHEMA_VERSION))
+
+    def _meta(self, key):
+        row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _set_meta(self, key, value):
+        if value is None:
+            self._db.execute('DELETE FROM meta WHERE key = ?', (key,))
+        else:
+            self._db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def refresh(self, collections=COLLECTIONS):
+        """
+        Fetch collections modified since the last refresh and write their changed items
+
+        :param collections: list of COLLECTION_* constants
+        :return: dict of changes by collection: counts of 'added', 'updated' and 'removed' items,
+            None for a not modified collection
+
+        :raises: HTTPError
+        :raises: ResponseStructureError
+        """
+        if self.client is None:
+            raise ValueError('Snapshot without client can not be refreshed')
+        changes = {}
+        for collection in collections:
+            with self._lock:
+                validators = _Validators(
+                    self._meta('etag:' + collection), self._meta('last_modified:' + collection),
+                )
+            result = self.client.get(_PATHS[collection], revalidation_cache=validators)
+            checked_at = self._clock()
+            if result is _NOT_MODIFIED:
+                with self._lock:
+                    self._set_meta('refreshed_at:' + collection, repr(checked_at))
+                changes[collection] = None
+                continue
+            if 'list' not in result:
+                raise ResponseStructureError("list doesn't exist in response", result)
+            with self._lock:
+                changes[collection] = self._write(collection, result['list'], validators, checked_at)
+        return changes
+
+    def _write(self, collection, items, validators, checked_at):
+        table, tags_table = _TABLES[collection]
+        changes = {'added': 0, 'updated': 0, 'removed': 0}
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            existing = dict(self._db.execute('SELECT id, data FROM ' + table))
+            seen = set()
+            for item in items:
+                item_id = _item_id(collection, item)
+                if item_id is None:
+                    continue
+                seen.add(item_id)
+                data = _encode(item)
+                previous = existing.get(item_id)
+                if previous == data:
+                    continue
+                changes['added' if previous is None else 'updated'] += 1
+                self._upsert(collection, item_id, item, data)
+                if tags_table is not None:
+                    self._db.execute('DELETE FROM ' + tags_table + ' WHERE id = ?', (item_id,))
+                    self._db.executemany(
+                        'INSERT OR IGNORE INTO ' + tags_table + ' (tag, id) VALUES (?, ?)',
+                        [(tag, item_id) for tag in item.get('tags') or []],
+                    )
+            removed = [(item_id,) for item_id in existing if item_id not in seen]
+            changes['removed'] = len(removed)
+            self._db.executemany('DELETE FROM ' + table + ' WHERE id = ?', removed)
+            if tags_table is not None:
+                self._db.executemany('DELETE FROM ' + tags_table + ' WHERE id = ?', removed)
+            self._set_meta('etag:' + collection, validators.etag)
+            self._set_meta('last_modified:' + collection, validators.last_modified)
+            self._set_meta('refreshed_at:' + collection, repr(checked_at))
+            self._db.execute('COMMIT')
+        except Exception:
+            self._db.execute('ROLLBACK')
+            raise
+        return changes
+
+    def _upsert(self, collection, item_id, item, data):
+        if collection == COLLECTION_TRIGGERS:
+            self._db.execute(
+                'INSERT OR REPLACE INTO triggers (id, name, data) VALUES (?, ?, ?)', (item_id, item.get('name'), data),
+            )
+        elif collection == COLLECTION_CONTACTS:
+            self._db.execute(
+                'INSERT OR REPLACE INTO contacts (id, type, value, data) VALUES (?, ?, ?, ?)',
+                (item_id, item.get('type'), item.get('value'), data),
+            )
+        else:
+            self._db.execute('INSERT OR REPLACE INTO ' + _TABLES[collection][0] + ' (id, data) VALUES (?, ?)',
+                             (item_id, data))
+
+    def refreshed_at(self, collection=None):
+        """
+        Returns time of the last successful refresh
+
+        :param collection: str one of COLLECTION_* constants, None for the least recently refreshed collection
+        :return: float unix time or None if never refreshed
+        """
+        with self._lock:
+            times = [self._meta('refreshed_at:' + name) for name in ([collection] if collection else COLLECTIONS)]
+        if any(value is None for value in times):
+            return None
+        return min(float(value) for value in times)
+
+    def staleness(self, collection=None):
+        """
+        Returns seconds since the last successful refresh
+
+        :param collection: str one of COLLECTION_* constants, None for the least recently refreshed collection
+        :return: float seconds or None if never refreshed
+        """
+        refreshed_at = self.refreshed_at(collection)
+        if refreshed_at is None:
+            return None
+        return max(0.0, self._clock() - refreshed_at)
+
+    def start(self, interval=60.0):
+        """
+        Refresh snapshot in a background thread. Errors are logged and kept in `last_error`.
+
+        :param interval: float seconds between refreshes
+        :return: None
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='moira-snapshot')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop background refresh
+
+        :return: None
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                logger.warning('Failed to refresh Moira snapshot %s: %s', self.path, e)
+                self.last_error = e
+
+    def close(self):
+        """
+        Stop background refresh and close the database
+
+        :return: None
+        """
+        self.stop()
+        with self._lock:
+            self._db.close()
+
+    def _rows(self, query, args=()):
+        with self._lock:
+            return [json.loads(row[0]) for row in self._db.execute(query, args)]
+
+    def trigger(self, trigger_id):
+        """
+        Returns trigger by id
+
+        :param trigger_id: str trigger id
+        :return: Trigger or None
+        """
+        from .models.trigger import Trigger
+
+        rows = self._rows('SELECT data FROM triggers WHERE id = ?', (trigger_id,))
+        return Trigger(self.client, **rows[0]) if rows else None
+
+    def triggers(self, tag=None, name=None):
+        """
+        Returns triggers, all or filtered by tag and name
+
+        :param tag: str tag of triggers
+        :param name: str name of triggers
+        :return: list of Trigger
+        """
+        from .models.trigger import Trigger
+
+        return [Trigger(self.client, **data) for data in self._query('triggers', 'trigger_tags', tag, name)]
+
+    def trigger_ids(self, tag=None):
+        """
+        Returns ids of triggers, all or with tag
+
+        :param tag: str tag of triggers
+        :return: list of str
+        """
+        with self._lock:
+            if tag is None:
+                return [row[0] for row in self._db.execute('SELECT id FROM triggers ORDER BY id')]
+            return [row[0] for row in self._db.execute('SELECT id FROM trigger_tags WHERE tag = ? ORDER BY id',
+                                                       (tag,))]
+
+    def subscription(self, subscription_id):
+        """
+        Returns subscription by id
+
+        :param subscription_id: str subscription id
+        :return: Subscription or None
+        """
+        from .models.subscription import Subscription
+
+        rows = self._rows('SELECT data FROM subscriptions WHERE id = ?', (subscription_id,))
+        return Subscription(self.client, **rows[0]) if rows else None
+
+    def subscriptions(self, tag=None):
+        """
+        Returns subscriptions, all or with tag
+
+        :param tag: str tag of subscriptions
+        :return: list of Subscription
+        """
+        from .models.subscription import Subscription
+
+        return [Subscription(self.client, **data) for data in self._query('subscriptions', 'subscription_tags', tag)]
+
+    def contact(self, contact_id):
+        """
+        Returns contact by id
+
+        :param contact_id: str contact id
+        :return: Contact or None
+        """
+        from .models.contact import Contact
+
+        rows = self._rows('SELECT data FROM contacts WHERE id = ?', (contact_id,))
+        return Contact(**rows[0]) if rows else None
+
+    def contacts(self, type=None, value=None):
+        """
+        Returns contacts, all or filtered by type and value
+
+        :param type: str contact type
+        :param value: str contact value
+        :return: list of Contact
+        """
+        from .models.contact import Contact
+
+        conditions, args = [], []
+        for column, arg in (('type', type), ('value', value)):
+            if arg is not None:
+                conditions.append(column + ' = ?')
+                args.append(arg)
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        return [Contact(**data) for data in self._rows('SELECT data FROM contacts' + where + ' ORDER BY id', args)]
+
+    def tag_stats(self):
+        """
+        Returns stats of tags
+
+        :return: list of TagStats
+        """
+        from .models.subscription import Subscription
+        from .models.tag import TagStats
+
+        stats = []
+        for stat in self._rows('SELECT data FROM tag_stats ORDER BY id'):
+            subscriptions = [Subscription(self.client, **subscription) for subscription in stat.get('subscriptions', [])]
+            stats.append(TagStats(**dict(stat, subscriptions=subscriptions)))
+        return stats
+
+    def tags(self):
+        """
+        Returns names of tags of triggers and subscriptions
+
+        :return: list of str
+        """
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                'SELECT tag FROM trigger_tags UNION SELECT tag FROM subscription_tags ORDER BY 1'
+            )]
+
+    def _query(self, table, tags_table, tag=None, name=None):
+        query = 'SELECT t.data FROM ' + table + ' t'
+        conditions, args = [], []
+        if tag is not None:
+            query += ' JOIN ' + tags_table + ' g ON g.id = t.id'
+            conditions.append('g.tag = ?')
+            args.append(tag)
+        if name is not None:
+            conditions.append('t.name = ?')
+            args.append(name)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        return self._rows(query + ' ORDER BY t.id', args)
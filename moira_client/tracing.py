@@ -0,0 +1,197 @@
+import contextvars
+import functools
+import random
+import time
+from contextlib import contextmanager
+
+STATUS_UNSET = 'UNSET'
+STATUS_OK = 'OK'
+STATUS_ERROR = 'ERROR'
+
+_current_span = contextvars.ContextVar('moira_client_span', default=None)
+
+
+class NoOpSpan:
+    """
+    Span of a disabled tracer
+    """
+    def is_recording(self):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def record_exception(self, exception, attributes=None):
+        pass
+
+    def set_status(self, status, description=None):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = NoOpSpan()
+
+
+class _NoOpContext:
+    def __enter__(self):
+        return NOOP_SPAN
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_CONTEXT = _NoOpContext()
+
+
+class NoOpTracer:
+    """
+    Tracer doing nothing, used when tracing is disabled
+    """
+    def start_as_current_span(self, name, attributes=None):
+        return _NOOP_CONTEXT
+
+
+NOOP_TRACER = NoOpTracer()
+
+
+class Span:
+    """
+    Finished or current span of Tracer, a subset of OpenTelemetry Span API
+    """
+    def __init__(self, name, trace_id, span_id, parent_id, start_time, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_time = start_time
+        self.end_time = None
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = STATUS_UNSET
+        self.description = None
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time if self.end_time is not None else None
+
+    def is_recording(self):
+        return self.end_time is None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+    def add_event(self, name, attributes=None):
+        self.events.append((name, dict(attributes or {})))
+
+    def record_exception(self, exception, attributes=None):
+        event = {'exception.type': type(exception).__name__, 'exception.message': str(exception)}
+        event.update(attributes or {})
+        self.add_event('exception', event)
+
+    def set_status(self, status, description=None):
+        self.status = status
+        self.description = description
+
+    def __repr__(self):
+        return '(Span {} duration={} status={})'.format(self.name, self.duration, self.status)
+
+
+class InMemorySpanExporter:
+    """
+    Keeps finished spans in memory, for tests and benchmarks
+    """
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+    def get_finished_spans(self):
+        return list(self.spans)
+
+    def clear(self):
+        del self.spans[:]
+
+
+class Tracer:
+    """
+    Minimal tracer compatible with OpenTelemetry `Tracer.start_as_current_span`.
+    An OpenTelemetry tracer may be passed to Client instead.
+    """
+    def __init__(self, exporter=None, clock=time.time):
+        """
+
+        :param exporter: object with export(spans) method, InMemorySpanExporter by default
+        :param clock: callable returning time in seconds
+        """
+        self.exporter = exporter if exporter is not None else InMemorySpanExporter()
+        self._clock = clock
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        """
+        Start span as a child of the current span
+
+        :param name: str span name
+        :param attributes: dict span attributes
+        :return: context manager yielding Span
+        """
+        parent = _current_span.get()
+        span = Span(
+            name,
+            parent.trace_id if parent is not None else random.getrandbits(128),
+            random.getrandbits(64),
+            parent.span_id if parent is not None else None,
+            self._clock(),
+            attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            span.set_status(STATUS_ERROR, str(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time = self._clock()
+            self.exporter.export([span])
+
+
+def traced(method):
+    """
+    Trace method of a manager or model in a span named after the method, e.g. 'Trigger.save'.
+    The tracer of the object client is used.
+    """
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        tracer = getattr(self._client, 'tracer', NOOP_TRACER)
+        if tracer is NOOP_TRACER:
+            return method(self, *args, **kwargs)
+        with tracer.start_as_current_span(name):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def in_current_context(fn):
+    """
+    Bind function to a copy of the current context, so that spans it starts in a thread of an executor
+    are children of the current span. Make a copy per submitted task, a context can't run in two threads.
+
+    :param fn: callable
+    :return: callable running fn in the copied context
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
@@ -0,0 +1,129 @@
+import functools
+import json
+
+import requests
+from requests import HTTPError
+from requests.structures import CaseInsensitiveDict
+
+
+class Transport:
+    """
+    Sends HTTP requests of Client
+    """
+    def request(self, method, url, **kwargs):
+        """
+        Send request
+
+        :param method: str HTTP method
+        :param url: str URL
+        :param kwargs: `headers`, `auth`, `params`, `data`, `timeout` and other parameters of requests
+        :return: requests.Response or Response
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release resources of transport
+
+        :return: None
+        """
+
+
+class RequestsTransport(Transport):
+    """
+    Sends requests with `requests`, with a session if given
+    """
+    def __init__(self, session=None):
+        """
+
+        :param session: requests.Session reusing connections, None to use a new connection per request
+        """
+        self.session = session
+
+    def request(self, method, url, **kwargs):
+        if self.session is not None:
+            return self.session.request(method, url, **kwargs)
+        return getattr(requests, method.lower())(url, **kwargs)
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+class Response:
+    """
+    Response of transports not based on `requests`, a subset of requests.Response
+    """
+    def __init__(self, status_code, content=b'', headers=None, url=None):
+        """
+
+        :param status_code: int HTTP status
+        :param content: bytes body
+        :param headers: dict headers
+        :param url: str request URL
+        """
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError('{} Error for url: {}'.format(self.status_code, self.url), response=self)
+
+    def __repr__(self):
+        return '<Response [{}]>'.format(self.status_code)
+
+
+class AsyncTransport:
+    """
+    Sends HTTP requests from a running event loop
+    """
+    async def request(self, method, url, **kwargs):
+        """
+        Send request
+
+        :param method: str HTTP method
+        :param url: str URL
+        :param kwargs: parameters of Transport.request
+        :return: requests.Response or Response
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """
+        Release resources of transport
+
+        :return: None
+        """
+
+
+class ThreadedAsyncTransport(AsyncTransport):
+    """
+    Runs a blocking transport in threads of an executor
+    """
+    def __init__(self, transport=None, executor=None):
+        """
+
+        :param transport: Transport, RequestsTransport by default
+        :param executor: concurrent.futures.Executor, None for the default executor of the event loop
+        """
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.executor = executor
+
+    async def request(self, method, url, **kwargs):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self.transport.request, method, url, **kwargs)
+        return await loop.run_in_executor(self.executor, call)
+
+    async def close(self):
+        self.transport.close()
@@ -1,11 +1,11 @@
-from distutils.core import setup
+from setuptools import setup
 
 with open('requirements.txt') as f:
     required = f.read().splitlines()
 
 setup(
     name='moira-client',
-    version='2.4.8',
+    version='2.5.0',
     description='Client for Moira - Alerting system based on Graphite data',
     keywords='moira monitoring client metrics alerting',
     long_description="""
@@ -42,5 +42,10 @@ setup(
         "License :: OSI Approved :: MIT License"
     ],
     url='https://github.com/moira-alert/python-moira-client',
-    install_requires=required
+    install_requires=required,
+    entry_points={
+        'console_scripts': [
+            'moira-client = moira_client.cli:main',
+        ],
+    },
 )
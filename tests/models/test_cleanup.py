@@ -0,0 +1,133 @@
+import os
+import re
+import shutil
+import tempfile
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from requests.exceptions import ConnectionError
+from requests.exceptions import HTTPError
+
+from moira_client.client import Client
+from moira_client.models.cleanup import MetricCleaner
+from moira_client.models.trigger import TriggerManager
+from .test_model import ModelTest
+
+
+NOW = 10000
+
+STATES = {
+    'trigger/1/state': {
+        'trigger_id': '1',
+        'state': 'NODATA',
+        'metrics': {
+            'host1.cpu': {'state': 'NODATA', 'timestamp': NOW - 7200},
+            'host2.cpu': {'state': 'NODATA', 'timestamp': NOW - 60},
+            'host3.cpu': {'state': 'OK', 'timestamp': NOW - 7200},
+        },
+    },
+    'trigger/2/state': {
+        'trigger_id': '2',
+        'state': 'OK',
+        'metrics': {
+            'db1.disk': {'state': 'NODATA', 'timestamp': NOW - 7200},
+            'db2.disk': {'state': 'NODATA'},
+        },
+    },
+}
+
+
+class MetricCleanerTest(ModelTest):
+
+    def setUp(self):
+        self.client = Client(self.api_url)
+        self.trigger_manager = TriggerManager(self.client)
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get(self, path, **kwargs):
+        return STATES[path]
+
+    def test_scan(self):
+        cleaner = MetricCleaner(self.trigger_manager, max_age=3600, clock=lambda: NOW)
+
+        with patch.object(self.client, 'get', side_effect=self.get):
+            selected = cleaner.scan(['1', '2'])
+
+        self.assertEqual(
+            [('1', 'host1.cpu'), ('2', 'db1.disk')],
+            sorted([(item.trigger_id, item.metric) for item in selected]),
+        )
+
+    def test_pattern(self):
+        cleaner = MetricCleaner(self.trigger_manager, states=None, pattern='host*', clock=lambda: NOW)
+        with patch.object(self.client, 'get', side_effect=self.get):
+            self.assertEqual(3, len(cleaner.scan(['1', '2'])))
+
+        cleaner = MetricCleaner(self.trigger_manager, pattern=re.compile(r'^db\d'), clock=lambda: NOW)
+        with patch.object(self.client, 'get', side_effect=self.get):
+            self.assertEqual(['db1.disk', 'db2.disk'], sorted(item.metric for item in cleaner.scan(['1', '2'])))
+
+    def test_dry_run(self):
+        cleaner = MetricCleaner(self.trigger_manager, clock=lambda: NOW)
+
+        with patch.object(self.client, 'get', side_effect=self.get), \
+                patch.object(self.client, 'delete') as delete_mock:
+            report = cleaner.run(['1', '2'], dry_run=True)
+
+        self.assertFalse(delete_mock.called)
+        self.assertEqual(4, len(report.selected))
+        self.assertEqual([], report.removed)
+
+    def test_run_resumes_from_progress_log(self):
+        progress_log = os.path.join(self.tmp_dir, 'progress.log')
+        with open(progress_log, 'w') as f:
+            f.write('1\thost1.cpu\n')
+
+        cleaner = MetricCleaner(
+            self.trigger_manager, max_age=3600, progress_log=progress_log, rate=1000, clock=lambda: NOW,
+        )
+
+        with patch.object(self.client, 'get', side_effect=self.get), \
+                patch.object(self.client, 'delete', return_value=None) as delete_mock:
+            report = cleaner.run(['1', '2'])
+
+        delete_mock.assert_called_once_with('trigger/2/metrics', params={'name': 'db1.disk'})
+        self.assertEqual(['host1.cpu'], [item.metric for item in report.skipped])
+        self.assertEqual(['db1.disk'], [item.metric for item in report.removed])
+        with open(progress_log) as f:
+            self.assertEqual('1\thost1.cpu\n2\tdb1.disk\n', f.read())
+
+    def test_scan_skips_failed_triggers(self):
+        cleaner = MetricCleaner(self.trigger_manager, max_age=3600, clock=lambda: NOW)
+
+        def get(path, **kwargs):
+            if path == 'trigger/2/state':
+                raise HTTPError('404 Not Found')
+            return STATES[path]
+
+        with patch.object(self.client, 'get', side_effect=get), \
+                patch.object(self.client, 'delete', return_value=None):
+            report = cleaner.run(['1', '2'])
+
+        self.assertEqual(['host1.cpu'], [item.metric for item in report.removed])
+        self.assertEqual(['2'], list(report.scan_errors))
+
+    def test_run_continues_after_connection_error(self):
+        cleaner = MetricCleaner(self.trigger_manager, max_age=3600, clock=lambda: NOW)
+
+        def delete(path, params):
+            if params['name'] == 'host1.cpu':
+                raise ConnectionError('connection reset')
+
+        with patch.object(self.client, 'get', side_effect=self.get), \
+                patch.object(self.client, 'delete', side_effect=delete):
+            report = cleaner.run(['1', '2'])
+
+        self.assertEqual(['db1.disk'], [item.metric for item in report.removed])
+        self.assertEqual(['host1.cpu'], [item.metric for item in report.failed])
+        self.assertIsInstance(report.remove_errors[('1', 'host1.cpu')], ConnectionError)
@@ -0,0 +1,183 @@
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from moira_client.client import Client
+from moira_client.models.dependency import CycleError
+from moira_client.models.dependency import TriggerGraph
+from moira_client.models.trigger import Trigger
+from moira_client.models.trigger import TriggerManager
+from .test_model import ModelTest
+
+
+def make_trigger(client, trigger_id=None, parents=None, name=None):
+    return Trigger(
+        client, name or trigger_id, ['tag'], ['pattern'],
+        warn_value=0, error_value=1, parents=parents, id=trigger_id,
+    )
+
+
+class TriggerGraphTest(ModelTest):
+
+    def test_levels(self):
+        a = make_trigger(None, 'a')
+        b = make_trigger(None, 'b', parents=['a'])
+        c = make_trigger(None, 'c', parents=['a', 'b'])
+        d = make_trigger(None, 'd')
+
+        graph = TriggerGraph([c, b, a, d])
+
+        levels = [[t.id for t in level] for level in graph.levels()]
+        self.assertEqual([['a', 'd'], ['b'], ['c']], levels)
+        self.assertEqual(['a', 'd', 'b', 'c'], [t.id for t in graph.topological_order()])
+
+    def test_unknown_parent_is_skipped(self):
+        child = make_trigger(None, 'child', parents=['remote'])
+
+        graph = TriggerGraph([child])
+
+        self.assertEqual([[child]], graph.levels())
+        self.assertIsNone(graph.get('remote'))
+        self.assertIn('remote', graph)
+
+    def test_unknown_parent_levels(self):
+        root = make_trigger(None, 'root')
+        orphan = make_trigger(None, 'orphan', parents=['remote'])
+        child = make_trigger(None, 'child', parents=['orphan', 'root'])
+
+        graph = TriggerGraph([child, orphan, root])
+
+        levels = [[t.id for t in level] for level in graph.levels()]
+        self.assertEqual([['root'], ['orphan'], ['child']], levels)
+
+    def test_cycle(self):
+        a = make_trigger(None, 'a', parents=['c'])
+        b = make_trigger(None, 'b', parents=['a'])
+        c = make_trigger(None, 'c', parents=['b'])
+        d = make_trigger(None, 'd', parents=['a'])
+
+        with self.assertRaises(CycleError) as ctx:
+            TriggerGraph([a, b, c, d])
+
+        cycle = ctx.exception.cycle
+        self.assertEqual(cycle[0], cycle[-1])
+        self.assertEqual({'a', 'b', 'c'}, set(cycle))
+
+    def test_ancestors_descendants(self):
+        a = make_trigger(None, 'a')
+        b = make_trigger(None, 'b', parents=['a'])
+        c = make_trigger(None, 'c', parents=['b'])
+        d = make_trigger(None, 'd', parents=['a'])
+
+        graph = TriggerGraph([a, b, c, d])
+
+        self.assertEqual({'a', 'b'}, graph.ancestors('c'))
+        self.assertEqual(frozenset(), graph.ancestors(a))
+        self.assertEqual({'b', 'c', 'd'}, graph.descendants('a'))
+        self.assertEqual({'c'}, graph.descendants(b))
+        self.assertEqual({'b', 'c'}, graph.impact(['b']))
+
+    def test_local_parent_objects(self):
+        parent = make_trigger(None, name='parent')
+        child = make_trigger(None, name='child', parents=[parent])
+
+        graph = TriggerGraph([child, parent])
+
+        self.assertEqual([[parent], [child]], graph.levels())
+
+
+class SaveAllTest(ModelTest):
+
+    def test_save_all_resolves_parents(self):
+        client = Client(self.api_url)
+        trigger_manager = TriggerManager(client)
+
+        parent = make_trigger(client, name='parent')
+        child = make_trigger(client, name='child', parents=[parent])
+        saved = []
+
+        def put(path, json):
+            saved.append(json)
+            return {'id': json['name'] + '_id'}
+
+        with patch.object(client, 'get', return_value={'list': []}) as get_mock, \
+                patch.object(client, 'put', side_effect=put):
+            ids = trigger_manager.save_all([child, parent])
+
+        get_mock.assert_called_once_with('trigger')
+        self.assertEqual(['child_id', 'parent_id'], ids)
+        self.assertEqual(['parent', 'child'], [data['name'] for data in saved])
+        self.assertEqual(['parent_id'], saved[1]['parents'])
+
+    def test_save_all_existing_without_fetch_by_id(self):
+        client = Client(self.api_url)
+        trigger_manager = TriggerManager(client)
+
+        existing = {'id': 'existing_id', 'name': 'existing', 'tags': ['tag'], 'targets': ['pattern']}
+        matched = make_trigger(client, name='existing')
+        custom = make_trigger(client, 'custom')
+
+        with patch.object(client, 'get', return_value={'list': [existing]}) as get_mock, \
+                patch.object(client, 'put', ) as put_mock:
+            put_mock.side_effect = lambda path, json: {'id': json.get('id')}
+            ids = trigger_manager.save_all([matched, custom])
+
+        get_mock.assert_called_once_with('trigger')
+        self.assertEqual(['existing_id', 'custom'], ids)
+        paths = sorted(call[0][0] for call in put_mock.call_args_list)
+        self.assertEqual(['trigger', 'trigger/existing_id'], paths)
+
+    def test_save_all_detached_parent(self):
+        client = Client(self.api_url)
+        trigger_manager = TriggerManager(client)
+
+        parent = make_trigger(client, name='parent')
+        child = make_trigger(client, name='child', parents=[parent])
+        other = make_trigger(client, name='other')
+
+        with patch.object(client, 'get', return_value={'list': []}), \
+                patch.object(client, 'put') as put_mock:
+            with self.assertRaises(ValueError):
+                trigger_manager.save_all([child, other])
+
+        self.assertFalse(put_mock.called)
+
+    def test_dependency_graph_matches_existing(self):
+        client = Client(self.api_url)
+        trigger_manager = TriggerManager(client)
+
+        existing = {'id': 'parent_id', 'name': 'parent', 'tags': ['tag'], 'targets': ['pattern']}
+        parent = make_trigger(client, name='parent')
+        child = make_trigger(client, name='child', parents=[parent])
+
+        with patch.object(client, 'get', return_value={'list': [existing]}):
+            graph = trigger_manager.dependency_graph([parent, child])
+
+        self.assertEqual(2, len(graph))
+        self.assertIs(parent, graph.get('parent_id'))
+        self.assertEqual({'parent_id'}, graph.ancestors(child))
+
+    def test_save_all_cycle(self):
+        client = Client(self.api_url)
+        trigger_manager = TriggerManager(client)
+
+        a = make_trigger(client, 'a', parents=['b'])
+        b = make_trigger(client, 'b', parents=['a'])
+
+        with patch.object(client, 'get', return_value={'list': []}), \
+                patch.object(client, 'put') as put_mock:
+            with self.assertRaises(CycleError):
+                trigger_manager.save_all([a, b])
+
+        self.assertFalse(put_mock.called)
+
+    def test_parent_ids_unsaved(self):
+        parent = make_trigger(None, name='parent')
+        child = make_trigger(None, name='child', parents=[parent, 'other'])
+
+        with self.assertRaises(ValueError):
+            child.parent_ids()
+
+        parent._id = 'parent_id'
+        self.assertEqual(['parent_id', 'other'], child.parent_ids())
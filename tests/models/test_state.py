@@ -0,0 +1,117 @@
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from requests.exceptions import HTTPError
+
+from moira_client.client import Client
+from moira_client.client import Deadline
+from moira_client.client import DeadlineExceeded
+from moira_client.models.state import GROUP_BY_METRIC
+from moira_client.models.state import GROUP_BY_TRIGGER
+from moira_client.models.trigger import TriggerManager
+from .test_model import ModelTest
+
+
+NOW = 10000
+
+TRIGGERS = {
+    'list': [
+        {'id': '1', 'name': 'cpu', 'tags': ['ops', 'hosts'], 'targets': ['*.cpu']},
+        {'id': '2', 'name': 'disk', 'tags': ['ops'], 'targets': ['*.disk']},
+        {'id': '3', 'name': 'broken', 'tags': ['dev'], 'targets': ['x']},
+    ]
+}
+
+STATES = {
+    'trigger/1/state': {
+        'state': 'OK',
+        'metrics': {
+            'host1': {'state': 'ERROR', 'event_timestamp': NOW - 100},
+            'host2': {'state': 'OK', 'event_timestamp': NOW - 5000},
+        },
+    },
+    'trigger/2/state': {
+        'state': 'OK',
+        'metrics': {
+            'host1': {'state': 'OK', 'event_timestamp': NOW - 5000},
+        },
+    },
+    'trigger/3/state': {
+        'state': 'EXCEPTION',
+        'metrics': {},
+    },
+}
+
+
+class StateSummaryTest(ModelTest):
+
+    def setUp(self):
+        self.client = Client(self.api_url)
+        self.trigger_manager = TriggerManager(self.client)
+        self.calls = []
+
+    def get(self, path, **kwargs):
+        self.calls.append(path)
+        if path == 'trigger':
+            return TRIGGERS
+        return STATES[path]
+
+    def test_state_summary(self):
+        with patch.object(self.client, 'get', side_effect=self.get):
+            summary = self.trigger_manager.state_summary(max_workers=2)
+
+        self.assertEqual([
+            ('dev', 0, 0, 0, 0, 1),
+            ('hosts', 1, 0, 1, 0, 0),
+            ('ops', 2, 0, 1, 0, 0),
+        ], summary.rows())
+        self.assertEqual([('host1', 1, 0, 1, 0, 0), ('host2', 1, 0, 0, 0, 0)], summary.rows(GROUP_BY_METRIC))
+        self.assertEqual([1, 0, 1, 0, 0], list(summary.counts(GROUP_BY_TRIGGER)['1']))
+        self.assertEqual({'OK': 2, 'WARN': 0, 'ERROR': 1, 'NODATA': 0, 'EXCEPTION': 1}, summary.totals())
+
+    def test_trigger_ids_without_tags(self):
+        with patch.object(self.client, 'get', side_effect=self.get):
+            summary = self.trigger_manager.state_summary(['2'], group_by=GROUP_BY_TRIGGER)
+
+        self.assertEqual(['trigger/2/state'], self.calls)
+        self.assertEqual([('2', 1, 0, 0, 0, 0)], summary.rows())
+
+    def test_refresh(self):
+        with patch.object(self.client, 'get', side_effect=self.get):
+            summary = self.trigger_manager.state_summary()
+        summary._clock = lambda: NOW
+        self.calls = []
+
+        with patch.object(self.client, 'get', side_effect=self.get):
+            refreshed = summary.refresh(recent=600)
+
+        self.assertEqual(['1', '3'], sorted(refreshed))
+        self.assertEqual(['trigger/1/state', 'trigger/3/state'], sorted(self.calls))
+
+    def test_errors(self):
+        def get(path, **kwargs):
+            if path == 'trigger/3/state':
+                raise HTTPError('500 Server Error')
+            return self.get(path)
+
+        with patch.object(self.client, 'get', side_effect=get):
+            summary = self.trigger_manager.state_summary()
+
+        self.assertEqual(['3'], list(summary.errors))
+        self.assertEqual(['hosts', 'ops'], [row[0] for row in summary.rows()])
+
+        with patch.object(self.client, 'get', side_effect=self.get):
+            summary.refresh()
+
+        self.assertEqual({}, summary.errors)
+        self.assertIn('3', summary.triggers)
+
+    def test_deadline(self):
+        with patch.object(self.client, '_send', side_effect=self.get) as send_mock:
+            summary = self.trigger_manager.state_summary(['1', '2'], group_by=GROUP_BY_TRIGGER, deadline=Deadline(-1))
+
+        self.assertFalse(send_mock.called)
+        self.assertEqual({'1', '2'}, set(summary.errors))
+        self.assertIsInstance(summary.errors['1'], DeadlineExceeded)
@@ -0,0 +1,62 @@
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from moira_client.client import Client
+from moira_client.models.trigger import TriggerManager
+from .test_model import ModelTest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+NOW = 10000
+
+STATE = {
+    'state': 'OK',
+    'metrics': {
+        'host1': {'state': 'OK', 'value': 1.5, 'timestamp': NOW - 10, 'event_timestamp': NOW - 1000},
+        'host2': {'state': 'ERROR', 'values': {'t1': 9.0}, 'timestamp': NOW - 10, 'maintenance': NOW + 60},
+        'host3': {'state': 'NODATA', 'timestamp': NOW - 7200},
+        'host4': {'state': 'WARN', 'value': 5.0, 'timestamp': NOW - 20},
+    },
+}
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class StateTableTest(ModelTest):
+
+    def setUp(self):
+        client = Client(self.api_url)
+        with patch.object(client, 'get', return_value=STATE) as get_mock:
+            self.table = TriggerManager(client).get_state_table('1')
+        get_mock.assert_called_with('trigger/1/state')
+
+    def test_columns(self):
+        self.assertEqual('1', self.table.trigger_id)
+        self.assertEqual(['host1', 'host2', 'host3', 'host4'], list(self.table.names))
+        self.assertEqual(['OK', 'ERROR', 'NODATA', 'WARN'], self.table.states())
+        self.assertEqual([1.5, 9.0], self.table.value[:2].tolist())
+        self.assertTrue(np.isnan(self.table.value[2]))
+        self.assertEqual([NOW - 1000, 0, 0, 0], self.table.event_timestamp.tolist())
+        self.assertEqual({'OK': 1, 'WARN': 1, 'ERROR': 1, 'NODATA': 1, 'EXCEPTION': 0}, self.table.state_counts())
+
+    def test_state_not_mutated(self):
+        self.assertNotIn('trigger_id', STATE)
+
+    def test_filter(self):
+        stale = self.table.filter(older_than=3600, now=NOW)
+        self.assertEqual(['host3'], list(stale.names))
+
+        bad = self.table.filter(states=['ERROR', 'WARN'], in_maintenance=False, now=NOW)
+        self.assertEqual(['host4'], list(bad.names))
+
+    def test_sort_top(self):
+        self.assertEqual(['host3', 'host4', 'host1', 'host2'], list(self.table.sort('timestamp').names))
+        self.assertEqual(['host2', 'host4'], list(self.table.top(2).names))
+        self.assertEqual(['host1'], list(self.table.top(1, largest=False).names))
+        self.assertEqual(['host2', 'host4', 'host1'], list(self.table.top(10).names))
@@ -0,0 +1,114 @@
+import asyncio
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from moira_client.client import Client
+from moira_client.models.trigger import TriggerManager
+from moira_client.models.watcher import StateChange
+from moira_client.models.watcher import StateWatcher
+from .test_model import ModelTest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_state(state, **metrics):
+    return {'state': state, 'metrics': {name: {'state': s} for name, s in metrics.items()}}
+
+
+class StateWatcherTest(ModelTest):
+
+    def setUp(self):
+        self.client = Client(self.api_url)
+        self.trigger_manager = TriggerManager(self.client)
+        self.clock = FakeClock()
+        self.states = {
+            'trigger/1/state': make_state('OK', host1='OK'),
+            'trigger/2/state': make_state('OK', host1='OK'),
+        }
+        self.calls = []
+
+    def get(self, path, **kwargs):
+        self.calls.append(path)
+        return self.states[path]
+
+    def make_watcher(self, **kwargs):
+        return StateWatcher(
+            self.trigger_manager, ['1', '2'], min_interval=1, max_interval=8, backoff=2,
+            clock=self.clock, sleep=self.clock.sleep, **kwargs
+        )
+
+    def test_poll_diff(self):
+        watcher = self.make_watcher()
+
+        with patch.object(self.client, 'get', side_effect=self.get):
+            self.assertEqual([], watcher.poll())
+
+            self.states['trigger/1/state'] = make_state('ERROR', host1='ERROR', host2='NODATA')
+            self.clock.now += 2
+            changes = watcher.poll()
+
+        self.assertEqual(sorted([
+            StateChange('1', None, 'OK', 'ERROR'),
+            StateChange('1', 'host1', 'OK', 'ERROR'),
+            StateChange('1', 'host2', None, 'NODATA'),
+        ], key=str), sorted(changes, key=str))
+
+    def test_adaptive_interval(self):
+        watcher = self.make_watcher()
+
+        with patch.object(self.client, 'get', side_effect=self.get):
+            for _ in range(4):
+                watcher.poll()
+                self.clock.now += watcher.next_poll_in()
+
+            self.assertEqual(8, watcher.interval('2'))
+
+            self.states['trigger/2/state'] = make_state('OK', host1='WARN')
+            watcher.poll()
+
+        self.assertEqual(1, watcher.interval('2'))
+
+    def test_stable_triggers_polled_less(self):
+        watcher = self.make_watcher()
+        self.states['trigger/1/state'] = make_state('OK', host1='ERROR')
+
+        with patch.object(self.client, 'get', side_effect=self.get):
+            watcher.poll()
+            self.states['trigger/1/state'] = make_state('OK', host1='OK')
+            for change in watcher:
+                # trigger 1 flaps on every poll
+                flapped = 'ERROR' if change.new_state == 'OK' else 'OK'
+                self.states['trigger/1/state'] = make_state('OK', host1=flapped)
+                if self.clock.now > 60:
+                    watcher.stop()
+
+        self.assertGreater(self.calls.count('trigger/1/state'), 4 * self.calls.count('trigger/2/state'))
+
+    def test_async(self):
+        watcher = self.make_watcher()
+
+        async def collect():
+            changes = []
+            async for change in watcher:
+                changes.append(change)
+                watcher.stop()
+            return changes
+
+        with patch.object(self.client, 'get', side_effect=self.get):
+            watcher.poll()
+            self.states['trigger/2/state'] = make_state('OK', host1='WARN')
+            self.clock.now += watcher.next_poll_in()
+            changes = asyncio.run(collect())
+
+        self.assertEqual([StateChange('2', 'host1', 'OK', 'WARN')], changes)
@@ -0,0 +1,145 @@
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from requests.exceptions import ConnectionError
+from moira_client.balancer import Balancer
+from moira_client.balancer import STRATEGY_EWMA
+from moira_client.client import Client
+from moira_client.models.trigger import TriggerManager
+
+URL_A = 'http://moira-a/api'
+URL_B = 'http://moira-b/api'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content=b'{}'):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class BalancerTest(unittest.TestCase):
+
+    def test_least_outstanding(self):
+        balancer = Balancer([URL_A, URL_B])
+        a, b = balancer.endpoints
+
+        balancer.start(a)
+        self.assertIs(b, balancer.choose())
+        balancer.start(b)
+        balancer.start(b)
+        self.assertIs(a, balancer.choose())
+
+    def test_ewma(self):
+        balancer = Balancer([URL_A, URL_B], strategy=STRATEGY_EWMA)
+        a, b = balancer.endpoints
+        for endpoint, latency in ((a, 0.5), (b, 0.1)):
+            balancer.start(endpoint)
+            balancer.finish(endpoint, latency, False)
+
+        self.assertIs(b, balancer.choose())
+        self.assertIs(a, balancer.choose(exclude=b))
+
+    def test_ejection(self):
+        clock = FakeClock()
+        balancer = Balancer([URL_A, URL_B], max_failures=2, ejection_time=30, clock=clock)
+        a, b = balancer.endpoints
+        for _ in range(2):
+            balancer.start(a)
+            balancer.finish(a, 1, True)
+
+        self.assertEqual([a], balancer.ejected())
+        balancer.start(b)
+        self.assertIs(b, balancer.choose())
+
+        clock.now += 30
+        self.assertIs(a, balancer.choose())
+
+    def test_all_ejected(self):
+        balancer = Balancer([URL_A], max_failures=1)
+        balancer.start(balancer.endpoints[0])
+        balancer.finish(balancer.endpoints[0], 1, True)
+
+        self.assertIs(balancer.endpoints[0], balancer.choose())
+
+    def test_probe(self):
+        healthy = {URL_A: False}
+        balancer = Balancer([URL_A, URL_B], max_failures=1, probe=lambda url: healthy[url])
+        balancer.stop()
+        a = balancer.endpoints[0]
+        balancer.start(a)
+        balancer.finish(a, 1, True)
+
+        self.assertEqual([], balancer.probe_ejected())
+        healthy[URL_A] = True
+        self.assertEqual([a], balancer.probe_ejected())
+        self.assertEqual([], balancer.ejected())
+
+
+class ClientBalancerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client([URL_A, URL_B])
+        self.client.balancer.stop()
+        self.urls = []
+
+    def test_balanced(self):
+        with patch.object(requests, 'get', return_value=FakeResponse()) as get_mock:
+            self.client.get('trigger')
+            self.client.get('trigger')
+
+        urls = sorted(call[0][0] for call in get_mock.call_args_list)
+        self.assertEqual(2, len(urls))
+        self.assertTrue(all(url in (URL_A + '/trigger', URL_B + '/trigger') for url in urls))
+
+    def test_failover(self):
+        def get(url, **kwargs):
+            self.urls.append(url)
+            if url.startswith(URL_A):
+                raise ConnectionError()
+            return FakeResponse()
+
+        with patch.object(requests, 'get', side_effect=get):
+            for _ in range(50):
+                try:
+                    self.client.get('trigger')
+                except ConnectionError:
+                    pass
+
+        self.assertEqual(3, sum(1 for url in self.urls if url.startswith(URL_A)))
+        self.assertEqual([self.client.balancer.endpoints[0]], self.client.balancer.ejected())
+
+    def test_pinned(self):
+        with patch.object(requests, 'get', return_value=FakeResponse()) as get_mock:
+            with self.client.pinned() as endpoint:
+                for _ in range(5):
+                    self.client.get('trigger')
+
+        self.assertEqual({endpoint.url + '/trigger'}, {call[0][0] for call in get_mock.call_args_list})
+
+    def test_save_all_pinned(self):
+        trigger_manager = TriggerManager(self.client)
+        triggers = [trigger_manager.create(name=str(i), tags=['t'], targets=['m']) for i in range(3)]
+
+        with patch.object(requests, 'get', return_value=FakeResponse(b'{"list": []}')) as get_mock, \
+                patch.object(requests, 'put', return_value=FakeResponse(b'{"id": "1"}')) as put_mock:
+            trigger_manager.save_all(triggers)
+
+        calls = get_mock.call_args_list + put_mock.call_args_list
+        self.assertEqual(1, len({call[0][0].split('/trigger')[0] for call in calls}))
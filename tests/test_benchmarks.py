@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks import bench_client
+from benchmarks import bench_faults
+from moira_client import Moira
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.faults import FAULT_STATUS
+from moira_client.faults import Scenario
+
+
+class BenchClientTest(unittest.TestCase):
+
+    def test_run(self):
+        results = bench_client.run(sizes=[20], duration=0, min_iterations=2, metrics=2)
+
+        self.assertEqual(
+            [operation.name for operation in bench_client.OPERATIONS],
+            [result['operation'] for result in results['results']],
+        )
+        for result in results['results']:
+            self.assertEqual(20, result['size'])
+            self.assertEqual(2, result['iterations'])
+            self.assertGreater(result['peak_allocated_bytes'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_compare(self):
+        baseline = {'results': [{'operation': 'tag.stats', 'size': 10, 'throughput': 100.0, 'p50_ms': 2.0}]}
+        current = {'results': [
+            {'operation': 'tag.stats', 'size': 10, 'throughput': 50.0, 'p50_ms': 4.0},
+            {'operation': 'trigger.save', 'size': 10, 'throughput': 50.0},
+        ]}
+
+        comparison = bench_client.compare(baseline, current)
+
+        self.assertEqual([{'operation': 'tag.stats', 'size': 10, 'throughput': 0.5, 'p50_ms': 2.0}], comparison)
+
+    def test_cassette(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'cassette.jsonl.gz')
+        moira = Moira(FAKE_API_URL, transport=FakeTransport(FakeMoira().populate(triggers=15, metrics=1)))
+        try:
+            with moira.recording(path):
+                moira.trigger.fetch_all()
+                moira.pattern.fetch_all()
+                moira.tag.stats()
+            results = bench_client.run(duration=0, min_iterations=1, cassette=path)
+        finally:
+            shutil.rmtree(directory)
+
+        self.assertEqual(
+            ['trigger.fetch_all', 'Trigger.__init__', 'pattern.fetch_all', 'tag.stats'],
+            [result['operation'] for result in results['results']],
+        )
+        self.assertEqual({15}, {result['size'] for result in results['results']})
+
+    def test_main_output(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            bench_client.main([
+                '--sizes', '10', '--duration', '0', '--min-iterations', '1',
+                '--operations', 'tag.stats', '--output', path,
+            ])
+            with open(path) as f:
+                results = json.load(f)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(['tag.stats'], [result['operation'] for result in results['results']])
+
+
+class BenchFaultsTest(unittest.TestCase):
+
+    def test_run(self):
+        scenarios = [
+            Scenario('healthy'),
+            Scenario('5xx', [{'type': FAULT_STATUS, 'status': 503, 'probability': 0.5}]),
+        ]
+        policies = {'no-retries': {}, 'retries': {'max_tries': 3, 'delay': 0, 'budget_min_retries': 1000}}
+
+        results = bench_faults.run(scenarios, policies, calls=40, threads=2, triggers=5)
+
+        by_run = {(result['scenario'], result['policy_name']): result for result in results['results']}
+        self.assertEqual(4, len(by_run))
+        self.assertEqual(0, by_run['healthy', 'retries']['retries'])
+        self.assertEqual(0.0, by_run['healthy', 'no-retries']['error_rate'])
+        self.assertGreater(by_run['5xx', 'no-retries']['error_rate'], by_run['5xx', 'retries']['error_rate'])
+        self.assertGreater(by_run['5xx', 'retries']['amplification'], by_run['5xx', 'no-retries']['amplification'])
@@ -0,0 +1,134 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from moira_client import Moira
+from moira_client.cassette import CassetteError
+from moira_client.cassette import ReplayTransport
+from moira_client.cassette import SCRUBBED
+from moira_client.cassette import TIMING_ORIGINAL
+from moira_client.cassette import load_cassette
+from moira_client.cassette import request_key
+from moira_client.cassette import scrub_contacts
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.transport import Response
+from moira_client.transport import Transport
+
+
+class BinaryTransport(Transport):
+
+    def request(self, method, url, **kwargs):
+        return Response(200, b'\xff\x00', {'Content-Encoding': 'gzip', 'Content-Length': '20'}, url)
+
+
+class CassetteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cassette.jsonl.gz')
+        self.backend = FakeMoira().populate(triggers=10, metrics=2, contacts=3, notifications=2)
+        self.moira = Moira(FAKE_API_URL, login='login', auth_custom={'X-Token': 'secret'},
+                           transport=FakeTransport(self.backend))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def replay(self, **kwargs):
+        return Moira(FAKE_API_URL, login='login', transport=ReplayTransport(self.path, **kwargs))
+
+    def test_record_and_replay(self):
+        with self.moira.recording(self.path) as recording:
+            triggers = self.moira.trigger.fetch_all()
+            stats = self.moira.tag.stats()
+        self.assertEqual(2, recording.interactions)
+
+        moira = self.replay()
+
+        self.assertEqual([trigger.id for trigger in triggers], [trigger.id for trigger in moira.trigger.fetch_all()])
+        self.assertEqual([stat.triggers for stat in stats], [stat.triggers for stat in moira.tag.stats()])
+        # the last response is repeated
+        self.assertEqual(10, len(moira.trigger.fetch_all()))
+
+    def test_transport_restored(self):
+        transport = self.moira._client.transport
+        with self.moira.recording(self.path):
+            pass
+
+        self.assertIs(transport, self.moira._client.transport)
+
+    def test_responses_in_order(self):
+        trigger_id = next(iter(self.backend.triggers))
+        with self.moira.recording(self.path):
+            self.moira.health.get_notifier_state()
+            self.moira.health.disable_notifications()
+            self.moira.health.get_notifier_state()
+
+        moira = self.replay()
+
+        self.assertEqual('OK', moira.health.get_notifier_state())
+        self.assertEqual('ERROR', moira.health.get_notifier_state())
+        with self.assertRaises(CassetteError):
+            moira.trigger.get_state(trigger_id)
+
+    def test_scrub(self):
+        with self.moira.recording(self.path):
+            self.moira.contact.fetch_all()
+
+        interaction = load_cassette(self.path)[0]
+
+        self.assertEqual(SCRUBBED, interaction['request_headers']['X-Webauth-User'])
+        self.assertEqual(SCRUBBED, interaction['request_headers']['X-Token'])
+        contacts = json.loads(interaction['body'])['list']
+        self.assertEqual([SCRUBBED] * 3, [contact['value'] for contact in contacts])
+        with gzip.open(self.path, 'rt') as f:
+            self.assertNotIn('secret', f.read())
+
+    def test_no_scrub(self):
+        with self.moira.recording(self.path, scrub=False):
+            contacts = self.moira.contact.fetch_all()
+
+        self.assertEqual([contact.value for contact in contacts],
+                         [contact.value for contact in self.replay().contact.fetch_all()])
+
+    def test_scrub_contacts(self):
+        notification = {'contact': {'id': '1', 'type': 'mail', 'value': 'a@b.c', 'fallback_value': 'd@e.f'},
+                        'event': {'metric': 'a.b', 'value': 1.5}}
+
+        scrubbed = scrub_contacts({'list': [notification]})
+
+        self.assertEqual({'id': '1', 'type': 'mail', 'value': SCRUBBED, 'fallback_value': SCRUBBED},
+                         scrubbed['list'][0]['contact'])
+        self.assertEqual(notification['event'], scrubbed['list'][0]['event'])
+
+    def test_binary_body(self):
+        with self.moira.recording(self.path):
+            self.moira._client.transport.transport = BinaryTransport()
+            self.moira._client.get('trigger', raw=True)
+
+        response = ReplayTransport(self.path).request('GET', FAKE_API_URL + 'trigger')
+
+        self.assertEqual(b'\xff\x00', response.content)
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual('2', response.headers['Content-Length'])
+
+    def test_original_timing(self):
+        with self.moira.recording(self.path):
+            self.moira.tag.fetch_all()
+        delays = []
+
+        transport = ReplayTransport(self.path, timing=TIMING_ORIGINAL, sleep=delays.append)
+        transport.request('GET', FAKE_API_URL + 'tag')
+
+        self.assertEqual(1, len(delays))
+        self.assertEqual(load_cassette(self.path)[0]['duration'], delays[0])
+
+    def test_request_key(self):
+        self.assertEqual(
+            request_key('get', 'http://moira/api/event/1', {'size': 10, 'p': 0}),
+            request_key('GET', 'http://moira/api/event/1', {'p': '0', 'size': '10'}),
+        )
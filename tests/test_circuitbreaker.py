@@ -0,0 +1,120 @@
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from requests.exceptions import HTTPError
+
+from moira_client.circuitbreaker import CircuitBreaker
+from moira_client.circuitbreaker import CircuitOpenError
+from moira_client.circuitbreaker import CircuitSettings
+from moira_client.circuitbreaker import STATE_CLOSED
+from moira_client.circuitbreaker import STATE_HALF_OPEN
+from moira_client.circuitbreaker import STATE_OPEN
+from moira_client.client import Client
+from moira_client.client import RetryPolicy
+from moira_client.client import endpoint_template
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return HTTPError('{} Error'.format(status), response=response)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.changes = []
+        self.breaker = CircuitBreaker(
+            CircuitSettings(failure_rate=0.5, window=4, min_calls=4, open_timeout=10),
+            endpoint_settings={'health/notifier': CircuitSettings(slow_call_duration=0.1, min_calls=2)},
+            on_state_change=lambda *change: self.changes.append(change),
+            clock=self.clock,
+        )
+
+    def call(self, endpoint, failed=False, latency=0.01):
+        self.breaker.before(endpoint)
+        self.breaker.after(endpoint, latency, failed)
+
+    def test_open_half_open_close(self):
+        for failed in (False, True, False, True):
+            self.call('trigger/{id}', failed=failed)
+        self.assertEqual(STATE_OPEN, self.breaker.state('trigger/{id}'))
+        self.assertEqual(STATE_CLOSED, self.breaker.state('tag/stats'))
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before('trigger/{id}')
+
+        self.clock.now += 10
+        self.breaker.before('trigger/{id}')
+        self.assertEqual(STATE_HALF_OPEN, self.breaker.state('trigger/{id}'))
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before('trigger/{id}')
+        self.breaker.after('trigger/{id}', 0.01, False)
+
+        self.assertEqual(STATE_CLOSED, self.breaker.state('trigger/{id}'))
+        self.assertEqual([
+            ('trigger/{id}', STATE_CLOSED, STATE_OPEN),
+            ('trigger/{id}', STATE_OPEN, STATE_HALF_OPEN),
+            ('trigger/{id}', STATE_HALF_OPEN, STATE_CLOSED),
+        ], self.changes)
+
+    def test_failed_trial_reopens(self):
+        for _ in range(4):
+            self.call('trigger', failed=True)
+        self.clock.now += 10
+        self.call('trigger', failed=True)
+
+        self.assertEqual(STATE_OPEN, self.breaker.state('trigger'))
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before('trigger')
+
+    def test_slow_calls(self):
+        self.call('health/notifier', latency=1)
+        self.call('health/notifier', latency=1)
+
+        self.assertEqual(STATE_OPEN, self.breaker.state('health/notifier'))
+
+
+class ClientCircuitBreakerTest(unittest.TestCase):
+
+    def test_endpoint_template(self):
+        self.assertEqual('trigger', endpoint_template('trigger'))
+        self.assertEqual('trigger/{id}/state', endpoint_template('trigger/abc-1/state'))
+        self.assertEqual('tag/stats', endpoint_template('/tag/stats'))
+        self.assertEqual('event/all', endpoint_template('event//all'))
+
+    def test_client_fails_fast(self):
+        breaker = CircuitBreaker(CircuitSettings(window=2, min_calls=2))
+        client = Client('http://test/api', circuit_breaker=breaker, retry_policy=RetryPolicy(max_tries=5, jitter=False))
+
+        with patch.object(client, '_send', side_effect=http_error(503)) as send_mock:
+            with self.assertRaises(CircuitOpenError):
+                client.get('trigger/1/state')
+            with self.assertRaises(CircuitOpenError):
+                client.get('trigger/2/state')
+
+        self.assertEqual(2, send_mock.call_count)
+
+    def test_client_errors_keep_circuit_closed(self):
+        breaker = CircuitBreaker(CircuitSettings(window=2, min_calls=2))
+        client = Client('http://test/api', circuit_breaker=breaker)
+
+        with patch.object(client, '_send', side_effect=http_error(404)):
+            for _ in range(3):
+                with self.assertRaises(HTTPError):
+                    client.get('trigger/1')
+
+        self.assertEqual(STATE_CLOSED, breaker.state('trigger/{id}'))
@@ -0,0 +1,142 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from requests.exceptions import HTTPError
+from moira_client import Moira
+from moira_client.cli import DEFAULT_MIX
+from moira_client.cli import LoadGenerator
+from moira_client.cli import build_parser
+from moira_client.cli import bench
+from moira_client.cli import error_name
+from moira_client.cli import main
+from moira_client.cli import parse_mix
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.transport import Response
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ParseMixTest(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual([('get_state', 6.0), ('save', 1.0)], parse_mix('get_state=6, save', allow_writes=True))
+
+    def test_writes_not_allowed(self):
+        with self.assertRaises(ValueError):
+            parse_mix('get_state=6,save=1')
+        self.assertNotIn('save', dict(parse_mix(DEFAULT_MIX)))
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            parse_mix('get_state=1,unknown=1')
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            parse_mix('')
+
+
+class LoadGeneratorTest(unittest.TestCase):
+
+    def setUp(self):
+        backend = FakeMoira().populate(triggers=10, metrics=2, notifications=0)
+        self.moira = Moira(FAKE_API_URL, transport=FakeTransport(backend))
+        self.triggers = self.moira.trigger.fetch_all()
+
+    def test_call(self):
+        clock = FakeClock()
+        generator = LoadGenerator(self.moira, self.triggers, [('get_state', 1)], clock=clock)
+
+        clock.now = 5.0
+        generator.call(scheduled=2.0)
+
+        report = generator.report.snapshot()
+        self.assertEqual(1, report['calls'])
+        self.assertEqual(3000, report['operations']['get_state']['p50_ms'])
+
+    def test_errors(self):
+        generator = LoadGenerator(self.moira, self.triggers, [('save', 1)])
+        self.triggers[0].name = ''
+        generator.triggers = self.triggers[:1]
+
+        generator.call()
+
+        report = generator.report.snapshot()
+        self.assertEqual({'save': {'HTTPError 400': 1}}, report['error_breakdown'])
+        self.assertEqual(1, report['operations']['save']['errors'])
+
+    def test_error_name(self):
+        self.assertEqual('HTTPError 503', error_name(HTTPError(response=Response(503))))
+        self.assertEqual('ValueError', error_name(ValueError()))
+
+
+class BenchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def bench(self, *argv):
+        out = io.StringIO()
+        result = bench(build_parser().parse_args(['bench'] + list(argv)), out)
+        return result, out.getvalue()
+
+    def test_closed_loop(self):
+        result, text = self.bench('--fake', '--fake-triggers', '20', '--fake-latency', '0', '--duration', '0.2',
+                                  '--concurrency', '2')
+
+        self.assertGreater(result['calls'], 0)
+        self.assertEqual(0, result['errors'])
+        self.assertIn('calls/s', text)
+
+    def test_open_loop_asyncio(self):
+        result, _ = self.bench('--fake', '--fake-triggers', '20', '--fake-latency', '0', '--duration', '0.2',
+                               '--rps', '50', '--mode', 'asyncio', '--mix', 'events')
+
+        self.assertEqual(10, result['calls'])
+        self.assertEqual(['events'], list(result['operations']))
+
+    def test_profile(self):
+        profile = os.path.join(self.dir, 'profile.json')
+        output = os.path.join(self.dir, 'report.json')
+        self.bench('--fake', '--fake-triggers', '20', '--fake-latency', '0', '--duration', '0.1',
+                   '--mix', 'fetch_all', '--save-profile', profile)
+
+        result, _ = self.bench('--profile', profile, '--mix', 'tag_stats', '--output', output)
+
+        self.assertEqual(20, result['options']['fake_triggers'])
+        self.assertEqual(['tag_stats'], list(result['operations']))
+        with open(output) as f:
+            self.assertEqual(result['calls'], json.load(f)['calls'])
+
+    def test_unknown_profile_option(self):
+        profile = os.path.join(self.dir, 'profile.json')
+        with open(profile, 'w') as f:
+            json.dump({'unknown': 1}, f)
+
+        with self.assertRaises(ValueError):
+            self.bench('--profile', profile)
+
+    def test_writes_require_opt_in(self):
+        with self.assertRaises(ValueError):
+            self.bench('--api-url', 'http://localhost:1/api/', '--mix', 'get_state,save')
+
+    def test_main_requires_url(self):
+        with self.assertRaises(SystemExit) as e:
+            main(['bench'])
+
+        self.assertEqual(2, e.exception.code)
@@ -5,14 +5,23 @@ except ImportError:
     from mock import patch
 
 import requests
+from requests.exceptions import ConnectTimeout
+from requests.exceptions import HTTPError
+from requests.exceptions import ReadTimeout
 from moira_client.client import Client
+from moira_client.client import Deadline
+from moira_client.client import DeadlineExceeded
 from moira_client.client import InvalidJSONError
+from moira_client.client import RetryPolicy
+from moira_client.client import deadline_scope
+from moira_client.compression import ACCEPT_ENCODINGS
 
 TEST_API_URL = 'http://test/api/url'
 TEST_HEADERS = {
     'X-Webauth-User': 'login',
     'Content-Type': 'application/json',
-    'User-Agent': 'Python Moira Client'
+    'User-Agent': 'Python Moira Client',
+    'Accept-Encoding': ', '.join(ACCEPT_ENCODINGS),
     }
 
 
@@ -131,3 +140,125 @@ class ClientTest(unittest.TestCase):
         self.assertTrue(mock_delete.called)
         expected_url_call = TEST_API_URL + '/' + test_path
         mock_delete.assert_called_with(expected_url_call, headers=TEST_HEADERS, auth=None)
+
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return HTTPError('{} Error'.format(status), response=response)
+
+
+class RetryTest(unittest.TestCase):
+
+    def make_client(self, **kwargs):
+        kwargs.setdefault('max_tries', 3)
+        kwargs.setdefault('jitter', False)
+        return Client(TEST_API_URL, retry_policy=RetryPolicy(**kwargs))
+
+    def test_retry_server_errors(self):
+        client = self.make_client()
+
+        with patch.object(client, '_send', side_effect=[http_error(503), ReadTimeout(), {'list': []}]) as send_mock, \
+                patch('moira_client.client.time.sleep'):
+            self.assertEqual({'list': []}, client.get('trigger'))
+
+        self.assertEqual(3, send_mock.call_count)
+
+    def test_no_retry_client_errors(self):
+        client = self.make_client()
+
+        for error in (http_error(400), InvalidJSONError(b'')):
+            with patch.object(client, '_send', side_effect=error) as send_mock:
+                with self.assertRaises(type(error)):
+                    client.delete('trigger/1')
+            self.assertEqual(1, send_mock.call_count)
+
+    def test_put_retried_only_if_not_sent(self):
+        client = self.make_client()
+
+        with patch.object(client, '_send', side_effect=[ReadTimeout(), {}]) as send_mock:
+            with self.assertRaises(ReadTimeout):
+                client.put('trigger', json={})
+        self.assertEqual(1, send_mock.call_count)
+
+        with patch.object(client, '_send', side_effect=[ConnectTimeout(), {'id': '1'}]) as send_mock, \
+                patch('moira_client.client.time.sleep'):
+            self.assertEqual({'id': '1'}, client.put('trigger', json={}))
+        self.assertEqual(2, send_mock.call_count)
+
+    def test_delay(self):
+        policy = RetryPolicy(delay=1, backoff=2, max_delay=5, jitter=False)
+        self.assertEqual([1, 2, 4, 5], [policy.get_delay(attempt) for attempt in range(1, 5)])
+        self.assertEqual(5, policy.get_delay(1, http_error(429, {'Retry-After': '30'})))
+
+        policy = RetryPolicy(delay=1, backoff=2)
+        self.assertEqual(7, policy.get_delay(1, http_error(429, {'Retry-After': '7'})))
+        for _ in range(20):
+            self.assertTrue(0 <= policy.get_delay(3) <= 4)
+
+    def test_budget(self):
+        client = self.make_client(max_tries=100, budget_ratio=0.5, budget_min_retries=2)
+
+        with patch.object(client, '_send', side_effect=http_error(503)) as send_mock, \
+                patch('moira_client.client.time.sleep'):
+            with self.assertRaises(HTTPError):
+                client.get('trigger')
+
+        # 2 initial retries plus 0.5 earned by the request itself
+        self.assertEqual(3, send_mock.call_count)
+
+
+class JSONResponse:
+    content = b'{}'
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {}
+
+
+class TimeoutTest(unittest.TestCase):
+
+    def get_timeout(self, client, path, **kwargs):
+        with patch.object(requests, 'get', return_value=JSONResponse()) as get_mock:
+            client.get(path, **kwargs)
+        return get_mock.call_args[1]['timeout']
+
+    def test_timeouts(self):
+        client = Client(TEST_API_URL, timeout=(1, 5), endpoint_timeouts={'tag/stats': (3, 60)})
+
+        self.assertEqual((1, 5), self.get_timeout(client, 'trigger/1'))
+        self.assertEqual((3, 60), self.get_timeout(client, 'tag/stats'))
+        self.assertEqual(0.5, self.get_timeout(client, 'tag/stats', timeout=0.5))
+
+    def test_deadline_caps_timeout(self):
+        client = Client(TEST_API_URL, timeout=(1, 5))
+
+        connect, read = self.get_timeout(client, 'trigger', deadline=2)
+        self.assertEqual(1, connect)
+        self.assertTrue(1.5 < read <= 2)
+
+        with deadline_scope(Deadline(0.5)):
+            self.assertTrue(self.get_timeout(client, 'trigger')[1] <= 0.5)
+
+    def test_expired_deadline(self):
+        client = Client(TEST_API_URL)
+
+        with patch.object(requests, 'get') as get_mock:
+            with self.assertRaises(DeadlineExceeded):
+                client.get('trigger', deadline=Deadline(-1))
+
+        self.assertFalse(get_mock.called)
+
+    def test_deadline_stops_retries(self):
+        client = Client(TEST_API_URL, retry_policy=RetryPolicy(max_tries=5, delay=10, jitter=False))
+
+        with patch.object(client, '_send', side_effect=ReadTimeout()) as send_mock, \
+                patch('moira_client.client.time.sleep') as sleep_mock:
+            with self.assertRaises(ReadTimeout):
+                client.get('trigger', deadline=5)
+
+        self.assertEqual(1, send_mock.call_count)
+        self.assertFalse(sleep_mock.called)
@@ -0,0 +1,83 @@
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from moira_client import codec
+from moira_client.client import Client
+from moira_client.client import InvalidJSONError
+from moira_client.codec import JSONCodec
+from moira_client.codec import OrjsonCodec
+from moira_client.codec import get_codec
+
+TEST_API_URL = 'http://test/api/url'
+
+
+class BytesResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class CodecTest(unittest.TestCase):
+
+    def test_json_codec(self):
+        json_codec = JSONCodec()
+        data = json_codec.dumps({'name': 'trigger', 'tags': ['a', 'b']})
+
+        self.assertIsInstance(data, bytes)
+        self.assertEqual({'name': 'trigger', 'tags': ['a', 'b']}, json_codec.loads(data))
+        self.assertEqual([1], json_codec.loads('[1]'))
+
+    def test_get_codec(self):
+        self.assertIsInstance(get_codec(), JSONCodec)
+        self.assertIsInstance(get_codec('json'), JSONCodec)
+        self.assertIsInstance(get_codec('auto'), OrjsonCodec if codec.orjson else JSONCodec)
+        custom = JSONCodec()
+        self.assertIs(custom, get_codec(custom))
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    @unittest.skipIf(codec.orjson is None, 'orjson is not installed')
+    def test_orjson_codec(self):
+        orjson_codec = OrjsonCodec()
+
+        self.assertEqual({'a': [1, 2]}, orjson_codec.loads(orjson_codec.dumps({'a': [1, 2]})))
+        with self.assertRaises(ValueError):
+            orjson_codec.loads(b'not json')
+
+
+class ClientCodecTest(unittest.TestCase):
+
+    def test_decode(self):
+        client = Client(TEST_API_URL)
+
+        with patch.object(requests, 'get', return_value=BytesResponse(b'{"list": []}')):
+            self.assertEqual({'list': []}, client.get('trigger'))
+
+    def test_raw(self):
+        client = Client(TEST_API_URL)
+
+        with patch.object(requests, 'get', return_value=BytesResponse(b'{"list": []}')):
+            self.assertEqual(b'{"list": []}', client.get('trigger', raw=True))
+
+    def test_invalid_json(self):
+        client = Client(TEST_API_URL)
+
+        with patch.object(requests, 'get', return_value=BytesResponse(b'not json')):
+            with self.assertRaises(InvalidJSONError):
+                client.get('trigger')
+
+    def test_encode(self):
+        client = Client(TEST_API_URL)
+
+        with patch.object(requests, 'put', return_value=BytesResponse(b'{}')) as put_mock:
+            client.put('trigger/1', json={'name': 'trigger'})
+
+        kwargs = put_mock.call_args[1]
+        self.assertNotIn('json', kwargs)
+        self.assertEqual({'name': 'trigger'}, JSONCodec().loads(kwargs['data']))
@@ -0,0 +1,107 @@
+import gzip
+import unittest
+import zlib
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from moira_client.client import Client
+from moira_client.compression import ACCEPT_ENCODINGS
+from moira_client.compression import TransferStats
+from moira_client.compression import compress
+from moira_client.compression import wire_size
+
+TEST_API_URL = 'http://test/api/url'
+
+
+class FakeRaw:
+    def __init__(self, size):
+        self.size = size
+
+    def tell(self):
+        return self.size
+
+
+class FakeResponse:
+    def __init__(self, content, wire_bytes=None, headers=None):
+        self.content = content
+        self.raw = FakeRaw(wire_bytes) if wire_bytes is not None else None
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class CompressionTest(unittest.TestCase):
+
+    def test_compress(self):
+        data = b'{"name": "trigger"}' * 100
+
+        self.assertEqual(data, gzip.decompress(compress(data, 'gzip')))
+        self.assertEqual(data, zlib.decompress(compress(data, 'deflate')))
+        with self.assertRaises(ValueError):
+            compress(data, 'lzma')
+
+    def test_wire_size(self):
+        self.assertEqual(100, wire_size(FakeResponse(b'x' * 1000, wire_bytes=100)))
+        self.assertEqual(200, wire_size(FakeResponse(b'x' * 1000, headers={'Content-Length': '200'})))
+        self.assertEqual(1000, wire_size(FakeResponse(b'x' * 1000)))
+
+    def test_transfer_stats(self):
+        stats = TransferStats()
+        stats.record('trigger', 0, 100, 1000)
+        stats.record('trigger', 0, 300, 1000)
+        stats.record('trigger/{id}', 50, 10, 10)
+
+        self.assertEqual(2, stats.get('trigger').requests)
+        self.assertEqual(5.0, stats.get('trigger').ratio)
+        self.assertIsNone(stats.get('tag').ratio)
+        self.assertEqual(['trigger', 'trigger/{id}'], sorted(stats.snapshot()))
+        total = stats.total()
+        self.assertEqual((3, 50, 410, 2010), (total.requests, total.sent_bytes, total.wire_bytes, total.decoded_bytes))
+
+
+class ClientCompressionTest(unittest.TestCase):
+
+    def test_accept_encoding(self):
+        client = Client(TEST_API_URL)
+
+        self.assertIn('gzip', ACCEPT_ENCODINGS)
+        self.assertEqual(', '.join(ACCEPT_ENCODINGS), client.headers['Accept-Encoding'])
+
+    def test_compressed_body(self):
+        client = Client(TEST_API_URL, compress_requests='gzip', compress_min_size=100)
+        body = {'targets': ['metric.{}'.format(i) for i in range(100)]}
+
+        with patch.object(requests, 'put', return_value=FakeResponse(b'{}')) as put_mock:
+            client.put('trigger/1', json=body)
+
+        kwargs = put_mock.call_args[1]
+        self.assertEqual('gzip', kwargs['headers']['Content-Encoding'])
+        self.assertEqual(body, client.codec.loads(gzip.decompress(kwargs['data'])))
+        self.assertNotIn('Content-Encoding', client.headers)
+
+    def test_small_body_not_compressed(self):
+        client = Client(TEST_API_URL, compress_requests='gzip', compress_min_size=100)
+
+        with patch.object(requests, 'put', return_value=FakeResponse(b'{}')) as put_mock:
+            client.put('trigger/1', json={'name': 'trigger'})
+
+        kwargs = put_mock.call_args[1]
+        self.assertNotIn('Content-Encoding', kwargs['headers'])
+        self.assertEqual({'name': 'trigger'}, client.codec.loads(kwargs['data']))
+
+    def test_transfer_accounting(self):
+        client = Client(TEST_API_URL)
+        content = b'{"list": []}'
+
+        with patch.object(requests, 'get', return_value=FakeResponse(content, wire_bytes=5)):
+            client.get('trigger/1/state')
+            client.get('trigger/2/state')
+
+        transfer = client.transfer_stats.get('trigger/{id}/state')
+        self.assertEqual(2, transfer.requests)
+        self.assertEqual(10, transfer.wire_bytes)
+        self.assertEqual(2 * len(content), transfer.decoded_bytes)
@@ -0,0 +1,127 @@
+import asyncio
+import gzip
+import json
+import unittest
+
+from requests.exceptions import HTTPError
+from moira_client import Moira
+from moira_client.fake import AsyncFakeTransport
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.revalidation import RevalidationCache
+
+
+class FakeMoiraTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = FakeMoira().populate(
+            triggers=20, metrics=5, tags=10, contacts=4, subscriptions=6, events=3, notifications=7,
+        )
+        self.transport = FakeTransport(self.backend)
+        self.moira = Moira(FAKE_API_URL, login='login', transport=self.transport)
+
+    def test_populate_is_deterministic(self):
+        other = FakeMoira().populate(triggers=20, metrics=5, tags=10, contacts=4, subscriptions=6)
+
+        self.assertEqual(list(self.backend.triggers), list(other.triggers))
+
+    def test_fetch_all(self):
+        self.assertEqual(20, len(self.moira.trigger.fetch_all()))
+        self.assertEqual(10, len(self.moira.tag.fetch_all()))
+        self.assertEqual(6, len(self.moira.subscription.fetch_all()))
+        self.assertEqual(4, len(self.moira.contact.fetch_all()))
+        self.assertEqual(7, len(self.moira.notification.fetch_all()))
+        self.assertEqual(2, len(self.moira.pattern.fetch_all()))
+
+    def test_tag_stats(self):
+        stats = self.moira.tag.stats()
+        triggers = sum(len(stat.triggers) for stat in stats)
+
+        self.assertEqual(20 * 3, triggers)
+        self.assertFalse(self.moira.tag.delete(stats[0].name if stats[0].triggers else stats[1].name))
+
+    def test_trigger_save_and_fetch(self):
+        trigger = self.moira.trigger.create(name='new', targets=['servers.new.cpu'], tags=['new'], warn_value=1,
+                                            error_value=2)
+        trigger_id = trigger.save()
+
+        fetched = self.moira.trigger.fetch_by_id(trigger_id)
+        self.assertEqual('new', fetched.name)
+        self.assertIn('new', self.moira.tag.fetch_all())
+
+        self.moira.trigger.delete(trigger_id)
+        self.assertIsNone(self.moira.trigger.fetch_by_id(trigger_id))
+
+    def test_trigger_state(self):
+        trigger_id = next(iter(self.backend.triggers))
+
+        state = self.moira.trigger.get_state(trigger_id)
+
+        self.assertEqual(5, len(state['metrics']))
+        self.assertIn(state['state'], ('OK', 'WARN', 'ERROR'))
+
+    def test_events(self):
+        trigger = self.moira.trigger.fetch_all()[0]
+
+        self.assertEqual(2, len(self.moira.event.fetch_by_trigger(trigger, limit=2)))
+        self.moira.event.delete_all()
+        self.assertEqual([], self.moira.event.fetch_by_trigger(trigger))
+
+    def test_contacts_and_subscriptions(self):
+        contact = self.moira.contact.add('new@example.com', 'mail')
+        subscription = self.moira.subscription.create(['tag-0'], [contact.id])
+        subscription.save()
+
+        self.assertEqual(5, len(self.moira.contact.fetch_by_current_user()))
+        self.assertTrue(self.moira.subscription.is_exist(tags=['tag-0'], contacts=[contact.id]))
+        self.assertTrue(self.moira.subscription.delete(subscription.id))
+        self.moira.contact.delete(contact.id)
+        self.assertIsNone(self.moira.contact.get_id('mail', 'new@example.com'))
+
+    def test_health(self):
+        self.assertTrue(self.moira.health.disable_notifications())
+        self.assertEqual('ERROR', self.moira.health.get_notifier_state())
+
+    def test_unknown_path(self):
+        with self.assertRaises(HTTPError) as e:
+            self.moira._client.get('unknown')
+
+        self.assertEqual(404, e.exception.response.status_code)
+
+    def test_compressed_body(self):
+        body = gzip.compress(json.dumps({'name': 'gzip', 'targets': ['a.b']}).encode('utf-8'))
+
+        response = self.transport.request(
+            'PUT', FAKE_API_URL + 'trigger', data=body, headers={'Content-Encoding': 'gzip'},
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('gzip', self.backend.triggers[response.json()['id']]['name'])
+
+    def test_not_modified(self):
+        moira = Moira(FAKE_API_URL, transport=self.transport, revalidation_cache=RevalidationCache())
+
+        first = moira.trigger.fetch_all()
+        self.assertIs(first[0], moira.trigger.fetch_all()[0])
+
+        moira.trigger.delete(first[0].id)
+        self.assertEqual(19, len(moira.trigger.fetch_all()))
+
+    def test_latency(self):
+        delays = []
+        transport = FakeTransport(self.backend, latency=0.01, jitter=0.01, sleep=delays.append)
+
+        transport.request('GET', FAKE_API_URL + 'tag')
+
+        self.assertTrue(0.01 <= delays[0] <= 0.02)
+
+    def test_async(self):
+        transport = AsyncFakeTransport(self.backend, latency=0.001)
+
+        async def main():
+            return await asyncio.gather(*[transport.request('GET', FAKE_API_URL + 'trigger') for _ in range(5)])
+
+        responses = asyncio.run(main())
+
+        self.assertEqual([20] * 5, [len(response.json()['list']) for response in responses])
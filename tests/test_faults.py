@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+import unittest
+
+from requests.exceptions import ConnectionError
+from requests.exceptions import HTTPError
+from requests.exceptions import ReadTimeout
+from moira_client import Moira
+from moira_client.client import RetryPolicy
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.faults import FAULT_EMPTY_BODY
+from moira_client.faults import FAULT_LATENCY
+from moira_client.faults import FAULT_RESET
+from moira_client.faults import FAULT_STATUS
+from moira_client.faults import FAULT_TRUNCATE
+from moira_client.faults import Fault
+from moira_client.faults import FaultInjectingTransport
+from moira_client.faults import Scenario
+from moira_client.faults import load_scenarios
+
+
+class FaultTest(unittest.TestCase):
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            Fault('unknown')
+
+    def test_matches(self):
+        fault = Fault(FAULT_RESET, methods=['get'], endpoints=['trigger/{id}'])
+
+        self.assertTrue(fault.matches('GET', 'trigger/{id}/state'))
+        self.assertFalse(fault.matches('DELETE', 'trigger/{id}'))
+        self.assertFalse(fault.matches('GET', 'trigger'))
+
+    def test_burst(self):
+        fault = Fault(FAULT_STATUS, start=2, count=2, period=5)
+
+        fired = [fault.fires(None) for _ in range(10)]
+
+        self.assertEqual([False, False, True, True, False] * 2, fired)
+
+
+class FaultInjectingTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = FakeMoira().populate(triggers=5, metrics=2, notifications=0)
+        self.delays = []
+        self.tags = self.backend.handle('GET', 'tag')[1]['list']
+
+    def moira(self, faults, retry_policy=None):
+        self.transport = FaultInjectingTransport(
+            FakeTransport(self.backend), Scenario('test', faults), sleep=self.delays.append,
+        )
+        return Moira(FAKE_API_URL, retry_policy=retry_policy, timeout=1, transport=self.transport)
+
+    def test_latency(self):
+        moira = self.moira([{'type': FAULT_LATENCY, 'delay': 0.5}])
+
+        self.assertEqual(5, len(moira.trigger.fetch_all()))
+        self.assertEqual([0.5], self.delays)
+
+    def test_latency_exceeding_timeout(self):
+        moira = self.moira([{'type': FAULT_LATENCY, 'delay': 2}])
+
+        with self.assertRaises(ReadTimeout):
+            moira.tag.fetch_all()
+        self.assertEqual([1], self.delays)
+
+    def test_reset(self):
+        moira = self.moira([{'type': FAULT_RESET, 'count': 1}])
+
+        with self.assertRaises(ConnectionError):
+            moira.tag.fetch_all()
+        self.assertEqual(self.tags, moira.tag.fetch_all())
+        self.assertEqual({FAULT_RESET: 1}, dict(self.transport.injected))
+
+    def test_status_retried(self):
+        moira = self.moira(
+            [{'type': FAULT_STATUS, 'status': 429, 'retry_after': 0, 'count': 2}],
+            RetryPolicy(max_tries=3, delay=0),
+        )
+
+        self.assertEqual(self.tags, moira.tag.fetch_all())
+        self.assertEqual(3, self.transport.requests)
+
+    def test_status(self):
+        moira = self.moira([{'type': FAULT_STATUS, 'status': 503}])
+
+        with self.assertRaises(HTTPError) as e:
+            moira.tag.fetch_all()
+        self.assertEqual(503, e.exception.response.status_code)
+
+    def test_truncate(self):
+        moira = self.moira([{'type': FAULT_TRUNCATE, 'ratio': 0.5}])
+
+        with self.assertRaises(Exception):
+            moira.trigger.fetch_all()
+
+    def test_empty_body(self):
+        moira = self.moira([{'type': FAULT_EMPTY_BODY, 'methods': ['DELETE']}])
+
+        moira.trigger.delete(next(iter(self.backend.triggers)))
+
+        self.assertEqual(4, len(self.backend.triggers))
+
+    def test_load_scenarios(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump([{'name': 'brownout', 'faults': [{'type': FAULT_RESET, 'probability': 0.1}]}], f)
+        try:
+            scenarios = load_scenarios(path)
+        finally:
+            os.remove(path)
+
+        self.assertEqual(['brownout'], [scenario.name for scenario in scenarios])
+        self.assertEqual(0.1, scenarios[0].faults[0].probability)
@@ -0,0 +1,161 @@
+import threading
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from moira_client.client import Client
+from moira_client.hedging import HedgePolicy
+from moira_client.instrumentation import RequestHooks
+
+TEST_API_URL = 'http://test/api/url'
+ALTERNATE_URL = 'http://replica/api/url'
+REPLICA_URLS = ['http://replica1/api/url', 'http://replica2/api/url']
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class HedgePolicyTest(unittest.TestCase):
+
+    def test_delay(self):
+        policy = HedgePolicy(percentile=90, min_samples=10, min_delay=0.001)
+
+        for i in range(9):
+            policy.observe('trigger/{id}/state', 0.01 * (i + 1))
+        self.assertIsNone(policy.delay('trigger/{id}/state'))
+
+        policy.observe('trigger/{id}/state', 1.0)
+        self.assertEqual(1.0, policy.delay('trigger/{id}/state'))
+        self.assertIsNone(policy.delay('trigger'))
+
+    def test_delay_bounds(self):
+        policy = HedgePolicy(min_samples=1, min_delay=0.05, max_delay=0.5)
+
+        policy.observe('trigger', 0.001)
+        self.assertEqual(0.05, policy.delay('trigger'))
+
+        policy = HedgePolicy(min_samples=1, min_delay=0.05, max_delay=0.5)
+        policy.observe('trigger', 3)
+        self.assertEqual(0.5, policy.delay('trigger'))
+
+    def test_applies(self):
+        policy = HedgePolicy(endpoints=['trigger/{id}/state'])
+
+        self.assertTrue(policy.applies('GET', 'trigger/{id}/state'))
+        self.assertFalse(policy.applies('GET', 'trigger'))
+        self.assertFalse(policy.applies('PUT', 'trigger/{id}/state'))
+
+    def test_budget(self):
+        policy = HedgePolicy(budget_ratio=0.1, window=100)
+
+        for _ in range(20):
+            policy.start()
+        self.assertTrue(policy.try_hedge())
+        self.assertTrue(policy.try_hedge())
+        self.assertFalse(policy.try_hedge())
+        self.assertEqual(2, policy.hedges)
+
+
+class ClientHedgingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = HedgePolicy(min_samples=1, min_delay=0.01, budget_ratio=0.5, alternate_url=ALTERNATE_URL)
+        self.policy.observe('trigger/{id}/state', 0.01)
+        self.client = Client(TEST_API_URL, hedge_policy=self.policy)
+        self.release = threading.Event()
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.startswith(TEST_API_URL):
+            self.release.wait(5)
+            return FakeResponse(b'{"state": "slow"}')
+        return FakeResponse(b'{"state": "fast"}')
+
+    def test_hedge_wins(self):
+        self.policy.start()
+        with patch.object(requests, 'get', side_effect=self.get):
+            result = self.client.get('trigger/1/state')
+            self.release.set()
+
+        self.assertEqual({'state': 'fast'}, result)
+        self.assertEqual([TEST_API_URL + '/trigger/1/state', ALTERNATE_URL + '/trigger/1/state'], self.urls)
+        self.assertEqual(1, self.policy.hedge_wins)
+
+    def test_fast_response_not_hedged(self):
+        self.release.set()
+        self.policy.start()
+        with patch.object(requests, 'get', side_effect=self.get):
+            result = self.client.get('trigger/1/state')
+
+        self.assertEqual({'state': 'slow'}, result)
+        self.assertEqual(1, len(self.urls))
+        self.assertEqual(0, self.policy.hedges)
+
+    def test_no_budget(self):
+        with patch.object(requests, 'get', side_effect=self.get):
+            threading.Timer(0.05, self.release.set).start()
+            result = self.client.get('trigger/1/state')
+
+        self.assertEqual({'state': 'slow'}, result)
+        self.assertEqual(1, len(self.urls))
+
+    def test_put_not_hedged(self):
+        with patch.object(requests, 'put', return_value=FakeResponse(b'{}')) as put_mock:
+            self.client.put('trigger/1', json={})
+
+        self.assertEqual(1, put_mock.call_count)
+        self.assertEqual(0, self.policy.requests)
+
+
+class StatusHook(RequestHooks):
+
+    def __init__(self):
+        self.infos = []
+
+    def after(self, info):
+        self.infos.append(info)
+
+
+class BalancedHedgingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = HedgePolicy(min_samples=1, min_delay=0.01, budget_ratio=0.5)
+        self.policy.observe('trigger/{id}/state', 0.01)
+        self.policy.start()
+        self.hook = StatusHook()
+        self.client = Client(REPLICA_URLS, hedge_policy=self.policy, hooks=[self.hook])
+        self.release = threading.Event()
+        self.urls = []
+
+    def tearDown(self):
+        self.release.set()
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if len(self.urls) == 1:
+            self.release.wait(5)
+            return FakeResponse(b'{"state": "slow"}')
+        return FakeResponse(b'{"state": "fast"}')
+
+    def test_hedge_to_another_instance(self):
+        with patch.object(requests, 'get', side_effect=self.get):
+            result = self.client.get('trigger/1/state')
+
+        self.assertEqual({'state': 'fast'}, result)
+        self.assertEqual(2, len(self.urls))
+        self.assertNotEqual(self.urls[0].split('/')[2], self.urls[1].split('/')[2])
+        self.assertEqual(1, self.policy.hedge_wins)
+        self.assertEqual(self.urls[1], self.hook.infos[0].url)
+        self.assertEqual(200, self.hook.infos[0].status)
@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+import unittest
+
+import moira_client
+
+# seconds, generous to not fail on slow machines, catch eager imports of heavy modules
+PACKAGE_IMPORT_BUDGET = 0.1
+CLIENT_IMPORT_BUDGET = 1.5
+
+MEASURE = '''
+import json
+import sys
+import time
+
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'modules': sorted(sys.modules)}}))
+'''
+
+
+def measure(code):
+    output = subprocess.check_output([sys.executable, '-c', MEASURE.format(code=code)])
+    return json.loads(output.decode('utf-8'))
+
+
+class ImportTest(unittest.TestCase):
+
+    def test_import_package(self):
+        result = measure('import moira_client')
+
+        self.assertLess(result['elapsed'], PACKAGE_IMPORT_BUDGET)
+        self.assertEqual(['moira_client'], [module for module in result['modules'] if module.startswith('moira')])
+        self.assertNotIn('requests', result['modules'])
+
+    def test_create_client(self):
+        result = measure("from moira_client import Moira\nMoira('http://localhost/api/').contact")
+
+        self.assertLess(result['elapsed'], CLIENT_IMPORT_BUDGET)
+        for module in ('moira_client.models.trigger', 'moira_client.models.table', 'moira_client.expression',
+                       'moira_client.fake', 'moira_client.cli'):
+            self.assertNotIn(module, result['modules'])
+
+    def test_lazy_attributes(self):
+        from moira_client.client import RetryPolicy
+        from moira_client.models.trigger import Trigger
+        import moira_client.models
+
+        self.assertIs(RetryPolicy, moira_client.RetryPolicy)
+        self.assertIs(Trigger, moira_client.models.Trigger)
+        self.assertIn('Moira', dir(moira_client))
+        with self.assertRaises(AttributeError):
+            moira_client.Unknown
@@ -0,0 +1,123 @@
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from requests.exceptions import HTTPError
+from moira_client.client import Client
+from moira_client.client import RetryPolicy
+from moira_client.instrumentation import LatencyHistogram
+from moira_client.instrumentation import Metrics
+from moira_client.instrumentation import RequestHooks
+
+TEST_API_URL = 'http://test/api/url'
+
+
+class FakeResponse:
+    headers = {}
+
+    def __init__(self, content=b'{}', status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(response=self)
+
+    def json(self):
+        return {}
+
+
+class RecordingHooks(RequestHooks):
+    def __init__(self):
+        self.events = []
+
+    def before(self, info):
+        self.events.append(('before', info.method, info.endpoint, info.attempt, info.status))
+
+    def after(self, info):
+        self.events.append(('after', info.method, info.endpoint, info.attempt, info.status))
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for i in range(1, 1001):
+            histogram.record(i / 1000.0)
+
+        self.assertEqual(1000, histogram.count)
+        self.assertAlmostEqual(0.5, histogram.percentile(50), delta=0.005)
+        self.assertAlmostEqual(0.99, histogram.percentile(99), delta=0.01)
+        self.assertEqual(1.0, histogram.percentile(100))
+        self.assertEqual(0.001, histogram.min)
+        self.assertAlmostEqual(0.5005, histogram.mean)
+
+    def test_small_values_exact(self):
+        histogram = LatencyHistogram()
+        histogram.record(0.0001)
+
+        self.assertAlmostEqual(0.0001, histogram.percentile(50))
+
+    def test_merge(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.record(0.01)
+        second.record(2.0)
+        first.merge(second)
+
+        self.assertEqual(2, first.count)
+        self.assertEqual(2.0, first.max)
+        self.assertAlmostEqual(2.0, first.percentile(100))
+
+    def test_empty(self):
+        self.assertIsNone(LatencyHistogram().percentile(50))
+
+
+class ClientHooksTest(unittest.TestCase):
+
+    def test_hooks(self):
+        hooks = RecordingHooks()
+        client = Client(TEST_API_URL, hooks=[hooks])
+
+        with patch.object(requests, 'get', return_value=FakeResponse(b'{"state": "OK"}')):
+            client.get('trigger/1/state')
+
+        self.assertEqual([
+            ('before', 'GET', 'trigger/{id}/state', 1, None),
+            ('after', 'GET', 'trigger/{id}/state', 1, 200),
+        ], hooks.events)
+
+    def test_attempts(self):
+        hooks = RecordingHooks()
+        client = Client(TEST_API_URL, retry_policy=RetryPolicy(max_tries=2, jitter=False), hooks=[hooks])
+
+        responses = [FakeResponse(status_code=503), FakeResponse()]
+        with patch.object(requests, 'get', side_effect=responses):
+            client.get('trigger')
+
+        self.assertEqual([1, 2], [event[3] for event in hooks.events if event[0] == 'after'])
+        self.assertEqual([503, 200], [event[4] for event in hooks.events if event[0] == 'after'])
+
+    def test_metrics(self):
+        metrics = Metrics()
+        client = Client(TEST_API_URL, hooks=[metrics])
+
+        with patch.object(requests, 'get', return_value=FakeResponse(b'{"list": []}')), \
+                patch.object(requests, 'put', return_value=FakeResponse(status_code=400)):
+            client.get('trigger')
+            client.get('trigger')
+            with self.assertRaises(HTTPError):
+                client.put('trigger/1', json={'name': 'trigger'})
+
+        snapshot = metrics.snapshot()
+        trigger = snapshot['trigger']
+        self.assertEqual(2, trigger['requests'])
+        self.assertEqual({200: 2}, trigger['statuses'])
+        self.assertEqual(24, trigger['decoded_bytes'])
+        self.assertEqual(2, trigger['latency']['count'])
+        self.assertEqual(2, trigger['decode_time']['count'])
+        put = snapshot['trigger/{id}']
+        self.assertEqual((1, {400: 1}), (put['errors'], put['statuses']))
+        self.assertEqual(len(b'{"name":"trigger"}'), put['sent_bytes'])
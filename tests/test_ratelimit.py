@@ -0,0 +1,152 @@
+import threading
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from requests.exceptions import HTTPError
+
+from moira_client.client import Client
+from moira_client.ratelimit import ConcurrencyLimiter
+from moira_client.ratelimit import RateLimit
+from moira_client.ratelimit import RateLimiter
+from moira_client.ratelimit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_try_acquire(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, burst=2, clock=clock, sleep=clock.sleep)
+
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+        clock.now += 0.5
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+    def test_acquire_waits(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, burst=1, clock=clock, sleep=clock.sleep)
+
+        for _ in range(11):
+            self.assertTrue(bucket.acquire())
+
+        self.assertAlmostEqual(1.0, clock.now)
+
+    def test_acquire_timeout(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1, burst=1, clock=clock, sleep=clock.sleep)
+
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire(timeout=0.5))
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_matches(self):
+        limit = RateLimit(1, method='get', prefix='/trigger/')
+
+        self.assertTrue(limit.matches('GET', 'trigger/1/state'))
+        self.assertFalse(limit.matches('PUT', 'trigger/1'))
+        self.assertFalse(limit.matches('GET', 'tag/stats'))
+        self.assertTrue(RateLimit(1).matches('DELETE', 'tag/stats'))
+
+    def test_acquire_all_matching(self):
+        stats = RateLimit(1, burst=1, prefix='tag/stats')
+        total = RateLimit(100, burst=2)
+        limiter = RateLimiter([stats, total])
+
+        self.assertTrue(limiter.acquire('GET', 'tag/stats'))
+        self.assertFalse(limiter.acquire('GET', 'tag/stats', timeout=0))
+        self.assertTrue(limiter.acquire('GET', 'trigger', timeout=0))
+        self.assertFalse(limiter.acquire('GET', 'trigger', timeout=0))
+
+
+class ConcurrencyLimiterTest(unittest.TestCase):
+
+    def test_aimd(self):
+        clock = FakeClock()
+        limiter = ConcurrencyLimiter(initial=4, min_limit=1, max_limit=5, clock=clock)
+
+        for _ in range(8):
+            limiter.acquire()
+            limiter.release(0.1)
+        self.assertEqual(5, limiter.limit)
+
+        limiter.acquire()
+        limiter.release(0.1, overloaded=True)
+        self.assertEqual(2, limiter.limit)
+
+        # failures of requests sent together decrease limit once
+        limiter.acquire()
+        limiter.release(0.1, overloaded=True)
+        self.assertEqual(2, limiter.limit)
+
+        clock.now += 1
+        limiter.acquire()
+        limiter.release(1.0)
+        self.assertEqual(1, limiter.limit)
+
+    def test_mixed_latency_endpoints(self):
+        clock = FakeClock()
+        limiter = ConcurrencyLimiter(initial=32, max_limit=32, clock=clock)
+
+        for i in range(200):
+            clock.now += 0.01
+            limiter.acquire()
+            if i % 4:
+                limiter.release(0.01, endpoint='GET trigger/{id}/state')
+            else:
+                limiter.release(0.5, endpoint='GET trigger')
+        self.assertEqual(32, limiter.limit)
+
+        limiter.acquire()
+        limiter.release(1.5, endpoint='GET trigger')
+        self.assertEqual(16, limiter.limit)
+
+    def test_acquire_blocks(self):
+        limiter = ConcurrencyLimiter(initial=1)
+
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire(timeout=0.01))
+
+        thread = threading.Timer(0.01, limiter.release, args=(0.01,))
+        thread.start()
+        self.assertTrue(limiter.acquire(timeout=5))
+        thread.join()
+
+
+class ClientLimitsTest(unittest.TestCase):
+
+    def test_client_uses_limiters(self):
+        rate_limiter = RateLimiter([RateLimit(1000, prefix='trigger')])
+        concurrency_limiter = ConcurrencyLimiter(initial=4)
+        client = Client('http://test/api', rate_limiter=rate_limiter, concurrency_limiter=concurrency_limiter)
+
+        response = requests.Response()
+        response.status_code = 503
+
+        with patch.object(rate_limiter, 'acquire', wraps=rate_limiter.acquire) as acquire_mock, \
+                patch.object(client, '_send', side_effect=HTTPError(response=response)):
+            with self.assertRaises(HTTPError):
+                client.get('trigger/1/state')
+
+        acquire_mock.assert_called_once_with('GET', 'trigger/1/state', timeout=None)
+        self.assertEqual(2, concurrency_limiter.limit)
+        self.assertEqual(0, concurrency_limiter.in_flight)
@@ -0,0 +1,150 @@
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from moira_client.client import Client
+from moira_client.models.pattern import PatternManager
+from moira_client.models.trigger import TriggerManager
+from moira_client.revalidation import RevalidationCache
+
+TEST_API_URL = 'http://test/api/url'
+
+TRIGGERS = b'{"list": [{"id": "1", "name": "trigger", "targets": ["a.b"], "tags": ["tag"]}]}'
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeServer:
+    def __init__(self, content, etag=None, last_modified=None):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.requests = []
+
+    def get(self, url, headers, **kwargs):
+        self.requests.append(headers)
+        if self.etag and headers.get('If-None-Match') == self.etag or \
+                self.last_modified and headers.get('If-Modified-Since') == self.last_modified:
+            return FakeResponse(304)
+        validators = {}
+        if self.etag:
+            validators['ETag'] = self.etag
+        if self.last_modified:
+            validators['Last-Modified'] = self.last_modified
+        return FakeResponse(200, self.content, validators)
+
+
+class RevalidationCacheTest(unittest.TestCase):
+
+    def test_store(self):
+        cache = RevalidationCache(max_entries=2)
+        cache.store('a', {'ETag': '"1"'}, {})
+        cache.store('b', {}, {})
+        cache.store('c', {'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}, {})
+        cache.store('d', {'ETag': '"2"'}, {})
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual({'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}, cache.get('c').conditional_headers())
+        self.assertEqual({'If-None-Match': '"2"'}, cache.get('d').conditional_headers())
+
+
+class ClientRevalidationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = RevalidationCache()
+        self.client = Client(TEST_API_URL, revalidation_cache=self.cache)
+
+    def test_etag(self):
+        server = FakeServer(b'{"list": []}', etag='"v1"')
+
+        with patch.object(requests, 'get', side_effect=server.get):
+            first = self.client.get('tag')
+            second = self.client.get('tag')
+
+        self.assertNotIn('If-None-Match', server.requests[0])
+        self.assertEqual('"v1"', server.requests[1]['If-None-Match'])
+        self.assertIs(first, second)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_last_modified(self):
+        server = FakeServer(b'{"list": []}', last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+
+        with patch.object(requests, 'get', side_effect=server.get):
+            self.client.get('tag')
+            self.assertEqual({'list': []}, self.client.get('tag'))
+
+        self.assertEqual('Mon, 01 Jan 2024 00:00:00 GMT', server.requests[1]['If-Modified-Since'])
+
+    def test_no_validators(self):
+        server = FakeServer(b'{"list": []}')
+
+        with patch.object(requests, 'get', side_effect=server.get):
+            self.client.get('tag')
+            self.client.get('tag')
+
+        self.assertNotIn('If-None-Match', server.requests[1])
+        self.assertNotIn('If-Modified-Since', server.requests[1])
+        self.assertEqual(0, len(self.cache))
+
+    def test_params_in_key(self):
+        server = FakeServer(b'{"list": []}', etag='"v1"')
+
+        with patch.object(requests, 'get', side_effect=server.get):
+            self.client.get('notification', params={'start': 0, 'end': 10})
+            self.client.get('notification', params={'start': 10, 'end': 20})
+
+        self.assertNotIn('If-None-Match', server.requests[1])
+
+    def test_models_reused(self):
+        server = FakeServer(TRIGGERS, etag='"v1"')
+        trigger_manager = TriggerManager(self.client)
+
+        with patch.object(requests, 'get', side_effect=server.get):
+            first = trigger_manager.fetch_all()
+            second = trigger_manager.fetch_all()
+            server.content = TRIGGERS.replace(b'"trigger"', b'"renamed"')
+            server.etag = '"v2"'
+            third = trigger_manager.fetch_all()
+
+        self.assertIs(first[0], second[0])
+        self.assertIsNot(first, second)
+        self.assertEqual('renamed', third[0].name)
+
+    def test_patterns_not_mutated(self):
+        content = b'{"list": [{"metrics": ["a.b"], "pattern": "a.*", ' \
+            b'"triggers": [{"id": "1", "name": "trigger", "tags": [], "targets": []}]}]}'
+        server = FakeServer(content, etag='"v1"')
+        pattern_manager = PatternManager(self.client)
+
+        with patch.object(requests, 'get', side_effect=server.get):
+            patterns = pattern_manager.fetch_all()
+            raw = self.client.get('pattern')
+
+        self.assertEqual('trigger', patterns[0].triggers[0].name)
+        self.assertIsInstance(raw['list'][0]['triggers'][0], dict)
+
+    def test_cache_per_call(self):
+        server = FakeServer(b'{"list": []}', etag='"v1"')
+        cache = RevalidationCache()
+
+        with patch.object(requests, 'get', side_effect=server.get):
+            self.client.get('tag', revalidation_cache=cache)
+            self.client.get('tag', revalidation_cache=cache)
+            self.client.get('tag')
+
+        self.assertEqual('"v1"', server.requests[1]['If-None-Match'])
+        self.assertNotIn('If-None-Match', server.requests[2])
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(0, self.cache.hits)
@@ -0,0 +1,182 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+from moira_client import Moira
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.sharedcache import TABLE_TRIGGERS
+from moira_client.sharedcache import SharedInventory
+from moira_client.sharedcache import SharedInventoryError
+from moira_client.sharedcache import _Mapping
+from moira_client.sharedcache import encode_inventory
+from moira_client.sharedcache import write_inventory
+
+READ_IN_WORKER = '''
+import sys
+from moira_client.sharedcache import SharedInventory
+
+inventory = SharedInventory(sys.argv[1])
+print(len(inventory.trigger_ids(sys.argv[2])))
+'''
+
+
+class EncodeInventoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'inventory')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_lookup(self):
+        triggers = [
+            {'id': 'c', 'name': 'trigger c', 'tags': ['b'], 'targets': []},
+            {'id': 'a', 'name': 'trigger a', 'tags': ['a', 'b'], 'targets': []},
+            {'id': 'b', 'name': 'trigger b', 'tags': [], 'targets': []},
+        ]
+        write_inventory(self.path, {TABLE_TRIGGERS: triggers})
+        inventory = SharedInventory(self.path)
+        try:
+            self.assertEqual(['a', 'b', 'c'], inventory.trigger_ids())
+            self.assertEqual(['a', 'c'], inventory.trigger_ids('b'))
+            self.assertEqual([], inventory.trigger_ids('unknown'))
+            self.assertEqual(['a', 'b'], inventory.tags())
+            self.assertIsInstance(inventory.trigger_data('b'), memoryview)
+            self.assertEqual('trigger b', inventory.trigger('b').name)
+            self.assertIsNone(inventory.trigger('d'))
+            self.assertIsNone(inventory.trigger_data(''))
+            self.assertEqual([], inventory.subscription_ids())
+        finally:
+            inventory.close()
+
+    def test_missing_file(self):
+        inventory = SharedInventory(self.path, check_interval=0)
+
+        self.assertEqual([], inventory.trigger_ids())
+        self.assertIsNone(inventory.trigger('a'))
+        self.assertIsNone(inventory.staleness())
+
+        write_inventory(self.path, {TABLE_TRIGGERS: [{'id': 'a', 'tags': []}]})
+        self.assertEqual(['a'], inventory.trigger_ids())
+        inventory.close()
+
+    def test_invalid_file(self):
+        data = encode_inventory({})
+        with open(self.path, 'wb') as f:
+            f.write(b'X' + data[1:])
+
+        inventory = SharedInventory(self.path)
+        self.assertEqual([], inventory.trigger_ids())
+        inventory.close()
+
+        with self.assertRaises(SharedInventoryError):
+            _Mapping(self.path)
+
+    def test_replaced(self):
+        clock = [0.0]
+        write_inventory(self.path, {TABLE_TRIGGERS: [{'id': 'a', 'name': 'old', 'tags': [], 'targets': []}]})
+        inventory = SharedInventory(self.path, check_interval=10, clock=lambda: clock[0])
+        data = inventory.trigger_data('a')
+
+        write_inventory(self.path, {TABLE_TRIGGERS: [{'id': 'a', 'name': 'new', 'tags': [], 'targets': []}]})
+        self.assertEqual('old', inventory.trigger('a').name)
+        clock[0] += 10
+        self.assertEqual('new', inventory.trigger('a').name)
+
+        inventory.close()
+        self.assertIn(b'"old"', data.tobytes())
+
+    def test_lookups_while_replaced(self):
+        def publish(version):
+            write_inventory(self.path, {TABLE_TRIGGERS: [
+                {'id': str(i), 'name': 'v{}'.format(version), 'tags': ['tag'], 'targets': []} for i in range(100)
+            ]})
+
+        publish(0)
+        inventory = SharedInventory(self.path, check_interval=0)
+        stop = threading.Event()
+        errors = []
+
+        def lookup():
+            try:
+                while not stop.is_set():
+                    inventory.trigger_data('50')
+                    inventory.trigger_ids('tag')
+                    inventory.triggers('tag')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for version in range(1, 50):
+            publish(version)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual('v49', inventory.trigger('50').name)
+        inventory.close()
+
+
+class SharedInventoryRefresherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'inventory')
+        self.backend = FakeMoira().populate(triggers=50, metrics=1, tags=10, subscriptions=5)
+        self.transport = FakeTransport(self.backend)
+        self.moira = Moira(FAKE_API_URL, transport=self.transport)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_refresh(self):
+        refresher = self.moira.shared_inventory_refresher(self.path)
+        inventory = self.moira.shared_inventory(self.path, check_interval=0)
+        trigger = next(iter(self.backend.triggers.values()))
+        subscription = next(iter(self.backend.subscriptions.values()))
+
+        self.assertEqual(sorted(self.backend.triggers), inventory.trigger_ids())
+        self.assertEqual(trigger['name'], inventory.trigger(trigger['id']).name)
+        self.assertEqual(sorted(self.backend.subscriptions), inventory.subscription_ids())
+        self.assertEqual(subscription['tags'], inventory.subscription(subscription['id']).tags)
+        self.assertIn(subscription['id'], [s.id for s in inventory.subscriptions(subscription['tags'][0])])
+        self.assertLess(inventory.staleness(), 60)
+
+        requests = self.transport.requests
+        self.assertFalse(refresher.refresh())
+        self.assertEqual(requests + 2, self.transport.requests)
+
+        trigger['name'] = 'renamed'
+        self.backend.version += 1
+        self.assertTrue(refresher.refresh())
+        self.assertEqual('renamed', inventory.trigger(trigger['id']).name)
+        inventory.close()
+
+    def test_restarted_refresher_revalidates(self):
+        self.moira.shared_inventory_refresher(self.path)
+
+        refresher = self.moira.shared_inventory_refresher(self.path)
+
+        inventory = SharedInventory(self.path)
+        self.assertFalse(refresher.refresh())
+        self.assertEqual(sorted(self.backend.triggers), inventory.trigger_ids())
+        inventory.close()
+
+    def test_read_in_another_process(self):
+        self.moira.shared_inventory_refresher(self.path)
+        tag = next(iter(self.backend.triggers.values()))['tags'][0]
+        expected = sum(tag in trigger['tags'] for trigger in self.backend.triggers.values())
+
+        output = subprocess.check_output([sys.executable, '-c', READ_IN_WORKER, self.path, tag])
+
+        self.assertEqual(expected, int(output))
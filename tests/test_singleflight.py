@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from moira_client.client import Client
+from moira_client.client import DeadlineExceeded
+from moira_client.singleflight import SingleFlight
+
+TEST_API_URL = 'http://test/api/url'
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def run_concurrently(self, flight, key, fn, count):
+        results = [None] * count
+        errors = [None] * count
+
+        def call(i):
+            try:
+                results[i] = flight.do(key, fn)
+            except Exception as e:
+                errors[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def test_coalesce(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return {'list': []}
+
+        threads, results, errors = self.run_concurrently(flight, 'trigger', fn, 5)
+        while flight.calls < 5:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, len(calls))
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual((5, 1, 4), (flight.calls, flight.executions, flight.coalesced))
+        self.assertEqual(0, flight.in_flight())
+
+    def test_exception_shared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fn():
+            release.wait(5)
+            raise ValueError('fail')
+
+        threads, results, errors = self.run_concurrently(flight, 'trigger', fn, 3)
+        while flight.calls < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+        self.assertEqual(1, flight.executions)
+
+    def test_sequential_calls_not_coalesced(self):
+        flight = SingleFlight()
+
+        self.assertEqual(1, flight.do('a', lambda: 1))
+        self.assertEqual(2, flight.do('a', lambda: 2))
+        self.assertEqual(0, flight.coalesced)
+
+    def test_follower_timeout(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        thread = threading.Thread(target=flight.do, args=('a', lambda: release.wait(5)))
+        thread.start()
+        while not flight.in_flight():
+            threading.Event().wait(0.001)
+
+        with self.assertRaises(FutureTimeoutError):
+            flight.do('a', lambda: None, timeout=0.01)
+        release.set()
+        thread.join()
+
+    def test_async(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'list': []}
+
+        async def main():
+            return await asyncio.gather(*[flight.do_async('trigger', fetch) for _ in range(5)])
+
+        results = asyncio.run(main())
+
+        self.assertEqual(1, len(calls))
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(4, flight.coalesced)
+
+
+class ClientSingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.client = Client(TEST_API_URL, single_flight=self.flight)
+        self.release = threading.Event()
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        self.requests.append(url)
+        self.release.wait(5)
+        return FakeResponse(b'{"list": []}')
+
+    def test_get_coalesced(self):
+        results = []
+        with patch.object(requests, 'get', side_effect=self.get):
+            threads = [threading.Thread(target=lambda: results.append(self.client.get('trigger'))) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            while self.flight.calls < 4:
+                threading.Event().wait(0.001)
+            self.release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual([{'list': []}] * 4, results)
+        self.assertEqual(3, self.flight.coalesced)
+
+    def test_different_params_not_coalesced(self):
+        self.release.set()
+        with patch.object(requests, 'get', side_effect=self.get):
+            self.client.get('notification', params={'start': 0})
+            self.client.get('notification', params={'start': 1})
+            self.client.get('notification', allow_redirects=False)
+
+        self.assertEqual(2, self.flight.calls)
+
+    def test_follower_deadline(self):
+        with patch.object(requests, 'get', side_effect=self.get):
+            thread = threading.Thread(target=self.client.get, args=('trigger',))
+            thread.start()
+            while not self.flight.in_flight():
+                threading.Event().wait(0.001)
+            with self.assertRaises(DeadlineExceeded):
+                self.client.get('trigger', deadline=0.01)
+            self.release.set()
+            thread.join()
+
+    def test_get_async(self):
+        self.release.set()
+
+        async def main():
+            return await asyncio.gather(*[self.client.get_async('tag/stats') for _ in range(3)])
+
+        with patch.object(requests, 'get', side_effect=self.get):
+            results = asyncio.run(main())
+
+        self.assertEqual([{'list': []}] * 3, results)
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(3, self.flight.calls)
+        self.assertEqual(1, self.flight.executions)
+        self.assertEqual(2, self.flight.coalesced)
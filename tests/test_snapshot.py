@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from moira_client import Moira
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.snapshot import COLLECTION_TRIGGERS
+from moira_client.snapshot import InventorySnapshot
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class InventorySnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'snapshot.db')
+        self.backend = FakeMoira().populate(triggers=30, metrics=1, tags=10, contacts=4, subscriptions=5)
+        self.transport = FakeTransport(self.backend)
+        self.moira = Moira(FAKE_API_URL, transport=self.transport)
+        self.clock = FakeClock()
+        self.snapshot = InventorySnapshot(self.path, self.moira._client, clock=self.clock)
+
+    def tearDown(self):
+        self.snapshot.close()
+        shutil.rmtree(self.dir)
+
+    def test_refresh(self):
+        changes = self.snapshot.refresh()
+
+        self.assertEqual({'added': 30, 'updated': 0, 'removed': 0}, changes['triggers'])
+        self.assertEqual(5, changes['subscriptions']['added'])
+        self.assertEqual(4, changes['contacts']['added'])
+        self.assertEqual(len(self.snapshot.tags()), changes['tag_stats']['added'])
+
+    def test_not_modified(self):
+        self.snapshot.refresh()
+        requests = self.transport.requests
+
+        changes = self.snapshot.refresh()
+
+        self.assertEqual([None] * 4, list(changes.values()))
+        self.assertEqual(requests + 4, self.transport.requests)
+
+    def test_incremental(self):
+        self.snapshot.refresh()
+        trigger_ids = list(self.backend.triggers)
+        self.backend.triggers[trigger_ids[0]]['name'] = 'renamed'
+        del self.backend.triggers[trigger_ids[1]]
+        self.backend.version += 1
+
+        changes = self.snapshot.refresh([COLLECTION_TRIGGERS])
+
+        self.assertEqual({'triggers': {'added': 0, 'updated': 1, 'removed': 1}}, changes)
+        self.assertEqual('renamed', self.snapshot.trigger(trigger_ids[0]).name)
+        self.assertIsNone(self.snapshot.trigger(trigger_ids[1]))
+        self.assertNotIn(trigger_ids[1], self.snapshot.trigger_ids())
+
+    def test_queries(self):
+        self.snapshot.refresh()
+        trigger = next(iter(self.backend.triggers.values()))
+        tag = trigger['tags'][0]
+        tagged = sorted(t['id'] for t in self.backend.triggers.values() if tag in t['tags'])
+
+        self.assertEqual(tagged, self.snapshot.trigger_ids(tag=tag))
+        self.assertEqual(tagged, [t.id for t in self.snapshot.triggers(tag=tag)])
+        self.assertEqual([trigger['id']], [t.id for t in self.snapshot.triggers(name=trigger['name'])])
+        self.assertEqual([], self.snapshot.triggers(tag=tag, name='unknown'))
+        self.assertEqual(30, len(self.snapshot.triggers()))
+
+        subscription = next(iter(self.backend.subscriptions.values()))
+        self.assertEqual(subscription['tags'], self.snapshot.subscription(subscription['id']).tags)
+        self.assertIn(subscription['id'], [s.id for s in self.snapshot.subscriptions(tag=subscription['tags'][0])])
+
+        contact = next(iter(self.backend.contacts.values()))
+        self.assertEqual(contact['value'], self.snapshot.contact(contact['id']).value)
+        self.assertEqual([contact['id']], [c.id for c in self.snapshot.contacts(contact['type'], contact['value'])])
+
+        stats = {stat.name: stat for stat in self.snapshot.tag_stats()}
+        self.assertEqual(sorted(stats[tag].triggers), tagged)
+
+    def test_staleness(self):
+        self.assertIsNone(self.snapshot.staleness())
+        self.snapshot.refresh([COLLECTION_TRIGGERS])
+        self.assertIsNone(self.snapshot.staleness())
+
+        self.snapshot.refresh()
+        self.clock.now += 30
+
+        self.assertEqual(1000.0, self.snapshot.refreshed_at())
+        self.assertEqual(30.0, self.snapshot.staleness())
+        self.assertEqual(30.0, self.snapshot.staleness(COLLECTION_TRIGGERS))
+
+    def test_read_only(self):
+        self.snapshot.refresh()
+        snapshot = InventorySnapshot(self.path)
+        try:
+            self.assertEqual(30, len(snapshot.trigger_ids()))
+            with self.assertRaises(ValueError):
+                snapshot.refresh()
+        finally:
+            snapshot.close()
+
+    def test_background_refresh(self):
+        refreshed = threading.Event()
+        self.snapshot.refresh = lambda: refreshed.set()
+
+        self.snapshot.start(0.001)
+        self.assertTrue(refreshed.wait(5))
+        self.snapshot.stop()
+
+        self.assertIsNone(self.snapshot.last_error)
+
+
+class LoadSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'snapshot.db')
+        self.transport = FakeTransport(FakeMoira().populate(triggers=10, metrics=1))
+        self.moira = Moira(FAKE_API_URL, transport=self.transport)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_load(self):
+        self.moira.load_snapshot(self.path).close()
+        requests = self.transport.requests
+
+        snapshot = self.moira.load_snapshot(self.path)
+        try:
+            self.assertEqual(10, len(snapshot.triggers()))
+            self.assertEqual(requests, self.transport.requests)
+        finally:
+            snapshot.close()
+
+    def test_max_age(self):
+        self.moira.load_snapshot(self.path).close()
+        requests = self.transport.requests
+
+        self.moira.load_snapshot(self.path, max_age=0).close()
+
+        self.assertEqual(requests + 4, self.transport.requests)
@@ -0,0 +1,176 @@
+import unittest
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+import requests
+from requests.exceptions import HTTPError
+from moira_client import Moira
+from moira_client.client import Client
+from moira_client.fake import FAKE_API_URL
+from moira_client.fake import FakeMoira
+from moira_client.fake import FakeTransport
+from moira_client.hedging import HedgePolicy
+from moira_client.models.contact import ContactManager
+from moira_client.models.trigger import TriggerManager
+from moira_client.tracing import NOOP_TRACER
+from moira_client.tracing import STATUS_ERROR
+from moira_client.tracing import Tracer
+from moira_client.tracing import traced
+
+TEST_API_URL = 'http://test/api/url'
+
+
+class FakeResponse:
+    headers = {}
+
+    def __init__(self, content=b'{}', status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(response=self)
+
+    def json(self):
+        return {}
+
+
+class TracerTest(unittest.TestCase):
+
+    def test_nested_spans(self):
+        tracer = Tracer()
+
+        with tracer.start_as_current_span('parent', attributes={'a': 1}) as parent:
+            with tracer.start_as_current_span('child') as child:
+                child.set_attribute('b', 2)
+
+        spans = tracer.exporter.get_finished_spans()
+        self.assertEqual(['child', 'parent'], [span.name for span in spans])
+        self.assertEqual(parent.span_id, child.parent_id)
+        self.assertEqual(parent.trace_id, child.trace_id)
+        self.assertIsNone(parent.parent_id)
+        self.assertEqual({'a': 1}, parent.attributes)
+        self.assertFalse(parent.is_recording())
+
+    def test_exception(self):
+        tracer = Tracer()
+
+        with self.assertRaises(ValueError):
+            with tracer.start_as_current_span('span'):
+                raise ValueError('fail')
+
+        span = tracer.exporter.get_finished_spans()[0]
+        self.assertEqual(STATUS_ERROR, span.status)
+        self.assertEqual('exception', span.events[0][0])
+
+    def test_traced_noop(self):
+        class Manager:
+            def __init__(self, client):
+                self._client = client
+
+            @traced
+            def call(self):
+                return 42
+
+        client = Client(TEST_API_URL)
+        self.assertIs(NOOP_TRACER, client.tracer)
+        self.assertEqual(42, Manager(client).call())
+        self.assertEqual('call', Manager.call.__name__)
+
+
+class ClientTracingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = Tracer()
+        self.client = Client(TEST_API_URL, tracer=self.tracer)
+
+    def spans(self):
+        return {span.span_id: span for span in self.tracer.exporter.get_finished_spans()}
+
+    def test_trigger_save(self):
+        trigger_manager = TriggerManager(self.client)
+        trigger = trigger_manager.create(name='trigger', tags=['tag'], targets=['metric'])
+
+        with patch.object(requests, 'get', return_value=FakeResponse(b'{"list": []}')), \
+                patch.object(requests, 'put', return_value=FakeResponse(b'{"id": "1"}')):
+            trigger.save()
+
+        spans = self.spans()
+
+        def path(span):
+            names = []
+            while span is not None:
+                names.append(span.name)
+                span = spans.get(span.parent_id)
+            return '/'.join(reversed(names))
+
+        paths = [path(span) for span in self.tracer.exporter.get_finished_spans()]
+        self.assertIn('Trigger.save/Trigger.check_exists/TriggerManager.fetch_all/HTTP GET/decode', paths)
+        self.assertIn('Trigger.save/Trigger.check_exists/TriggerManager.fetch_all/build_models', paths)
+        self.assertIn('Trigger.save/HTTP PUT/decode', paths)
+        put = [span for span in spans.values() if span.name == 'HTTP PUT'][0]
+        self.assertEqual({'http.method': 'PUT', 'http.route': 'trigger', 'http.status_code': 200}, put.attributes)
+
+    def test_http_error(self):
+        contact_manager = ContactManager(self.client)
+
+        with patch.object(requests, 'get', return_value=FakeResponse(status_code=500)):
+            with self.assertRaises(HTTPError):
+                contact_manager.fetch_all()
+
+        spans = {span.name: span for span in self.tracer.exporter.get_finished_spans()}
+        self.assertEqual(500, spans['HTTP GET'].attributes['http.status_code'])
+        self.assertEqual(STATUS_ERROR, spans['ContactManager.fetch_all'].status)
+
+
+class WorkerTracingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = Tracer()
+        self.backend = FakeMoira().populate(triggers=10, metrics=1)
+
+    def moira(self, **kwargs):
+        return Moira(FAKE_API_URL, transport=FakeTransport(self.backend), tracer=self.tracer, **kwargs)
+
+    def children(self, name):
+        spans = self.tracer.exporter.get_finished_spans()
+        parent = [span for span in spans if span.name == name][0]
+        return parent, [span for span in spans if span.parent_id == parent.span_id]
+
+    def assert_single_trace(self):
+        spans = self.tracer.exporter.get_finished_spans()
+        self.assertEqual(1, len([span for span in spans if span.parent_id is None]))
+        self.assertEqual(1, len({span.trace_id for span in spans}))
+
+    def test_save_all(self):
+        moira = self.moira()
+        triggers = moira.trigger.fetch_all()
+        self.tracer.exporter.clear()
+
+        moira.trigger.save_all(triggers, max_workers=4)
+
+        parent, children = self.children('TriggerManager.save_all')
+        self.assertEqual(len(triggers), len([span for span in children if span.name == 'HTTP PUT']))
+        self.assert_single_trace()
+
+    def test_fetch_states(self):
+        moira = self.moira()
+
+        moira.trigger.state_summary(list(self.backend.triggers), max_workers=4)
+
+        parent, children = self.children('TriggerManager.state_summary')
+        states = [span for span in children if span.name == 'TriggerManager.get_state']
+        self.assertEqual(len(self.backend.triggers), len(states))
+        self.assert_single_trace()
+
+    def test_hedged_request(self):
+        policy = HedgePolicy(min_samples=1000)
+        moira = self.moira(hedge_policy=policy)
+
+        moira.trigger.get_state(next(iter(self.backend.triggers)))
+
+        parent, children = self.children('TriggerManager.get_state')
+        self.assertEqual(['HTTP GET'], [span.name for span in children])
+        self.assert_single_trace()
@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+try:
+    from unittest.mock import Mock
+    from unittest.mock import patch
+except ImportError:
+    from mock import Mock
+    from mock import patch
+
+import requests
+from requests.exceptions import HTTPError
+from moira_client.client import Client
+from moira_client.transport import RequestsTransport
+from moira_client.transport import Response
+from moira_client.transport import ThreadedAsyncTransport
+from moira_client.transport import Transport
+
+TEST_API_URL = 'http://test/api/url'
+
+
+class RecordingTransport(Transport):
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        return self.response
+
+
+class RequestsTransportTest(unittest.TestCase):
+
+    def test_without_session(self):
+        transport = RequestsTransport()
+        with patch.object(requests, 'delete', return_value=Response(200)) as delete_mock:
+            transport.request('DELETE', TEST_API_URL, timeout=1)
+
+        delete_mock.assert_called_once_with(TEST_API_URL, timeout=1)
+
+    def test_session(self):
+        session = Mock()
+        transport = RequestsTransport(session)
+
+        transport.request('GET', TEST_API_URL, timeout=1)
+        transport.close()
+
+        session.request.assert_called_once_with('GET', TEST_API_URL, timeout=1)
+        self.assertTrue(session.close.called)
+
+
+class ResponseTest(unittest.TestCase):
+
+    def test_json(self):
+        response = Response(200, b'{"list": []}', {'content-type': 'application/json'})
+
+        self.assertEqual({'list': []}, response.json())
+        self.assertEqual('application/json', response.headers['Content-Type'])
+        response.raise_for_status()
+
+    def test_raise_for_status(self):
+        response = Response(404, b'{"status": "Not Found"}', url=TEST_API_URL)
+
+        with self.assertRaises(HTTPError) as e:
+            response.raise_for_status()
+
+        self.assertIs(response, e.exception.response)
+
+
+class ClientTransportTest(unittest.TestCase):
+
+    def test_client_uses_transport(self):
+        transport = RecordingTransport(Response(200, b'{"list": []}'))
+        client = Client(TEST_API_URL, login='login', transport=transport)
+
+        self.assertEqual({'list': []}, client.get('tag', params={'a': 1}))
+
+        method, url, kwargs = transport.requests[0]
+        self.assertEqual('GET', method)
+        self.assertEqual(TEST_API_URL + '/tag', url)
+        self.assertEqual({'a': 1}, kwargs['params'])
+        self.assertEqual('login', kwargs['headers']['X-Webauth-User'])
+
+    def test_error_status(self):
+        transport = RecordingTransport(Response(400, b'{"error": "bad request"}'))
+        client = Client(TEST_API_URL, transport=transport)
+
+        with self.assertRaises(HTTPError):
+            client.put('trigger', json={})
+
+    def test_threaded_async_transport(self):
+        blocking = RecordingTransport(Response(200, b'{}'))
+        transport = ThreadedAsyncTransport(blocking)
+
+        async def main():
+            return await asyncio.gather(*[transport.request('GET', TEST_API_URL) for _ in range(3)])
+
+        responses = asyncio.run(main())
+
+        self.assertEqual([200, 200, 200], [response.status_code for response in responses])
+        self.assertEqual(3, len(blocking.requests))